@@ -0,0 +1,54 @@
+"""
+Helpers shared by the benchmarks.
+"""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+
+def faucet_kwds(settings_name: str = 'settings', **kwds) -> dict:
+    """
+    Returns the keyword arguments to create the faucet object with the browser and driver from the settings module
+    (as main.py does), the site is not opened. The passed keyword arguments override the settings.
+
+    :param settings_name: str
+    :return: dict
+    """
+    import core
+    settings = __import__(settings_name)
+    browser = getattr(settings, 'BROWSER', 'firefox').strip()
+    driver_file = getattr(settings, f'{browser.upper()}_DRIVER_FILE', browser).strip()
+    driver_file = getattr(core, f'{browser.capitalize()}DriverExecFileOrLink')(
+        driver_file if driver_file else browser,
+        directory=getattr(settings, f'{browser.upper()}_DRIVER_DIR', '').strip())
+    return dict({'browser_name': browser,
+                 'driver_backend': getattr(settings, 'DRIVER_BACKEND', 'selenium'),
+                 'driver_exec_path': driver_file.path,
+                 'driver_log_path': os.devnull,
+                 'driver_options': getattr(settings, f'{browser.upper()}_BROWSER_OPTIONS', {}),
+                 'timeout_page_load': getattr(settings, 'TIMEOUT_PAGE_LOAD', 30),
+                 'timeout_elem_wait': getattr(settings, 'TIMEOUT_ELEM_WAIT', 10),
+                 'check_for_captcha': getattr(settings, 'CHECK_FOR_CAPTCHA', True),
+                 'use_snapshot': getattr(settings, 'USE_SNAPSHOT', False),
+                 'wait_engine': getattr(settings, 'WAIT_ENGINE', 'polling'),
+                 'probe_absent': getattr(settings, 'PROBE_ABSENT_ELEMENTS', False),
+                 'block_resources': getattr(settings, 'BLOCK_RESOURCES', {}),
+                 'profile_dir': getattr(settings, f'{browser.upper()}_PROFILE_DIR', ''),
+                 'open': False}, **kwds)
+
+
+def percentile(values: list, percent: float) -> float:
+    """
+    Returns the percentile of the values (nearest-rank method).
+
+    :param values: list
+    :param percent: float (0-100)
+    :return: float
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(int(-(-percent * len(values) // 100)) - 1, 0)]
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3 -B
+"""
+Benchmark of the driver backends: the Selenium remote connection against the minimal W3C client (w3c module) on the
+same user cycle as the end-to-end benchmark (see e2e.py).
+
+With --fake, both backends talk over HTTP to the fake browser served like a driver process (FakeDriverServer), so no
+browser is needed and the results show the cost of the transport of the commands. Otherwise, the browser and the
+driver from the settings are used against the local mock of the site. The warm p50 of each operation, the wall-clock
+time and the time per command are compared; the benchmark fails (exit status 1) if any operation fails or if the W3C
+client is slower than Selenium beyond the tolerance.
+
+    python benchmarks/backend.py [--iterations 10] [--fake] [--settings settings] [--tolerance 0.1] [--json PATH]
+"""
+import sys
+import json
+import argparse
+from time import perf_counter
+
+from _common import faucet_kwds
+from mock_site import MockFaucetSite
+from e2e import CommandCounter, Recorder, run_cycle
+
+BACKENDS = ('selenium', 'w3c')
+
+
+def fake_driver_type(backend: str, url: str):
+    """
+    Returns the factory of the remote driver connected to the fake driver server with the given backend.
+    """
+    from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+    import w3c
+
+    def create(options=None, **kwds):
+        executor = w3c.Connection(url) if backend == 'w3c' else url
+        return RemoteWebDriver(command_executor=executor, options=options, keep_alive=True)
+
+    return create
+
+
+def measure(kwds: dict, site: MockFaucetSite, iterations: int) -> dict:
+    """
+    Runs the user cycles with a new faucet object and returns the summary of the operations, the wall-clock time and
+    the number of commands.
+    """
+    import core
+    recorder = Recorder()
+    faucet = core.FreeBitcoinFaucet(**kwds)
+    if not faucet:
+        return {}
+    try:
+        recorder.counter = CommandCounter(faucet._driver)
+        started = perf_counter()
+        for iteration in range(iterations):
+            run_cycle(faucet, site, recorder, iteration == 0)
+        wall = perf_counter() - started
+    finally:
+        faucet.quit()
+    return {'wall_s': round(wall, 3), 'commands': recorder.counter.count,
+            'us_per_command': round(wall / max(recorder.counter.count, 1) * 10 ** 6, 1),
+            'operations': recorder.summary()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark of the driver backends.')
+    parser.add_argument('--iterations', type=int, default=10, help='number of user cycles (10 by default)')
+    parser.add_argument('--fake', action='store_true', help='use the fake browser served over HTTP (no browser)')
+    parser.add_argument('--settings', default='settings', help='settings module ("settings" by default)')
+    parser.add_argument('--latency', type=float, default=0, help='mock site response latency, s (0 by default)')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed slowdown (0.1 (10%%) by default)')
+    parser.add_argument('--json', default='', help='path to save the results in JSON format')
+    args = parser.parse_args()
+    results = {}
+    with MockFaucetSite(play_interval=0, latency=args.latency) as site:
+        for backend in BACKENDS:
+            if args.fake:
+                from fake_webdriver import FakeDriverServer
+                with FakeDriverServer(site) as server:
+                    results[backend] = measure({'driver_type': fake_driver_type(backend, server.url),
+                                                'wait_engine': 'polling', 'probe_absent': True,
+                                                'timeout_elem_wait': 1}, site, args.iterations)
+            else:
+                results[backend] = measure(faucet_kwds(args.settings, driver_backend=backend), site, args.iterations)
+            if not results[backend]:
+                print(f'FAIL: the faucet object could not be created ({backend}).')
+                return 1
+    selenium, client = (results[backend] for backend in BACKENDS)
+    print(f'{"operation":<30}{"selenium p50 ms":>18}{"w3c p50 ms":>14}{"ratio":>8}')
+    for name, item in selenium['operations'].items():
+        other = client['operations'].get(name, {})
+        ratio = other.get('p50_ms', 0) / item['p50_ms'] if item['p50_ms'] else 0
+        print(f'{name:<30}{item["p50_ms"]:>18.2f}{other.get("p50_ms", 0):>14.2f}{ratio:>8.2f}')
+    for backend in BACKENDS:
+        item = results[backend]
+        print(f'{backend}: wall-clock time {item["wall_s"]} s, {item["commands"]} commands, '
+              f'{item["us_per_command"]} us/command')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(dict(results, fake=args.fake, iterations=args.iterations), f, indent=2)
+    is_failed = any(item['failures'] for backend in BACKENDS for item in results[backend]['operations'].values())
+    if is_failed:
+        print('FAIL: some operations failed.')
+    if client['wall_s'] > selenium['wall_s'] * (1 + args.tolerance):
+        print('FAIL: the W3C client is slower than Selenium beyond the tolerance.')
+        is_failed = True
+    return int(is_failed)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3 -B
+"""
+Benchmark of the resource blocking profile: page load time and traffic of open() and refresh() with and without the
+blocking of images, fonts and third-party hosts.
+
+The local mock of the site serves a page with an image, a web font and third-party content (an ad frame and a tracker,
+served from the "localhost" host name) of the given size. The same number of loads is made in a fresh browser without
+blocking (the baseline) and with the blocking profile, and the load time (p50/p95), the bytes and the number of requests
+per load are compared. The benchmark fails (exit status 1) if the traffic saving is below the budget.
+
+    python benchmarks/blocking.py [--loads 20] [--assets 256] [--latency 0.02] [--settings settings]
+                                  [--min-saving 0.5] [--json results.json]
+"""
+import sys
+import json
+import argparse
+from copy import deepcopy
+from time import perf_counter
+from statistics import mean
+
+from _common import faucet_kwds, percentile
+from mock_site import MockFaucetSite
+
+PROFILE = {'images': True, 'fonts': True, 'media': True, 'hosts': ('localhost',)}
+
+
+def measure(kwds: dict, site: MockFaucetSite, loads: int) -> dict:
+    """
+    Opens the site in a fresh browser, then opens or refreshes it the given number of times and returns the load time
+    and the traffic per load.
+    """
+    import core
+    faucet = core.FreeBitcoinFaucet(**kwds)
+    if not faucet:
+        return {}
+    seconds, sizes, requests = [], [], []
+    try:
+        faucet.open(site.url)  # the first load (browser start-up) is not measured
+        for load in range(loads):
+            site.reset()
+            start = perf_counter()
+            is_loaded = faucet.open(site.url) if load % 2 else faucet.refresh()
+            seconds.append((perf_counter() - start) * 1000)
+            if not is_loaded:
+                return {}
+            sizes.append(site.bytes_sent)
+            requests.append(len(site.requests))
+    finally:
+        faucet.quit()
+    return {'p50_ms': round(percentile(seconds, 50), 2), 'p95_ms': round(percentile(seconds, 95), 2),
+            'bytes': round(mean(sizes)), 'requests': round(mean(requests), 1)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark of the resource blocking profile.')
+    parser.add_argument('--loads', type=int, default=20, help='number of page loads of each run (20 by default)')
+    parser.add_argument('--assets', type=int, default=256, help='size of each page resource, KiB (256 by default)')
+    parser.add_argument('--latency', type=float, default=0.02, help='mock site response latency, s (0.02 by default)')
+    parser.add_argument('--settings', default='settings', help='settings module ("settings" by default)')
+    parser.add_argument('--min-saving', type=float, default=0.5, help='traffic saving budget (0.5 (50%%) by default)')
+    parser.add_argument('--json', default='', help='path to save the results in JSON format')
+    args = parser.parse_args()
+    kwds = faucet_kwds(args.settings, block_resources={})
+    results = {}
+    with MockFaucetSite(latency=args.latency, assets=args.assets, cookie_banner=False) as site:
+        results['baseline'] = measure(kwds, site, args.loads)
+        # Firefox does not send the requests to the loopback host names through the proxy (the PAC) by default
+        kwds['driver_options'] = deepcopy(kwds['driver_options'])
+        kwds['driver_options'].setdefault('preferences', {})['network.proxy.allow_hijacking_localhost'] = True
+        results['blocking'] = measure(dict(kwds, block_resources=PROFILE), site, args.loads)
+    if not all(results.values()):
+        print('FAIL: the site could not be loaded.')
+        return 1
+    baseline, blocking = results['baseline'], results['blocking']
+    print(f'{"profile":<12}{"p50 ms":>10}{"p95 ms":>10}{"KiB/load":>12}{"requests/load":>16}')
+    for name, item in results.items():
+        print(f'{name:<12}{item["p50_ms"]:>10.1f}{item["p95_ms"]:>10.1f}{item["bytes"] / 1024:>12.1f}'
+              f'{item["requests"]:>16.1f}')
+    results['saving'] = {'time': round(1 - blocking['p50_ms'] / baseline['p50_ms'], 3) if baseline['p50_ms'] else 0,
+                         'bytes': round(1 - blocking['bytes'] / baseline['bytes'], 3) if baseline['bytes'] else 0}
+    print(f'Saving: load time (p50) {results["saving"]["time"]:.1%}, traffic {results["saving"]["bytes"]:.1%} '
+          f'(budget {args.min_saving:.0%})')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if results['saving']['bytes'] < args.min_saving:
+        print('FAIL: the traffic saving is below the budget.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3 -B
+"""
+Check of the download engine (core.download_file) against a local HTTP file server with support for ranges.
+
+The server serves a file of the given size with an ETag and can drop the connection after the given number of bytes
+of each response, so the download is interrupted as on a broken network. The following cases are checked: a plain
+download, the resume of an interrupted download (only the missing bytes are transferred), the resume after the remote
+file has changed (the partial file is not continued with the new bytes), the partial file that is already complete
+(416 response), the download in parallel segments, including the resume of interrupted segments, and the resume of an
+interrupted driver archive download (core.stream_unpack with a partial download directory). The time of each case is
+reported. The check fails (exit status 1) if any case fails.
+
+    python benchmarks/download.py [--size 8] [--segments 4] [--json results.json]
+"""
+import io
+import os
+import re
+import sys
+import json
+import shutil
+import tarfile
+import argparse
+import tempfile
+import threading
+from time import perf_counter
+from hashlib import sha256
+from socketserver import ThreadingMixIn
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import _common  # noqa: F401 (the program folder is added to the module search path)
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET(is_head=True)
+
+    def do_GET(self, is_head: bool = False):
+        server = self.server.file_server
+        data, etag = server.data, server.etag
+        status, start, end = 200, 0, len(data) - 1
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match and self.headers.get('If-Range', etag) == etag:
+            status, start = 206, int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+        server.requests.append({'method': self.command, 'range': self.headers.get('Range', ''),
+                                'if_range': self.headers.get('If-Range', ''), 'status': status})
+        if status == 206 and start >= len(data):
+            server.requests[-1]['status'] = 416
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{len(data)}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('ETag', etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+        self.end_headers()
+        if is_head:
+            return
+        body = data[start:end + 1]
+        if server.fail_after is not None and len(body) > server.fail_after:
+            body = body[:server.fail_after]
+            self.close_connection = True
+        self.wfile.write(body)
+        server.bytes_sent += len(body)
+
+
+class RangeFileServer:
+    """
+    Local HTTP server of a single file with support for ranges (Range, If-Range, 416) and interrupted responses.
+    """
+
+    def __init__(self, size: int, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self.fail_after = None  # number of bytes of each response after which the connection is dropped
+        self.requests = []
+        self.bytes_sent = 0
+        self.version = 0
+        self.data = b''
+        self.etag = ''
+        self.__size = size
+        self.__server = None
+        self.change()
+
+    def __enter__(self) -> 'RangeFileServer':
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}/file.bin'
+
+    def change(self):
+        """
+        Replaces the file with a new version of the same size.
+        """
+        self.version += 1
+        seed = sha256(str(self.version).encode()).digest()
+        self.data = (seed * (self.__size // len(seed) + 1))[:self.__size]
+        self.etag = f'"v{self.version}"'
+
+    def reset(self):
+        self.fail_after = None
+        self.requests = []
+        self.bytes_sent = 0
+
+    def start(self) -> 'RangeFileServer':
+        self.__server = _Server((self.host, self.port), _Handler)
+        self.__server.file_server = self
+        self.port = self.__server.server_address[1]
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+
+def run_case(name: str, check, results: dict):
+    """
+    Runs and times one case and records its result.
+    """
+    started = perf_counter()
+    try:
+        error = check()
+    except Exception as err:
+        error = f'{err.__class__.__name__}: {err}'
+    results[name] = {'ok': not error, 'seconds': round(perf_counter() - started, 3)}
+    if error:
+        results[name]['error'] = error
+    print(f'{name:<30}{("FAIL", "ok")[not error]:>6}{results[name]["seconds"]:>10.3f} s{"  " + error if error else ""}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Check of the download engine.')
+    parser.add_argument('--size', type=int, default=8, help='file size, MiB (8 by default)')
+    parser.add_argument('--segments', type=int, default=4, help='number of parallel segments (4 by default)')
+    parser.add_argument('--json', default='', help='path to save the results in JSON format')
+    args = parser.parse_args()
+    import core
+    size = args.size * 2 ** 20
+    target_dir = tempfile.mkdtemp(prefix='faucet-download-')
+    target_path = os.path.join(target_dir, 'file.bin')
+    part_path = f'{target_path}.part'
+    results = {}
+
+    def download(segments: int = 1) -> str:
+        return core.download_file(server.url, target_dir, 'file.bin', message='Check', segments=segments)
+
+    def interrupt(segments: int = 1):
+        server.reset()
+        server.fail_after = size // segments // 3
+        if download(segments):
+            raise RuntimeError('the download was not interrupted')
+
+    def verify(max_bytes: int = None) -> str:
+        if not os.path.isfile(target_path):
+            return 'the file was not downloaded'
+        with open(target_path, 'rb') as f:
+            if f.read() != server.data:
+                return 'the content of the file does not match'
+        if max_bytes is not None and server.bytes_sent > max_bytes:
+            return f'{server.bytes_sent} bytes transferred ({max_bytes} expected at most)'
+        os.remove(target_path)
+        return ''
+
+    def plain() -> str:
+        server.reset()
+        download()
+        return verify(size)
+
+    def resume() -> str:
+        interrupt()
+        transferred = server.bytes_sent
+        server.reset()
+        download()
+        if not server.requests[-1]['if_range']:
+            return 'the resumed request has no If-Range header'
+        return verify(size - transferred)
+
+    def changed() -> str:
+        interrupt()
+        server.change()
+        server.reset()
+        download()
+        return verify(size)
+
+    def complete() -> str:
+        interrupt()
+        with open(part_path, 'wb') as f:
+            f.write(server.data)
+        server.reset()
+        download()
+        if [request['status'] for request in server.requests] != [416]:
+            return f'unexpected responses {[request["status"] for request in server.requests]}'
+        return verify(0)
+
+    def segments() -> str:
+        server.reset()
+        download(args.segments)
+        ranges = sum(1 for request in server.requests if request['status'] == 206)
+        if ranges != args.segments:
+            return f'{ranges} range responses ({args.segments} expected)'
+        return verify(size)
+
+    def segments_resume() -> str:
+        interrupt(args.segments)
+        transferred = server.bytes_sent
+        server.reset()
+        download(args.segments)
+        return verify(size - transferred)
+
+    def segments_changed() -> str:
+        interrupt(args.segments)
+        server.change()
+        server.reset()
+        download(args.segments)
+        return verify(size)
+
+    def archive_resume() -> str:
+        member = server.data
+        with io.BytesIO() as buffer:
+            with tarfile.open(fileobj=buffer, mode='w:gz') as arch:
+                info = tarfile.TarInfo('driver')
+                info.size = len(member)
+                arch.addfile(info, io.BytesIO(member))
+            server.data = buffer.getvalue()
+        url = server.url.replace('file.bin', 'driver.tar.gz')
+        server.reset()
+        server.fail_after = len(server.data) // 3
+        if core.stream_unpack(url, 'driver', target_path, message='Check', part_dir=target_dir):
+            return 'the download was not interrupted'
+        transferred = server.bytes_sent
+        server.reset()
+        if not core.stream_unpack(url, 'driver', target_path, message='Check', part_dir=target_dir):
+            return 'the driver was not extracted'
+        if server.bytes_sent > len(server.data) - transferred:
+            return f'{server.bytes_sent} bytes transferred ({len(server.data) - transferred} expected at most)'
+        server.data = member
+        return verify()
+
+    try:
+        with RangeFileServer(size) as server:
+            for name, check in (('plain', plain), ('resume', resume), ('resume after change', changed),
+                                ('already complete (416)', complete), ('segments', segments),
+                                ('segments resume', segments_resume),
+                                ('segments resume after change', segments_changed),
+                                ('driver archive resume', archive_resume)):
+                run_case(name, check, results)
+    finally:
+        shutil.rmtree(target_dir, ignore_errors=True)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if not all(result['ok'] for result in results.values()):
+        print('FAIL: some cases failed.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
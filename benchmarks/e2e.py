@@ -0,0 +1,182 @@
+#!/usr/bin/env python3 -B
+"""
+End-to-end latency benchmark of the faucet operations against the local mock of the site.
+
+Every iteration runs the whole user cycle (open, sign-in, modal windows, property reads, bonus table, bonuses, free
+play, sign-out) and times each public operation separately. The first iteration in a fresh browser is reported as cold,
+the rest as warm (p50/p95/p99). The number of WebDriver commands of each operation is counted as well.
+The results are saved in JSON format, so that runs can be compared; with a baseline, the benchmark fails (exit status
+1) if the warm p95 of any operation (or its number of commands) regresses beyond the tolerance.
+
+    python benchmarks/e2e.py [--iterations 20] [--settings settings] [--wait-engine observer] [--latency 0.02]
+                             [--json results.json] [--baseline previous.json] [--tolerance 0.2]
+"""
+import sys
+import json
+import argparse
+import platform
+from time import perf_counter, strftime
+from statistics import mean
+
+from _common import faucet_kwds, percentile
+from mock_site import MockFaucetSite
+
+PROPERTIES = ('balance_btc', 'balance_rp', 'balance_lt', 'free_play_countdown', 'free_play_cost', 'user_id',
+              'email_address', 'btc_address', 'recovery_phone_number', 'state_free_play_sound',
+              'state_disable_lottery', 'state_disable_interest')
+BONUS_PROPERTIES = ('bonuses_btc', 'bonuses_lt', 'bonuses_wof', 'active_bonus_btc')
+WINNING_PROPERTIES = ('winning_btc', 'winning_rp', 'winning_lt', 'winning_wof')
+
+
+class CommandCounter:
+    """
+    Counts the WebDriver commands sent by the driver (and its elements).
+    """
+
+    def __init__(self, driver):
+        self.count = 0
+        execute = driver.execute
+
+        def counting_execute(*args, **kwds):
+            self.count += 1
+            return execute(*args, **kwds)
+
+        driver.execute = counting_execute
+
+
+class Recorder:
+    """
+    Collects the time and the number of commands of each operation run.
+    """
+
+    def __init__(self):
+        self.runs = {}
+        self.counter = None
+
+    def measure(self, name: str, operation, *args, is_cold: bool = False, is_checked: bool = True):
+        """
+        Runs and times the operation. The run is failed if the operation raises an exception or, if the result is
+        checked, returns a false value.
+        """
+        commands = self.counter.count
+        start = perf_counter()
+        try:
+            result, error = operation(*args), None
+        except Exception as err:
+            result, error = None, err
+        elapsed = perf_counter() - start
+        self.runs.setdefault(name, []).append({'cold': is_cold, 'seconds': elapsed,
+                                               'commands': self.counter.count - commands,
+                                               'failed': error is not None or is_checked and not result})
+        return result
+
+    def summary(self) -> dict:
+        operations = {}
+        for name, runs in self.runs.items():
+            cold = [run for run in runs if run['cold']]
+            warm = [run['seconds'] * 1000 for run in runs if not run['cold']]
+            operations[name] = {
+                'cold_ms': round(cold[0]['seconds'] * 1000, 2) if cold else None,
+                'p50_ms': round(percentile(warm, 50), 2),
+                'p95_ms': round(percentile(warm, 95), 2),
+                'p99_ms': round(percentile(warm, 99), 2),
+                'commands': round(mean(run['commands'] for run in runs), 1),
+                'runs': len(runs),
+                'failures': sum(run['failed'] for run in runs)}
+        return operations
+
+
+def run_cycle(faucet, site: MockFaucetSite, recorder: Recorder, is_cold: bool):
+    """
+    Runs and times one user cycle.
+    """
+    measure = recorder.measure
+    site.reset()
+    measure('open', faucet.open, site.url, is_cold=is_cold)
+    measure('close_cookie_warning_banner', faucet.close_cookie_warning_banner, is_cold=is_cold)
+    measure('sign_in', faucet.sign_in, 'user@example.com', 'password', is_cold=is_cold)
+    measure('close_notification_modal', faucet.close_notification_modal, is_cold=is_cold)
+    for name in PROPERTIES:
+        measure(name, getattr, faucet, name, is_cold=is_cold, is_checked=False)
+    measure('snapshot', faucet.snapshot, is_cold=is_cold, is_checked=False)
+    measure('load_bonus_table', faucet.load_bonus_table, is_cold=is_cold)
+    for name in BONUS_PROPERTIES:
+        measure(name, getattr, faucet, name, is_cold=is_cold, is_checked=False)
+    measure('activate_bonuses', faucet.activate_bonuses, {'btc': 10, 'lt': 1}, is_cold=is_cold)
+    measure('play_free_play', faucet.play_free_play, is_cold=is_cold)
+    for name in WINNING_PROPERTIES:
+        measure(name, getattr, faucet, name, is_cold=is_cold, is_checked=False)
+    measure('close_after_free_play_modal', faucet.close_after_free_play_modal, is_cold=is_cold)
+    measure('sign_out', faucet.sign_out, is_cold=is_cold)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns the list of regressions of the results relative to the baseline.
+    """
+    regressions = []
+    for name, current in results['operations'].items():
+        previous = baseline.get('operations', {}).get(name)
+        if not previous:
+            continue
+        for key in ('p95_ms', 'commands'):
+            if previous[key] and current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f'{name}: {key} {previous[key]} => {current[key]}')
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='End-to-end latency benchmark of the faucet operations.')
+    parser.add_argument('--iterations', type=int, default=20, help='number of user cycles (20 by default)')
+    parser.add_argument('--settings', default='settings', help='settings module ("settings" by default)')
+    parser.add_argument('--wait-engine', default='', help='wait engine (from the settings by default)')
+    parser.add_argument('--latency', type=float, default=0.02, help='mock site response latency, s (0.02 by default)')
+    parser.add_argument('--api-latency', type=float, default=0.05, help='mock site XHR latency, s (0.05 by default)')
+    parser.add_argument('--json', default='', help='path to save the results in JSON format')
+    parser.add_argument('--baseline', default='', help='path to the results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed regression (0.2 (20%%) by default)')
+    args = parser.parse_args()
+    import core
+    kwds = faucet_kwds(args.settings, **({'wait_engine': args.wait_engine} if args.wait_engine else {}))
+    recorder = Recorder()
+    started = perf_counter()
+    with MockFaucetSite(play_interval=0, latency=args.latency, api_latency=args.api_latency) as site:
+        faucet = core.FreeBitcoinFaucet(**kwds)
+        if not faucet:
+            print('FAIL: the faucet object could not be created.')
+            return 1
+        try:
+            recorder.counter = CommandCounter(faucet._driver)
+            for iteration in range(args.iterations):
+                run_cycle(faucet, site, recorder, iteration == 0)
+        finally:
+            faucet.quit()
+    results = {'meta': {'date': strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+                        'platform': platform.platform(), 'browser': kwds['browser_name'],
+                        'wait_engine': kwds['wait_engine'], 'probe_absent': kwds['probe_absent'],
+                        'use_snapshot': kwds['use_snapshot'], 'iterations': args.iterations,
+                        'latency': args.latency, 'api_latency': args.api_latency},
+               'wall_s': round(perf_counter() - started, 3),
+               'operations': recorder.summary()}
+    print(f'{"operation":<30}{"cold ms":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"cmds":>8}{"fail":>6}')
+    for name, item in results['operations'].items():
+        print(f'{name:<30}{item["cold_ms"] or 0:>10.1f}{item["p50_ms"]:>10.1f}{item["p95_ms"]:>10.1f}'
+              f'{item["p99_ms"]:>10.1f}{item["commands"]:>8.1f}{item["failures"]:>6}')
+    print(f'Wall-clock time: {results["wall_s"]} s')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    is_failed = any(item['failures'] for item in results['operations'].values())
+    if is_failed:
+        print('FAIL: some operations failed.')
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION: {regression}')
+        is_failed = is_failed or bool(regressions)
+    return int(is_failed)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1041 @@
+#!/usr/bin/env python3 -B
+"""
+In-process fake WebDriver for microbenchmarks and profiling of the page-object logic of the core module.
+
+The fake replaces only the transport of the Selenium remote driver: the commands built by Selenium (find element, get
+property, execute script, switch to frame, etc.) are executed by a command executor on top of a small in-memory DOM
+instead of being sent to a driver process, and the errors are reported in the W3C format, so that Selenium raises its
+usual exceptions. The pages come from the local mock of the site (rendered in-process, no HTTP), and the behaviour of
+the page scripts (buttons, tabs, modal windows, forms, API calls) is ported to Python. Timers and API calls complete
+synchronously, so the page is always settled.
+
+Supported: CSS selectors (tag, #id, .class, [attr], [attr="v"], [attr^="v"], [attr*="v"], descendant and child
+combinators, groups), the XPath subset used by the core module (//*[...], child, descendant:: and following-sibling::
+steps with @attr=, contains(), starts-with() and position predicates), link text, frames, cookies, local storage and
+the scripts run by the core module. Other scripts (including execute_async_script) fail with WebDriverException, so
+use the "polling" wait engine ("observer" falls back to polling).
+
+    from functools import partial
+    site = MockFaucetSite(play_interval=0)
+    faucet = core.FreeBitcoinFaucet(driver_type=partial(FakeWebDriver, site), wait_engine='polling', ...)
+
+The fake browser can also be served over the W3C WebDriver HTTP protocol like a driver process (FakeDriverServer), to
+compare the transports of the commands.
+"""
+import re
+import json
+import threading
+from time import time
+from itertools import count
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+from socketserver import ThreadingMixIn
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+from selenium.webdriver.remote.webelement import getAttribute_js, isDisplayed_js
+
+import _common  # noqa: F401 (adds the program folder to sys.path)
+from w3c import COMMANDS
+from mock_site import SESSION_COOKIE, MockFaucetSite
+
+ELEMENT_KEY = 'element-6066-11e4-a52e-4f735466cecf'
+VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'wbr'))
+HIDDEN_TAGS = frozenset(('head', 'meta', 'title', 'script', 'style', 'link'))
+DEFAULT_DISPLAY = {'span': 'inline', 'a': 'inline', 'iframe': 'inline', 'label': 'inline', 'b': 'inline',
+                   'button': 'inline-block', 'input': 'inline-block', 'li': 'list-item'}
+CLICK_SCRIPT = 'arguments[0].click();'
+GET_ATTRIBUTE_SCRIPT = f'return ({getAttribute_js}).apply(null, arguments);'
+IS_DISPLAYED_SCRIPT = f'return ({isDisplayed_js}).apply(null, arguments);'
+
+
+class FakeError(Exception):
+    """
+    WebDriver error reported to Selenium in the W3C format.
+    """
+
+    def __init__(self, error: str, message: str, status: int = 500):
+        super().__init__(message)
+        self.error, self.message, self.status = error, message, status
+
+
+class Node:
+    """
+    Element of the in-memory DOM. Text is kept as str children.
+    """
+    __slots__ = ('tag', 'attrs', 'style', 'children', 'parent', 'document', 'value', 'ref', 'frame_document')
+
+    def __init__(self, tag: str, attrs: dict = None, document: 'Document' = None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.style = _parse_style(self.attrs.pop('style', ''))
+        self.children = []
+        self.parent = None
+        self.document = document
+        self.value = self.attrs.get('value', '')
+        self.ref = None
+        self.frame_document = None
+
+    def __repr__(self):
+        return f'<{self.tag}{"".join(f" {k}={v!r}" for k, v in self.attrs.items())}>'
+
+    @property
+    def classes(self) -> list:
+        return self.attrs.get('class', '').split()
+
+    def elements(self) -> list:
+        return [child for child in self.children if isinstance(child, Node)]
+
+    def descendants(self) -> list:
+        nodes, stack = [], [child for child in reversed(self.children) if isinstance(child, Node)]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            stack.extend(child for child in reversed(node.children) if isinstance(child, Node))
+        return nodes
+
+    def text_content(self) -> str:
+        return ''.join(child if isinstance(child, str) else child.text_content() for child in self.children)
+
+    def set_text(self, text):
+        self.children = [str(text)] if str(text) else []
+
+    def set_inner_html(self, html: str):
+        for child in self.children:
+            if isinstance(child, Node):
+                child.parent = None
+        self.children = []
+        _TreeBuilder(self.document, self).feed_all(html)
+
+    def is_attached(self) -> bool:
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return node is self.document.root
+
+    def display(self) -> str:
+        if self.tag in HIDDEN_TAGS:
+            return 'none'
+        return self.style.get('display') or DEFAULT_DISPLAY.get(self.tag, 'block')
+
+    def is_displayed(self) -> bool:
+        node = self
+        while node is not None and node.tag != '#document':
+            if node.display() == 'none' or node.style.get('visibility') == 'hidden' or \
+                    node.tag == 'input' and node.attrs.get('type') == 'hidden':
+                return False
+            node = node.parent
+        return True
+
+    def next_element_sibling(self):
+        siblings = self.parent.elements() if self.parent else []
+        index = siblings.index(self)
+        return siblings[index + 1] if index + 1 < len(siblings) else None
+
+    def get_attribute(self, name: str):
+        if name == 'style':
+            return '; '.join(f'{key}: {value}' for key, value in self.style.items()) + (';' if self.style else '')
+        if name == 'value' and self.tag in ('input', 'textarea', 'select'):
+            return self.value
+        return self.attrs.get(name)
+
+    def get_property(self, name: str):
+        if name == 'textContent':
+            return self.text_content()
+        if name in ('innerText', 'outerText'):
+            return _visible_text(self)
+        if name == 'value':
+            return self.value if self.tag in ('input', 'textarea', 'select', 'button') else None
+        if name == 'id':
+            return self.attrs.get('id', '')
+        if name == 'className':
+            return self.attrs.get('class', '')
+        if name in ('tagName', 'nodeName'):
+            return self.tag.upper()
+        if name in ('checked', 'disabled', 'selected'):
+            return name in self.attrs
+        return self.attrs.get(name)
+
+
+class Document:
+    """
+    In-memory document (or frame document).
+    """
+
+    def __init__(self, url: str, html: str):
+        self.url = url
+        self.root = Node('#document', document=self)
+        _TreeBuilder(self, self.root).feed_all(html)
+        self.body = next((node for node in self.root.descendants() if node.tag == 'body'), self.root)
+        title = next((node for node in self.root.descendants() if node.tag == 'title'), None)
+        self.title = title.text_content().strip() if title else ''
+
+    def get_element_by_id(self, element_id: str):
+        return next((node for node in self.root.descendants() if node.attrs.get('id') == element_id), None)
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self, document: Document, root: Node):
+        super().__init__(convert_charrefs=True)
+        self.document = document
+        self.stack = [root]
+        self.raw_text = False
+
+    def feed_all(self, html: str):
+        self.feed(html)
+        self.close()
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {name: value or '' for name, value in attrs}, self.document)
+        node.parent = self.stack[-1]
+        node.parent.children.append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+        self.raw_text = tag in ('script', 'style')
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].tag == tag:
+                del self.stack[index:]
+                break
+        self.raw_text = False
+
+    def handle_data(self, data):
+        if not self.raw_text and (data.strip() or len(self.stack) > 1):
+            self.stack[-1].children.append(data)
+
+
+def _parse_style(style: str) -> dict:
+    items = (item.split(':', 1) for item in style.split(';') if ':' in item)
+    return {name.strip().lower(): value.strip() for name, value in items}
+
+
+def _visible_text(node: Node) -> str:
+    parts = []
+
+    def collect(current):
+        for child in current.children:
+            if isinstance(child, str):
+                parts.append(child)
+            elif child.display() != 'none':
+                collect(child)
+
+    collect(node)
+    return ' '.join(''.join(parts).split())
+
+
+# CSS selectors
+
+_CSS_TOKEN = re.compile(r'\s*([>+~,])\s*|\s+|([#.]?[-\w*]+)|\[\s*([-\w]+)\s*(?:([\^*$~|]?=)\s*'
+                        r'(?:"((?:[^"\\]|\\.)*)"|\'((?:[^\'\\]|\\.)*)\'|([-\w]+)))?\s*\]')
+
+
+def _parse_css(selector: str) -> list:
+    """
+    Parses the selector into groups of [(combinator, [simple selectors]), ...].
+    """
+    groups, compounds, simple, combinator, position = [], [], [], ' ', 0
+    selector = selector.strip()
+    while position < len(selector):
+        match = _CSS_TOKEN.match(selector, position)
+        if not match or match.end() == position:
+            raise FakeError('invalid selector', f'Unsupported CSS selector: {selector}', 400)
+        position = match.end()
+        operator, name, attribute = match.group(1), match.group(2), match.group(3)
+        if name or attribute:
+            if name:
+                simple.append(('id', name[1:]) if name[0] == '#' else ('class', name[1:]) if name[0] == '.' else
+                              ('tag', name.lower()))
+            else:
+                value = next((v for v in match.group(5, 6, 7) if v is not None), None)
+                simple.append(('attr', attribute, match.group(4), value and value.replace('\\"', '"')))
+            continue
+        if simple:
+            compounds.append((combinator, simple))
+            simple, combinator = [], ' '
+        if operator == ',':
+            groups.append(compounds)
+            compounds = []
+        elif operator:
+            combinator = operator
+    if simple:
+        compounds.append((combinator, simple))
+    if compounds:
+        groups.append(compounds)
+    if not groups:
+        raise FakeError('invalid selector', f'Empty CSS selector: {selector!r}', 400)
+    return groups
+
+
+def _match_simple(node: Node, simple: list) -> bool:
+    for item in simple:
+        kind = item[0]
+        if kind == 'tag':
+            if item[1] != '*' and node.tag != item[1]:
+                return False
+        elif kind == 'id':
+            if node.attrs.get('id') != item[1]:
+                return False
+        elif kind == 'class':
+            if item[1] not in node.classes:
+                return False
+        else:
+            actual, operator, value = node.get_attribute(item[1]), item[2], item[3]
+            if actual is None or operator == '=' and actual != value or \
+                    operator == '^=' and not actual.startswith(value) or \
+                    operator == '*=' and value not in actual or operator == '$=' and not actual.endswith(value) or \
+                    operator == '~=' and value not in actual.split():
+                return False
+    return True
+
+
+def _match_compounds(node: Node, compounds: list, scope: Node = None) -> bool:
+    combinator, simple = compounds[-1]
+    if not _match_simple(node, simple):
+        return False
+    if len(compounds) == 1:
+        return True
+    if combinator == '>':
+        parent = node.parent
+        return parent is not None and parent is not scope and parent.tag != '#document' and \
+            _match_compounds(parent, compounds[:-1], scope)
+    if combinator in '+~':
+        siblings = node.parent.elements() if node.parent else []
+        previous = siblings[:siblings.index(node)]
+        candidates = previous[-1:] if combinator == '+' else previous
+        return any(_match_compounds(sibling, compounds[:-1], scope) for sibling in candidates)
+    ancestor = node.parent
+    while ancestor is not None and ancestor.tag != '#document':
+        if _match_compounds(ancestor, compounds[:-1], scope):
+            return True
+        ancestor = ancestor.parent
+    return False
+
+
+_css_cache = {}
+
+
+def css_select(root: Node, selector: str) -> list:
+    groups = _css_cache.get(selector)
+    if groups is None:
+        groups = _css_cache[selector] = _parse_css(selector)
+    return [node for node in root.descendants() if any(_match_compounds(node, compounds) for compounds in groups)]
+
+
+def css_matches(node: Node, selector: str) -> bool:
+    groups = _css_cache.get(selector)
+    if groups is None:
+        groups = _css_cache[selector] = _parse_css(selector)
+    return any(_match_compounds(node, compounds) for compounds in groups)
+
+
+# XPath subset
+
+_XPATH_STEP = re.compile(r'(?:(child|descendant|descendant-or-self|following-sibling|parent|self)::)?([-\w*]+|\.\.|\.)'
+                         r'((?:\[[^\]]*\])*)$')
+_XPATH_PREDICATE = re.compile(r'\[([^\]]*)\]')
+_XPATH_TEST = re.compile(r'^\s*(?:@([-\w]+)\s*=\s*["\']([^"\']*)["\']|(contains|starts-with)\(\s*@([-\w]+)\s*,\s*'
+                         r'["\']([^"\']*)["\']\s*\)|(\d+)|@([-\w]+))\s*$')
+
+
+def _split_xpath(expression: str) -> list:
+    """
+    Splits the expression into steps ("//" becomes a descendant-or-self::node() step).
+    """
+    steps, current, depth, index = [], '', 0, 0
+    while index < len(expression):
+        char = expression[index]
+        depth += (char == '[') - (char == ']')
+        if char == '/' and not depth:
+            if current:
+                steps.append(current)
+                current = ''
+            if expression.startswith('//', index):
+                steps.append('descendant-or-self::node()')
+                index += 1
+        else:
+            current += char
+        index += 1
+    if current:
+        steps.append(current)
+    return steps
+
+
+_xpath_cache = {}
+
+
+def _parse_xpath(expression: str) -> tuple:
+    parsed = _xpath_cache.get(expression)
+    if parsed is not None:
+        return parsed
+    is_absolute = expression.startswith('/')
+    steps = []
+    for step in _split_xpath(expression):
+        if step == 'descendant-or-self::node()':
+            steps.append(('descendant-or-self', '*', []))
+            continue
+        match = _XPATH_STEP.match(step)
+        if not match:
+            raise FakeError('invalid selector', f'Unsupported XPath expression: {expression}', 400)
+        axis, name, predicates = match.groups()
+        if name == '.':
+            axis, name = 'self', '*'
+        elif name == '..':
+            axis, name = 'parent', '*'
+        tests = []
+        for predicate in _XPATH_PREDICATE.findall(predicates):
+            test = _XPATH_TEST.match(predicate)
+            if not test:
+                raise FakeError('invalid selector', f'Unsupported XPath predicate: [{predicate}]', 400)
+            tests.append(test.groups())
+        axis = axis or 'child'
+        if axis == 'child' and steps and steps[-1] == ('descendant-or-self', '*', []) and \
+                not any(test[5] for test in tests):  # "//name" without a position is "descendant::name"
+            steps[-1] = ('descendant', name.lower(), tests)
+        else:
+            steps.append((axis, name.lower(), tests))
+    parsed = _xpath_cache[expression] = (is_absolute, steps)
+    return parsed
+
+
+def _xpath_axis(node: Node, axis: str) -> list:
+    if axis == 'child':
+        return node.elements()
+    if axis == 'descendant':
+        return list(node.descendants())
+    if axis == 'descendant-or-self':
+        return [node] + list(node.descendants())
+    if axis == 'following-sibling':
+        siblings = node.parent.elements() if node.parent else []
+        return siblings[siblings.index(node) + 1:]
+    if axis == 'parent':
+        return [node.parent] if node.parent is not None else []
+    return [node]
+
+
+def _xpath_test(node: Node, test: tuple) -> bool:
+    name, value, function, function_name, function_value, _, has_name = test
+    if name:
+        return node.attrs.get(name) == value
+    if function:
+        actual = node.attrs.get(function_name)
+        return actual is not None and (function_value in actual if function == 'contains' else
+                                       actual.startswith(function_value))
+    return has_name in node.attrs
+
+
+def xpath_select(context: Node, expression: str) -> list:
+    is_absolute, steps = _parse_xpath(expression)
+    nodes = [context.document.root if is_absolute else context]
+    for axis, name, tests in steps:
+        selected, seen = [], set()
+        for node in nodes:
+            candidates = [c for c in _xpath_axis(node, axis) if (name in ('*', 'node()') or c.tag == name) and
+                          c.tag != '#document' or axis == 'descendant-or-self' and c.tag == '#document']
+            for test in tests:
+                if test[5]:
+                    position = int(test[5])
+                    candidates = candidates[position - 1:position]
+                else:
+                    candidates = [c for c in candidates if _xpath_test(c, test)]
+            for candidate in candidates:
+                if id(candidate) not in seen:
+                    seen.add(id(candidate))
+                    selected.append(candidate)
+        nodes = selected
+    if len(nodes) < 2:
+        return [node for node in nodes if node.tag != '#document']
+    order = {id(node): index for index, node in enumerate(context.document.root.descendants())}
+    return sorted((node for node in nodes if node.tag != '#document'), key=lambda node: order.get(id(node), -1))
+
+
+class FakeBrowser:
+    """
+    Command executor on top of the in-memory DOM of the mock site pages.
+    """
+
+    def __init__(self, site: MockFaucetSite, capabilities: dict = None):
+        self.site = site
+        self.capabilities = {'browserName': 'fake', 'browserVersion': '1.0', 'platformName': 'python',
+                             'acceptInsecureCerts': False, 'pageLoadStrategy': 'normal',
+                             'timeouts': {'implicit': 0, 'pageLoad': 300000, 'script': 30000}}
+        self.capabilities.update(capabilities or {})
+        self.document = None
+        self.frame = None
+        self.cookies = {}
+        self.local_storage = {}
+        self.commands = 0
+        self.__refs = {}
+        self.__ref_ids = count(1)
+        self.__next_play_at = 0
+        self.__countdown = None
+        self.__bonuses_loaded = False
+        self.__handlers = (('a.cc_btn', self._on_cookie_banner), ('div.pushpad_deny_button', self._on_notification),
+                           ('a.close-reveal-modal', self._on_after_play_modal),
+                           ('.login_menu_button', self._on_login_menu), ('.signup_menu_button', self._on_signup_menu),
+                           ('#login_button', self._on_login), ('a.logout_link', self._on_logout),
+                           ('ul.tabs a', self._on_tab), ('input.setting_checkbox', self._on_checkbox),
+                           ('#play_without_captchas_button', self._on_play_without_captcha),
+                           ('#play_with_captcha_button', self._on_play_with_captcha),
+                           ('#free_play_form_button', self._on_free_play),
+                           ('button.reward_link_redeem_button_style', self._on_bonus))
+        self.__scripts = {CLICK_SCRIPT: self._script_click, GET_ATTRIBUTE_SCRIPT: self._script_get_attribute,
+                          IS_DISPLAYED_SCRIPT: self._script_is_displayed,
+                          'return Object.assign({}, window.localStorage);': lambda args: dict(self.local_storage),
+                          'return document.readyState;': lambda args: 'complete',
+                          'return document.title;': lambda args: self.document.title if self.document else ''}
+
+    # Command executor interface
+
+    def execute(self, command: str, params: dict) -> dict:
+        self.commands += 1
+        try:
+            handler = getattr(self, f'_cmd_{command}', None)
+            if handler is None:
+                raise FakeError('unsupported operation', f'Command "{command}" is not supported by the fake driver.')
+            return {'value': handler(params or {})}
+        except FakeError as err:
+            return {'status': err.status, 'value': json.dumps({'value': {'error': err.error, 'message': err.message,
+                                                                          'stacktrace': ''}})}
+
+    def close(self):
+        pass
+
+    # Helpers
+
+    @property
+    def context(self) -> Document:
+        document = self.frame or self.document
+        if document is None:
+            raise FakeError('no such window', 'No page is open.', 404)
+        return document
+
+    def _wrap(self, node: Node) -> dict:
+        if node.ref is None:
+            node.ref = f'fake-{next(self.__ref_ids)}'
+            self.__refs[node.ref] = node
+        return {ELEMENT_KEY: node.ref}
+
+    def _node(self, reference) -> Node:
+        ref = reference.get(ELEMENT_KEY) or reference.get('ELEMENT') if isinstance(reference, dict) else reference
+        node = self.__refs.get(ref)
+        if node is None:
+            raise FakeError('no such element', f'Unknown element reference "{ref}".', 404)
+        if not node.is_attached() or node.document is not self.context:
+            raise FakeError('stale element reference', 'The element is not attached to the page document.', 404)
+        return node
+
+    def _unwrap_args(self, args):
+        if isinstance(args, list):
+            return [self._unwrap_args(arg) for arg in args]
+        if isinstance(args, dict):
+            if ELEMENT_KEY in args or 'ELEMENT' in args:
+                return self._node(args)
+            return {key: self._unwrap_args(value) for key, value in args.items()}
+        return args
+
+    def _find(self, root: Node, using: str, value: str) -> list:
+        if using == 'css selector':
+            return css_select(root, value)
+        if using == 'xpath':
+            return xpath_select(root, value)
+        if using in ('link text', 'partial link text'):
+            return [node for node in root.descendants() if node.tag == 'a' and
+                    (_visible_text(node) == value if using == 'link text' else value in _visible_text(node))]
+        raise FakeError('invalid argument', f'Unsupported locator strategy "{using}".', 400)
+
+    def _find_one(self, root: Node, params: dict) -> dict:
+        nodes = self._find(root, params.get('using'), params.get('value'))
+        if not nodes:
+            raise FakeError('no such element', f'Unable to locate element: {params.get("value")}', 404)
+        return self._wrap(nodes[0])
+
+    def _load(self, url: str):
+        self.frame = None
+        self.__refs.clear()
+        path = urlsplit(url).path or '/'
+        site = self.site
+        with site.lock:
+            site.requests.append(('GET', path))
+            if path in ('/', '/index.html'):
+                is_authenticated = site.is_authenticated(self._cookie_header())
+                html = site.render_page(is_authenticated)
+            elif path == '/robots.txt':
+                is_authenticated, html = False, '<html><body><pre>User-agent: *\nDisallow: /api/\n</pre></body></html>'
+            else:
+                is_authenticated, html = False, '<html><body><pre>Not found</pre></body></html>'
+        self.document = Document(url, html)
+        self.__bonuses_loaded = False
+        self.__countdown = None
+        if is_authenticated:
+            self.__next_play_at = site.state['next_play_at']
+            self._tick()
+
+    def _cookie_header(self) -> str:
+        return '; '.join(f'{cookie["name"]}={cookie["value"]}' for cookie in self.cookies.values())
+
+    def _api(self, path: str, data: dict) -> tuple:
+        site = self.site
+        with site.lock:
+            site.requests.append(('POST', path))
+            status, response, cookie = site.api(path, data, self._cookie_header())
+        if cookie:
+            self.cookies[SESSION_COOKIE] = {'name': SESSION_COOKIE, 'value': cookie, 'path': '/', 'domain': '',
+                                            'secure': False, 'httpOnly': False}
+        elif cookie == '':
+            self.cookies.pop(SESSION_COOKIE, None)
+        return status, response
+
+    def _by_id(self, element_id: str):
+        return self.document.get_element_by_id(element_id)
+
+    def _show(self, element_id: str, display: str = 'block'):
+        node = self._by_id(element_id)
+        if node is not None:
+            node.style['display'] = display
+
+    def _hide(self, element_id: str):
+        self._show(element_id, 'none')
+
+    def _tick(self):
+        """
+        Port of the countdown timer of the page (evaluated before every command instead of every second).
+        """
+        left = max(round(self.__next_play_at - time()), 0)
+        if left == self.__countdown:
+            return
+        self.__countdown = left
+        time_remaining = self._by_id('time_remaining') if self.document else None
+        if time_remaining is None:
+            return
+        amounts = css_select(time_remaining, 'span.countdown_amount')
+        if left > 0:
+            if not amounts:
+                time_remaining.set_inner_html(
+                    '<span class="countdown_section"><span class="countdown_amount"></span> Min</span>'
+                    '<span class="countdown_section"><span class="countdown_amount"></span> Sec</span>')
+                amounts = css_select(time_remaining, 'span.countdown_amount')
+            amounts[0].set_text(left // 60)
+            amounts[1].set_text(left % 60)
+            self._hide('free_play_form_button')
+        elif amounts:
+            time_remaining.set_inner_html('')
+            self._show('free_play_form_button', 'inline-block')
+
+    def _click(self, node: Node):
+        if node.document is not self.document:  # the captcha frame
+            if node.attrs.get('role') == 'checkbox':
+                node.attrs['aria-checked'] = 'true'
+            return
+        current = node
+        while current is not None and current.tag != '#document':
+            for selector, handler in self.__handlers:
+                if css_matches(current, selector):
+                    handler(current)
+                    return
+            current = current.parent
+
+    # Page behaviour (ported from the scripts of the mock site)
+
+    def _on_cookie_banner(self, node: Node):
+        for banner in css_select(self.document.root, 'div.cc_banner-wrapper'):
+            banner.style['display'] = 'none'
+
+    def _on_notification(self, node: Node):
+        self._hide('push_notification_modal')
+
+    def _on_after_play_modal(self, node: Node):
+        self._hide('myModal22')
+
+    def _on_login_menu(self, node: Node):
+        self._hide('signup_form')
+        self._show('login_form')
+
+    def _on_signup_menu(self, node: Node):
+        self._hide('login_form')
+        self._show('signup_form')
+
+    def _on_login(self, node: Node):
+        status, response = self._api('/api/login', {'address': self._by_id('login_form_btc_address').value,
+                                                    'password': self._by_id('login_form_password').value,
+                                                    'totp': self._by_id('login_form_2fa').value})
+        if status == 200:
+            self._load(self.document.url)
+        else:
+            self._by_id('reward_point_redeem_result_container_div').set_text(response.get('error') or 'Login failed')
+
+    def _on_logout(self, node: Node):
+        self._api('/api/logout', {})
+        self._load(self.document.url)
+
+    def _on_tab(self, node: Node):
+        tab = node.classes[0].replace('link', 'tab') if node.classes else ''
+        for page in css_select(self.document.root, 'div.page_tabs'):
+            page.style['display'] = 'block' if page.attrs.get('id') == tab else 'none'
+        if tab == 'rewards_tab' and not self.__bonuses_loaded:
+            self.__bonuses_loaded = True
+            status, response = self._api('/api/bonuses', {})
+            for table_id, html in response.get('tables', {}).items():
+                self._by_id(table_id).set_inner_html(html)
+
+    def _on_checkbox(self, node: Node):
+        state = node.next_element_sibling()
+        checked = 'checked' not in state.classes
+        state.attrs['class'] = 'checkbox checked' if checked else 'checkbox'
+        self._api('/api/settings', {'name': node.attrs.get('id'), 'value': checked})
+
+    def _on_play_without_captcha(self, node: Node):
+        self._hide('free_play_recaptcha')
+        self._hide('play_without_captchas_button')
+        self._show('play_with_captcha_button', 'inline-block')
+
+    def _on_play_with_captcha(self, node: Node):
+        self._hide('play_with_captcha_button')
+        self._show('free_play_recaptcha')
+        self._show('play_without_captchas_button', 'inline-block')
+
+    def _on_free_play(self, node: Node):
+        captcha = self._by_id('free_play_recaptcha')
+        frames = css_select(captcha, 'iframe') if captcha is not None else []
+        solved = False
+        if frames and captcha.style.get('display') != 'none':
+            checkbox = self._frame_document(frames[0]).get_element_by_id('checkbox')
+            solved = checkbox is not None and checkbox.attrs.get('aria-checked') == 'true'
+        status, response = self._api('/api/free_play', {'captcha': solved})
+        if status != 200:
+            return
+        for element_id, key in (('winnings', 'winning_btc'), ('fp_reward_points_won', 'winning_rp'),
+                                 ('fp_lottery_tickets_won', 'winning_lt'), ('balance', 'balance_btc'),
+                                 ('user_reward_points', 'balance_rp'), ('user_lottery_tickets', 'balance_lt')):
+            self._by_id(element_id).set_text(response[key])
+        self._by_id('fp_bonus_wins').set_inner_html(
+            f'<a href="#">{response["winning_wof"]} spins</a>' if response['winning_wof'] else '')
+        self._show('free_play_result')
+        self._hide('free_play_form_button')
+        if response['modal']:
+            self._show('myModal22')
+        self.__next_play_at = time() + response['countdown']
+        self.__countdown = None
+        self._tick()
+
+    def _on_bonus(self, node: Node):
+        status, response = self._api('/api/bonus', {'table': node.attrs.get('data-table'),
+                                                    'key': int(node.attrs.get('data-key', 0))})
+        if status != 200:
+            return
+        self._by_id(response['container']).set_inner_html(response['html'])
+        self._show(response['container'])
+        self._by_id('user_reward_points').set_text(response['balance_rp'])
+
+    def _frame_document(self, node: Node) -> Document:
+        if node.frame_document is None:
+            node.frame_document = Document('about:srcdoc', node.attrs.get('srcdoc', ''))
+        return node.frame_document
+
+    # Scripts
+
+    def _script_click(self, args: list):
+        self._click(args[0])
+
+    def _script_get_attribute(self, args: list):
+        node, name = args[0], args[1]
+        if name in ('checked', 'selected', 'disabled'):
+            return 'true' if node.get_property(name) else None
+        value = node.get_attribute(name)
+        if value is None and name in ('value', 'id', 'className', 'textContent', 'innerText'):
+            value = node.get_property(name)
+        return value
+
+    @staticmethod
+    def _script_is_displayed(args: list):
+        return args[0].is_displayed()
+
+    def _script_snapshot(self, script: str, args: list) -> dict:
+        """
+        Evaluates the snapshot script of the core module: an object literal of text('selector') values and of the
+        lists of the text content of document.querySelectorAll('selector').
+        """
+        root, values = self.context.root, {}
+        for name, selector in re.findall(r"(\w+): text\('([^']*)'\)", script):
+            nodes = css_select(root, selector)
+            values[name] = nodes[0].text_content() if nodes else ''
+        for name, selector in re.findall(r"(\w+): Array\.prototype\.map\.call\(\s*document\.querySelectorAll\("
+                                         r"'([^']*)'\)", script):
+            values[name] = [node.text_content() for node in css_select(root, selector)]
+        return values
+
+    def _script_settled(self, script: str, args: list):
+        """
+        Evaluates the "settled" condition of EC.probe: the document is loaded and no request is in flight (always true
+        here), so the condition is met if the container is present.
+        """
+        root = args[0] if args and isinstance(args[0], Node) else None
+        expression = re.search(r'return settled\((.*)\) \? \{absent: true\} : false;', script).group(1)
+        match = re.match(r'root\.querySelector\((".*")\)$', expression)
+        if match:
+            container = css_select(root or self.context.root, json.loads(match.group(1)))
+        else:
+            match = re.match(r'xpath\((".*"), root, false\)$', expression)
+            container = xpath_select(root or self.context.root, json.loads(match.group(1))) if match else \
+                [root or self.context.body]
+        return {'absent': True} if container else False
+
+    def _script_set_local_storage(self, args: list):
+        self.local_storage.update({key: str(value) for key, value in args[0].items()})
+
+    def _execute_script(self, script: str, args: list):
+        handler = self.__scripts.get(script)
+        if handler is not None:
+            return handler(args)
+        if 'return settled(' in script and 'return value || (settled(' not in script:
+            return self._script_settled(script, args)
+        if 'var text = function (selector)' in script:
+            return self._script_snapshot(script, args)
+        if script.strip().endswith('track();'):
+            return None
+        if 'window.localStorage.setItem(key, arguments[0][key])' in script:
+            return self._script_set_local_storage(args)
+        raise FakeError('unsupported operation', 'Script is not supported by the fake driver.')
+
+    def _result(self, value):
+        if isinstance(value, Node):
+            return self._wrap(value)
+        if isinstance(value, (list, tuple)):
+            return [self._result(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._result(item) for key, item in value.items()}
+        return value
+
+    # Commands
+
+    def _cmd_newSession(self, params: dict) -> dict:
+        return {'sessionId': f'fake-session-{id(self)}', 'capabilities': self.capabilities}
+
+    def _cmd_quit(self, params: dict):
+        self.document = self.frame = None
+        self.cookies.clear()
+
+    _cmd_close = _cmd_quit
+
+    def _cmd_get(self, params: dict):
+        self._load(params['url'])
+
+    def _cmd_refresh(self, params: dict):
+        self._load(self.context.url)
+
+    def _cmd_getTitle(self, params: dict) -> str:
+        self._tick()
+        return self.context.title
+
+    def _cmd_getCurrentUrl(self, params: dict) -> str:
+        return self.document.url if self.document else 'about:blank'
+
+    def _cmd_getPageSource(self, params: dict) -> str:
+        return self.context.root.text_content()
+
+    def _cmd_setTimeouts(self, params: dict):
+        self.capabilities['timeouts'].update({key: value for key, value in params.items() if key != 'sessionId'})
+
+    def _cmd_w3cGetCurrentWindowHandle(self, params: dict) -> str:
+        return 'fake-window-1'
+
+    def _cmd_w3cGetWindowHandles(self, params: dict) -> list:
+        return ['fake-window-1']
+
+    def _cmd_getCookies(self, params: dict) -> list:
+        return [dict(cookie) for cookie in self.cookies.values()]
+
+    def _cmd_addCookie(self, params: dict):
+        cookie = params['cookie']
+        self.cookies[cookie['name']] = dict(cookie, path=cookie.get('path', '/'))
+
+    def _cmd_deleteAllCookies(self, params: dict):
+        self.cookies.clear()
+
+    def _cmd_switchToFrame(self, params: dict):
+        reference = params.get('id')
+        if reference is None:
+            self.frame = None
+            return
+        node = self._node(reference) if isinstance(reference, dict) else None
+        if node is None or node.tag not in ('iframe', 'frame'):
+            raise FakeError('no such frame', f'Unable to locate frame: {reference}', 404)
+        self.frame = self._frame_document(node)
+
+    def _cmd_switchToParentFrame(self, params: dict):
+        self.frame = None
+
+    def _cmd_findElement(self, params: dict) -> dict:
+        self._tick()
+        return self._find_one(self.context.root, params)
+
+    def _cmd_findElements(self, params: dict) -> list:
+        self._tick()
+        return [self._wrap(node) for node in self._find(self.context.root, params.get('using'), params.get('value'))]
+
+    def _cmd_findChildElement(self, params: dict) -> dict:
+        self._tick()
+        return self._find_one(self._node(params['id']), params)
+
+    def _cmd_findChildElements(self, params: dict) -> list:
+        self._tick()
+        return [self._wrap(node) for node in self._find(self._node(params['id']), params.get('using'),
+                                                        params.get('value'))]
+
+    def _cmd_getElementProperty(self, params: dict):
+        self._tick()
+        return self._node(params['id']).get_property(params['name'])
+
+    def _cmd_getElementAttribute(self, params: dict):
+        self._tick()
+        return self._node(params['id']).get_attribute(params['name'])
+
+    def _cmd_getElementValueOfCssProperty(self, params: dict) -> str:
+        self._tick()
+        node = self._node(params['id'])
+        name = params['propertyName']
+        return node.display() if name == 'display' else node.style.get(name, '')
+
+    def _cmd_getElementText(self, params: dict) -> str:
+        self._tick()
+        return _visible_text(self._node(params['id']))
+
+    def _cmd_getElementTagName(self, params: dict) -> str:
+        return self._node(params['id']).tag
+
+    def _cmd_isElementDisplayed(self, params: dict) -> bool:
+        self._tick()
+        return self._node(params['id']).is_displayed()
+
+    def _cmd_isElementSelected(self, params: dict) -> bool:
+        return 'checked' in self._node(params['id']).attrs
+
+    def _cmd_clickElement(self, params: dict):
+        node = self._node(params['id'])
+        if not node.is_displayed():
+            raise FakeError('element not interactable', 'Element is not visible.', 400)
+        self._click(node)
+
+    def _cmd_clearElement(self, params: dict):
+        self._node(params['id']).value = ''
+
+    def _cmd_sendKeysToElement(self, params: dict):
+        node = self._node(params['id'])
+        node.value += params.get('text', '')
+
+    def _cmd_w3cExecuteScript(self, params: dict):
+        self._tick()
+        return self._result(self._execute_script(params['script'], self._unwrap_args(params.get('args', []))))
+
+    _cmd_executeScript = _cmd_w3cExecuteScript
+
+
+class FakeWebDriver(RemoteWebDriver):
+    """
+    Selenium remote driver connected to the in-process fake browser instead of a driver process.
+    """
+
+    def __init__(self, site: MockFaucetSite = None, options=None, desired_capabilities: dict = None, **kwds):
+        """
+        :param site: MockFaucetSite (by default, a new site with default options is created)
+        :param options: browser options (only the capabilities are used)
+        :param desired_capabilities: dict
+        :param kwds: other arguments of the real drivers (executable_path, service_log_path, etc.) are ignored
+        """
+        self.site = site or MockFaucetSite()
+        self.browser = FakeBrowser(self.site)
+        super().__init__(command_executor=self.browser, desired_capabilities=desired_capabilities, options=options)
+
+    @property
+    def name(self) -> str:
+        return 'fake'
+
+
+class _DriverServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _DriverHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self):
+        driver = self.server.driver
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        for method, pattern, command in driver.routes:
+            match = pattern.fullmatch(self.path) if method == self.command else None
+            if match:
+                try:
+                    params = dict(json.loads(body) if body else {}, **match.groupdict())
+                except ValueError:
+                    params = match.groupdict()
+                with driver.lock:
+                    response = driver.browser.execute(command, params)
+                break
+        else:
+            response = {'status': 404, 'value': json.dumps({'value': {
+                'error': 'unknown command', 'message': f'{self.command} {self.path}', 'stacktrace': ''}})}
+        data = (response['value'] if 'status' in response else json.dumps(response)).encode('utf-8')
+        self.send_response(response.get('status', 200))
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_DELETE = _handle
+
+
+class FakeDriverServer:
+    """
+    Fake browser served over the W3C WebDriver HTTP protocol on a local port, like a driver process. Both the Selenium
+    remote connection and the W3C client (w3c.Connection) can be pointed at its URL.
+    """
+
+    def __init__(self, site: MockFaucetSite = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        :param site: MockFaucetSite (by default, a new site with default options is created)
+        :param host: str
+        :param port: int (0 (default) - any free port)
+        """
+        self.site = site or MockFaucetSite()
+        self.browser = FakeBrowser(self.site)
+        self.lock = threading.Lock()
+        self.routes = [(method, re.compile(re.sub(r'\$(\w+)', r'(?P<\1>[^/]+)', path)), command)
+                       for command, (method, path) in COMMANDS.items()]
+        self.__server = _DriverServer((host, port), _DriverHandler)
+        self.__server.driver = self
+        self.__thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeDriverServer':
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__server.serve_forever, name='fake-driver', daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        if self.__thread is not None:
+            self.__server.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__server.server_close()
+
+    def __enter__(self) -> 'FakeDriverServer':
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
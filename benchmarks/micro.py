@@ -0,0 +1,118 @@
+#!/usr/bin/env python3 -B
+"""
+Microbenchmark of the page-object logic of the faucet operations against the in-process fake WebDriver.
+
+There is no browser and no HTTP, so the results show the Python-side cost of the core module (argument validation,
+WebDriverWait, locators, conversions) and of the Selenium client: operations per second, microseconds and WebDriver
+commands per operation. With --profile, the operations are run under cProfile and the top functions are printed.
+
+    python benchmarks/micro.py [--seconds 1] [--operations balance_btc,snapshot] [--use-snapshot] [--trace] [--profile]
+"""
+import sys
+import argparse
+import cProfile
+import pstats
+from functools import partial
+from time import perf_counter
+
+import _common  # noqa: F401 (adds the program folder to sys.path)
+from mock_site import MockFaucetSite
+from fake_webdriver import FakeWebDriver
+
+
+def make_operations(faucet, site: MockFaucetSite) -> dict:
+    """
+    Returns the benchmarked operations: name => callable. Each operation leaves the page in the same state.
+    """
+
+    def toggle_checkbox():
+        faucet.state_free_play_sound = not faucet.state_free_play_sound
+
+    def free_play():
+        site.state['next_play_at'] = 0
+        faucet._driver.refresh()
+        faucet.play_free_play()
+        faucet.close_after_free_play_modal()
+        site.state['next_play_at'] += 3600
+        faucet._driver.refresh()
+
+    def sign_in_out():
+        faucet.sign_out()
+        faucet.sign_in('user@example.com', 'password')
+        faucet.close_notification_modal()
+
+    operations = {name: partial(getattr, faucet, name) for name in (
+        'balance_btc', 'balance_rp', 'balance_lt', 'free_play_countdown', 'free_play_cost', 'user_id', 'email_address',
+        'state_free_play_sound', 'bonuses_btc', 'active_bonus_btc')}
+    operations.update({'is_authenticated': faucet.is_authenticated, 'snapshot': faucet.snapshot,
+                       'title': partial(getattr, faucet, 'title'),
+                       'toggle_checkbox': toggle_checkbox, 'open': partial(faucet.open, site.url),
+                       'free_play': free_play, 'sign_in_out': sign_in_out})
+    return operations
+
+
+def run(operation, seconds: float, commands) -> tuple:
+    """
+    Runs the operation repeatedly for at least the given time and returns (runs, seconds, commands).
+    """
+    runs, start, first_command = 0, perf_counter(), commands()
+    elapsed = 0.0
+    while elapsed < seconds or runs < 3:
+        operation()
+        runs += 1
+        elapsed = perf_counter() - start
+    return runs, elapsed, commands() - first_command
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Microbenchmark of the page-object logic with a fake WebDriver.')
+    parser.add_argument('--seconds', type=float, default=1.0, help='time to run each operation, s (1 by default)')
+    parser.add_argument('--operations', default='', help='comma-separated operations to run (all by default)')
+    parser.add_argument('--use-snapshot', action='store_true', help='read the values from a snapshot')
+    parser.add_argument('--trace', action='store_true', help='trace the WebDriver commands (to measure the overhead)')
+    parser.add_argument('--profile', action='store_true', help='profile the operations with cProfile')
+    parser.add_argument('--top', type=int, default=25, help='number of functions in the profile (25 by default)')
+    args = parser.parse_args()
+    import core
+    site = MockFaucetSite(countdown=3600)
+    faucet = core.FreeBitcoinFaucet(driver_type=partial(FakeWebDriver, site), wait_engine='polling',
+                                    probe_absent=True, use_snapshot=args.use_snapshot, timeout_elem_wait=1,
+                                    trace_commands=args.trace)
+    if not faucet:
+        print('FAIL: the faucet object could not be created.')
+        return 1
+    browser = faucet._driver.browser
+    try:
+        if not (faucet.open(site.url) and faucet.close_cookie_warning_banner() and
+                faucet.sign_in('user@example.com', 'password')):
+            print('FAIL: the mock site could not be opened and signed in.')
+            return 1
+        faucet.close_notification_modal()
+        faucet.load_bonus_table()
+        faucet.activate_bonuses({'btc': 10})
+        faucet._current_page_tab_id('free_play_tab')
+        operations = make_operations(faucet, site)
+        names = [name.strip() for name in args.operations.split(',') if name.strip()] or list(operations)
+        unknown = set(names) - set(operations)
+        if unknown:
+            print(f'Unknown operations: {", ".join(sorted(unknown))}. Available: {", ".join(operations)}.')
+            return 1
+        profiler = cProfile.Profile() if args.profile else None
+        print(f'{"operation":<24}{"ops/s":>10}{"us/op":>12}{"cmds/op":>10}')
+        for name in names:
+            if profiler:
+                profiler.enable()
+            runs, elapsed, commands = run(operations[name], args.seconds, lambda: browser.commands)
+            if profiler:
+                profiler.disable()
+            print(f'{name:<24}{runs / elapsed:>10.0f}{elapsed / runs * 10 ** 6:>12.1f}{commands / runs:>10.1f}')
+        if profiler:
+            pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(args.top)
+    finally:
+        faucet.quit()
+        site.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,577 @@
+#!/usr/bin/env python3 -B
+"""
+Local mock of the faucet site for offline benchmarking and testing.
+
+The mock reproduces the DOM contract the core module depends on (element IDs, classes and the behaviour of the
+buttons, tabs, modal windows and forms), with a configurable free play countdown, captcha, modal windows, bonus tables,
+balances and injected latency. The state of the (single) user account is kept in memory by the server.
+
+    python benchmarks/mock_site.py [--port 8000] [--countdown 0] [--no-captcha] [--latency 0.05] ...
+
+or in code:
+
+    with MockFaucetSite(countdown=0, latency=0.05) as site:
+        faucet = core.FreeBitcoinFaucet(open_url=site.url, ...)
+"""
+import sys
+import json
+import argparse
+import threading
+from time import time, sleep
+from string import Template
+from typing import Union
+from secrets import token_hex
+from http.cookies import SimpleCookie
+from socketserver import ThreadingMixIn
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+SESSION_COOKIE = 'fbsession'
+# Bonus tables: table id => (key text suffix, active bonus container id, [(key, cost in RP), ...])
+DEFAULT_BONUSES = {'fp_bonus_rewards': ('% FREE BTC BONUS', 'bonus_container_fp_bonus',
+                                        [(10, 120), (50, 640), (100, 1320), (500, 3200), (1000, 6400)]),
+                   'free_lott_rewards': (' FREE LOTTERY TICKETS', 'bonus_container_free_lott',
+                                         [(1, 40), (5, 180), (10, 340), (25, 800), (50, 1500), (100, 2800)]),
+                   'free_wof_rewards': (' FREE WHEEL OF FORTUNE SPINS', 'bonus_container_free_wof',
+                                        [(1, 1200), (3, 3300), (5, 5100), (10, 9800)])}
+
+PAGE = Template('''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>FreeBitco.in - Win free bitcoins every hour!</title>
+<style>
+  .page_tabs { padding: 8px; }
+  .reveal-modal, #push_notification_modal { position: fixed; top: 20%; left: 20%; padding: 16px; background: #eee; }
+  .cc_banner-wrapper { position: fixed; bottom: 0; width: 100%; background: #ccc; }
+  .checkbox { display: inline-block; width: 12px; height: 12px; border: 1px solid #333; }
+  .checkbox.checked { background: #333; }
+</style>
+</head>
+<body>
+$assets
+<div id="top_bar">$top_bar</div>
+$content
+$modals
+<script>
+  var api = function (path, data, callback) {
+    var request = new XMLHttpRequest();
+    request.open('POST', path);
+    request.setRequestHeader('Content-Type', 'application/json');
+    request.onload = function () {
+      var response = {};
+      try { response = JSON.parse(request.responseText); } catch (e) {}
+      if (callback) callback(request.status, response);
+    };
+    request.send(JSON.stringify(data || {}));
+  };
+  var byId = function (id) { return document.getElementById(id); };
+  var show = function (id, display) { if (byId(id)) byId(id).style.display = display || 'block'; };
+  var hide = function (id) { if (byId(id)) byId(id).style.display = 'none'; };
+  var onClick = function (selector, handler) {
+    Array.prototype.forEach.call(document.querySelectorAll(selector), function (element) {
+      element.addEventListener('click', function (event) { event.preventDefault(); handler(element, event); });
+    });
+  };
+  onClick('a.cc_btn', function () { setTimeout(function () {
+    document.querySelector('div.cc_banner-wrapper').style.display = 'none'; }, 100); });
+  onClick('div.pushpad_deny_button', function () {
+    setTimeout(function () { hide('push_notification_modal'); }, 100); });
+  onClick('a.close-reveal-modal', function () { setTimeout(function () { hide('myModal22'); }, 100); });
+  $script
+</script>
+</body>
+</html>
+''')
+
+SIGN_SCRIPT = '''
+  onClick('.login_menu_button', function () { hide('signup_form'); show('login_form'); });
+  onClick('.signup_menu_button', function () { hide('login_form'); show('signup_form'); });
+  onClick('#login_button', function () {
+    api('/api/login', {address: byId('login_form_btc_address').value, password: byId('login_form_password').value,
+                       totp: byId('login_form_2fa').value}, function (status, response) {
+      if (status === 200) location.reload();
+      else byId('reward_point_redeem_result_container_div').textContent = response.error || 'Login failed';
+    });
+  });
+'''
+
+ACCOUNT_SCRIPT = Template('''
+  var nextPlayAt = Date.now() + $countdown * 1000, bonusesLoaded = false;
+  onClick('a.logout_link', function () { api('/api/logout', {}, function () { location.reload(); }); });
+  var tick = function () {
+    var left = Math.max(Math.round((nextPlayAt - Date.now()) / 1000), 0), amounts = document.querySelectorAll(
+      '#time_remaining span.countdown_amount');
+    if (left > 0) {
+      if (!amounts.length) byId('time_remaining').innerHTML =
+        '<span class="countdown_section"><span class="countdown_amount"></span> Min</span>' +
+        '<span class="countdown_section"><span class="countdown_amount"></span> Sec</span>';
+      amounts = document.querySelectorAll('#time_remaining span.countdown_amount');
+      amounts[0].textContent = Math.floor(left / 60);
+      amounts[1].textContent = left % 60;
+      hide('free_play_form_button');
+    } else if (amounts.length) {
+      byId('time_remaining').innerHTML = '';
+      show('free_play_form_button', 'inline-block');
+    }
+  };
+  tick();
+  setInterval(tick, 1000);
+  var loadBonuses = function () {
+    if (bonusesLoaded) return;
+    bonusesLoaded = true;
+    api('/api/bonuses', {}, function (status, response) {
+      Object.keys(response.tables || {}).forEach(function (id) { byId(id).innerHTML = response.tables[id]; });
+      onClick('button.reward_link_redeem_button_style', function (element) {
+        api('/api/bonus', {table: element.getAttribute('data-table'), key: Number(element.getAttribute('data-key'))},
+          function (status, response) {
+            if (status !== 200) return;
+            byId(response.container).innerHTML = response.html;
+            show(response.container);
+            byId('user_reward_points').textContent = response.balance_rp;
+          });
+      });
+    });
+  };
+  onClick('ul.tabs a', function (element) {
+    var tab = element.className.split(' ')[0].replace('link', 'tab');
+    Array.prototype.forEach.call(document.querySelectorAll('div.page_tabs'), function (page) {
+      page.style.display = page.id === tab ? 'block' : 'none';
+    });
+    if (tab === 'rewards_tab') loadBonuses();
+  });
+  onClick('input.setting_checkbox', function (element) {
+    var state = element.nextElementSibling, checked = state.className.indexOf('checked') < 0;
+    state.className = checked ? 'checkbox checked' : 'checkbox';
+    api('/api/settings', {name: element.id, value: checked});
+  });
+  onClick('#play_without_captchas_button', function () {
+    hide('free_play_recaptcha');
+    hide('play_without_captchas_button');
+    show('play_with_captcha_button', 'inline-block');
+  });
+  onClick('#play_with_captcha_button', function () {
+    hide('play_with_captcha_button');
+    show('free_play_recaptcha');
+    show('play_without_captchas_button', 'inline-block');
+  });
+  onClick('#test_sound', function () {});
+  onClick('#free_play_form_button', function () {
+    var frame = document.querySelector('#free_play_recaptcha iframe'), captcha = byId('free_play_recaptcha');
+    var solved = frame && captcha.style.display !== 'none' &&
+      frame.contentDocument.getElementById('checkbox').getAttribute('aria-checked') === 'true';
+    api('/api/free_play', {captcha: solved}, function (status, response) {
+      if (status !== 200) return;
+      byId('winnings').textContent = response.winning_btc;
+      byId('fp_reward_points_won').textContent = response.winning_rp;
+      byId('fp_lottery_tickets_won').textContent = response.winning_lt;
+      byId('fp_bonus_wins').innerHTML = response.winning_wof ?
+        '<a href="#">' + response.winning_wof + ' spins</a>' : '';
+      byId('balance').textContent = response.balance_btc;
+      byId('user_reward_points').textContent = response.balance_rp;
+      byId('user_lottery_tickets').textContent = response.balance_lt;
+      show('free_play_result');
+      hide('free_play_form_button');
+      if (response.modal) show('myModal22');
+      nextPlayAt = Date.now() + response.countdown * 1000;
+      tick();
+    });
+  });
+''')
+
+# Images, web fonts and third-party content (ads and trackers, served from the "localhost" host name of the server, so
+# that they are on another host than the site), like the real site has
+ASSETS = Template('''<style>
+  @font-face { font-family: "Mock"; src: url("/assets/font.woff2") format("woff2"); }
+  body { font-family: "Mock", sans-serif; }
+</style>
+<img src="/assets/banner.png" alt="" width="1" height="1">
+<iframe src="$third_party/ads/frame.html" width="1" height="1"></iframe>
+<script async src="$third_party/ads/track.js"></script>''')
+ASSET_TYPES = {'.png': 'image/png', '.woff2': 'font/woff2', '.js': 'application/javascript'}
+
+CAPTCHA_FRAME = ('<div id="checkbox" role="checkbox" aria-checked="false" style="width: 24px; height: 24px; '
+                 'border: 1px solid #333;" onclick="this.setAttribute(\'aria-checked\', \'true\');"></div>')
+
+
+def _escape(value) -> str:
+    return str(value).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def _format_rp(value: int) -> str:
+    return f'{value:,}'
+
+
+class MockFaucetSite:
+    """
+    Mock faucet site served by a local threading HTTP server.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, **kwds):
+        """
+        :param host: str
+        :param port: int (0 (default) - any free port)
+        :param kwds:
+            address: str - account email or BTC address ('' (default) - any non-empty address is accepted)
+            password: str - account password ('' (default) - any non-empty password is accepted)
+            authenticated: bool - the user is signed in from the start (False by default)
+            countdown: int - free play countdown at the start, in seconds (0 (default) - free play is ready)
+            play_interval: int - free play countdown after each play, in seconds (3600 by default)
+            captcha: bool - free play with captcha is selected (True by default), otherwise without captcha
+            free_play_cost: int - cost of a free play without captcha, in RP (8 by default)
+            cookie_banner: bool - show the cookie warning banner (True by default)
+            notification_modal: bool - show the modal notification window (True by default)
+            after_play_modal: bool - show the modal window after free play (True by default)
+            balance_btc: str ('0.00001000' by default)
+            balance_rp: int (2500 by default)
+            balance_lt: int (100 by default)
+            winning_btc: str - free play winning ('0.00000042' by default)
+            winning_rp: int (12 by default)
+            winning_lt: int (8 by default)
+            winning_wof: int (0 by default)
+            bonuses: dict - bonus tables (see DEFAULT_BONUSES)
+            latency: float - delay of every response, in seconds (0 by default)
+            api_latency: float - additional delay of the XHR (API) responses, in seconds (0 by default)
+            assets: int - size of each image, font and third-party resource of the page, in KiB (0 (default) - the
+                          page has no such resources)
+        """
+        self.options = {'address': '', 'password': '', 'authenticated': False, 'countdown': 0, 'play_interval': 3600,
+                        'captcha': True, 'free_play_cost': 8, 'cookie_banner': True, 'notification_modal': True,
+                        'after_play_modal': True, 'balance_btc': '0.00001000', 'balance_rp': 2500, 'balance_lt': 100,
+                        'winning_btc': '0.00000042', 'winning_rp': 12, 'winning_lt': 8, 'winning_wof': 0,
+                        'bonuses': DEFAULT_BONUSES, 'latency': 0, 'api_latency': 0, 'assets': 0}
+        unknown = set(kwds) - set(self.options)
+        if unknown:
+            raise TypeError(f'Unknown options: {", ".join(sorted(unknown))}.')
+        self.options.update(kwds)
+        self.lock = threading.Lock()
+        self.requests = []  # (method, path) of every handled request
+        self.bytes_sent = 0  # size of the response bodies
+        self.sessions = set()
+        self.reset()
+        self.__server = _Server((host, port), _Handler)
+        self.__server.site = self
+        self.__thread = None
+
+    def reset(self):
+        """
+        Resets the account state to the initial options.
+        """
+        options = self.options
+        with self.lock:
+            self.state = {'balance_btc': int(options['balance_btc'].replace('.', '')),
+                          'balance_rp': options['balance_rp'], 'balance_lt': options['balance_lt'],
+                          'next_play_at': time() + options['countdown'], 'active_bonuses': {},
+                          'settings': dict.fromkeys(('free_play_sound', 'disable_lottery_checkbox',
+                                                     'disable_interest_checkbox'), False),
+                          'plays': 0}
+            self.sessions.clear()
+            self.requests.clear()
+            self.bytes_sent = 0
+            if options['authenticated']:
+                self.sessions.add('preauthenticated')
+
+    @property
+    def url(self) -> str:
+        """
+        Returns the URL of the site.
+        """
+        host, port = self.__server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def start(self) -> 'MockFaucetSite':
+        """
+        Starts serving the site in a background thread.
+        """
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__server.serve_forever, name='mock-faucet-site', daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops serving the site.
+        """
+        if self.__thread is not None:
+            self.__server.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__server.server_close()
+
+    def serve_forever(self):
+        self.__server.serve_forever()
+
+    def __enter__(self) -> 'MockFaucetSite':
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def is_authenticated(self, cookie_header: str) -> bool:
+        if self.options['authenticated'] and 'preauthenticated' in self.sessions:
+            return True
+        cookie = SimpleCookie(cookie_header or '')
+        return SESSION_COOKIE in cookie and cookie[SESSION_COOKIE].value in self.sessions
+
+    @staticmethod
+    def _btc(value: int) -> str:
+        return f'{value // 10 ** 8}.{value % 10 ** 8:08d}'
+
+    def render_assets(self) -> str:
+        """
+        Returns the HTML of the images, fonts and third-party resources of the page (if enabled).
+        """
+        if not self.options['assets']:
+            return ''
+        return ASSETS.substitute(third_party=f'http://localhost:{self.__server.server_address[1]}')
+
+    def render_asset(self, path: str) -> tuple:
+        """
+        Returns the content type and the body of the image, font or third-party resource (None, if there is none).
+        """
+        if not self.options['assets']:
+            return None
+        if path == '/ads/frame.html':
+            return 'text/html', b'<html><body><img src="/ads/ad.png" alt=""></body></html>'
+        extension = path[path.rfind('.'):]
+        if not path.startswith(('/assets/', '/ads/')) or extension not in ASSET_TYPES:
+            return None
+        return ASSET_TYPES[extension], b' ' * self.options['assets'] * 1024  # valid (empty) script
+
+    def render_page(self, is_authenticated: bool) -> str:
+        """
+        Returns the HTML of the main page.
+        """
+        options, state = self.options, self.state
+        modals = []
+        if options['cookie_banner']:
+            modals.append('<div class="cc_banner-wrapper"><div class="cc_banner">This website uses cookies. '
+                          '<a href="#" class="cc_btn cc_btn_accept_all">Got it!</a></div></div>')
+        if not is_authenticated:
+            content = '''
+<div class="login_menu_button"><a href="#">LOGIN</a></div>
+<div class="signup_menu_button"><a href="#">SIGN UP</a></div>
+<form id="signup_form" style="display: block;" onsubmit="return false;">
+  <input type="text" id="signup_form_email"><input type="password" id="signup_form_password">
+</form>
+<form id="login_form" style="display: none;" onsubmit="return false;">
+  <input type="text" id="login_form_btc_address" value="">
+  <input type="password" id="login_form_password" value="">
+  <input type="text" id="login_form_2fa" value="">
+  <button id="login_button">LOGIN!</button>
+</form>
+<div id="reward_point_redeem_result_container_div"></div>
+'''
+            return PAGE.substitute(assets=self.render_assets(), top_bar='', content=content,
+                                   modals='\n'.join(modals), script=SIGN_SCRIPT)
+        if options['notification_modal']:
+            modals.append('<div id="push_notification_modal" style="display: block;">Allow notifications? '
+                          '<div class="pushpad_deny_button">NO THANKS</div></div>')
+        modals.append('<div id="myModal22" class="reveal-modal" style="display: none;">Win more! '
+                      '<a class="close-reveal-modal" href="#">&#215;</a></div>')
+        countdown = max(int(round(state['next_play_at'] - time())), 0)
+        checkboxes = ''.join(
+            f'<p><input type="checkbox" class="setting_checkbox" id="{name}" style="display: none;">'
+            f'<span class="checkbox{(" checked", "")[not value]}"></span> {name}</p>'
+            for name, value in state['settings'].items())
+        active_bonuses = ''.join(
+            f'<div id="{container}" style="display: {("none", "block")[table in state["active_bonuses"]]};">'
+            f'{self._render_active_bonus(table)}</div>'
+            for table, (_, container, _) in options['bonuses'].items())
+        tables = ''.join(f'<div id="{table}"></div>' for table in options['bonuses'])
+        top_bar = (f'<span id="balance">{self._btc(state["balance_btc"])}</span> BTC '
+                   '<ul class="tabs"><li><a href="#" class="free_play_link">FREE BTC</a></li>'
+                   '<li><a href="#" class="rewards_link">REWARDS</a></li>'
+                   '<li><a href="#" class="edit_link">PROFILE</a></li></ul>'
+                   '<a href="#" class="logout_link">LOGOUT</a>')
+        captcha = options['captcha']
+        content = f'''
+<div id="free_play_tab" class="page_tabs" style="display: block;">
+  <div id="time_remaining"></div>
+  <div id="free_play_recaptcha" style="display: {("none", "block")[captcha]};">
+    <iframe title="reCAPTCHA" srcdoc="{_escape(CAPTCHA_FRAME)}"></iframe>
+  </div>
+  <button id="play_without_captchas_button" style="display: {("none", "inline-block")[captcha]};">PLAY WITHOUT
+    CAPTCHA</button>
+  <button id="play_with_captcha_button" style="display: {("inline-block", "none")[captcha]};">PLAY WITH
+    CAPTCHA</button>
+  <div id="play_without_captcha_desc">Costs <span>{_format_rp(options["free_play_cost"])}</span> reward points</div>
+  <input type="submit" id="free_play_form_button" value="ROLL!" style="display: inline-block;">
+  <div id="free_play_result" style="display: none;">
+    You win <span id="winnings"></span> BTC, <span id="fp_reward_points_won"></span> reward points and
+    <span id="fp_lottery_tickets_won"></span> lottery tickets. <span id="fp_bonus_wins"></span>
+  </div>
+  <button id="test_sound">TEST SOUND</button>
+  {checkboxes}
+</div>
+<div id="rewards_tab" class="page_tabs" style="display: none;">
+  <div class="user_reward_points" id="user_reward_points">{_format_rp(state["balance_rp"])}</div>
+  {active_bonuses}
+  {tables}
+</div>
+<div id="edit_tab" class="page_tabs" style="display: none;">
+  <p><span>User ID:</span> <span>1234567</span></p>
+  <input type="text" id="edit_profile_form_btc_address" value="1BitcoinEaterAddressDontSendf59kuE">
+  <input type="text" id="edit_profile_form_email" value="{_escape(options["address"] or "user@example.com")}">
+  <input type="text" id="rp_phone_number" value="+0">
+</div>
+<div>Lottery tickets: <span id="user_lottery_tickets">{_format_rp(state["balance_lt"])}</span></div>
+'''
+        return PAGE.substitute(assets=self.render_assets(), top_bar=top_bar, content=content,
+                               modals='\n'.join(modals),
+                               script=ACCOUNT_SCRIPT.substitute(countdown=countdown))
+
+    def _render_active_bonus(self, table: str) -> str:
+        if table not in self.state['active_bonuses']:
+            return ''
+        suffix = self.options['bonuses'][table][0]
+        return f'<p><span>{self.state["active_bonuses"][table]}{suffix}</span> is active, ' \
+               '<span>23:59:59</span> left</p>'
+
+    def render_bonus_tables(self) -> dict:
+        return {table: ''.join(f'<div class="reward_table_box"><div class="reward_product_name">{key}{suffix}</div>'
+                               f'<div class="reward_dollar_value_style">{_format_rp(cost)} RP</div>'
+                               f'<button class="reward_link_redeem_button_style" data-table="{table}" '
+                               f'data-key="{key}">REDEEM</button></div>' for key, cost in items)
+                for table, (suffix, _, items) in self.options['bonuses'].items()}
+
+    def api(self, path: str, data: dict, cookie_header: str) -> tuple:
+        """
+        Handles the API request and returns the status, the response data and the cookie to set (or None).
+        """
+        options, state = self.options, self.state
+        if path == '/api/login':
+            if not data.get('address') or not data.get('password') or \
+                    options['address'] and data['address'] != options['address'] or \
+                    options['password'] and data['password'] != options['password']:
+                return 403, {'error': 'Incorrect login details'}, None
+            token = token_hex(16)
+            self.sessions.add(token)
+            return 200, {}, token
+        if path == '/api/logout':
+            self.sessions.clear()
+            return 200, {}, ''
+        if not self.is_authenticated(cookie_header):
+            return 403, {'error': 'Not authenticated'}, None
+        if path == '/api/bonuses':
+            return 200, {'tables': self.render_bonus_tables()}, None
+        if path == '/api/bonus':
+            table = data.get('table', '')
+            suffix, container, items = options['bonuses'].get(table, ('', '', []))
+            cost = dict(items).get(data.get('key'))
+            if cost is None or table in state['active_bonuses'] or cost > state['balance_rp']:
+                return 400, {'error': 'Bonus cannot be activated'}, None
+            state['balance_rp'] -= cost
+            state['active_bonuses'][table] = data['key']
+            return 200, {'container': container, 'html': self._render_active_bonus(table),
+                         'balance_rp': _format_rp(state['balance_rp'])}, None
+        if path == '/api/settings':
+            if data.get('name') in state['settings']:
+                state['settings'][data['name']] = bool(data.get('value'))
+            return 200, {}, None
+        if path == '/api/free_play':
+            if state['next_play_at'] > time():
+                return 400, {'error': 'Countdown is not over'}, None
+            if not data.get('captcha'):
+                if options['free_play_cost'] > state['balance_rp']:
+                    return 400, {'error': 'Not enough reward points'}, None
+                state['balance_rp'] -= options['free_play_cost']
+            state['balance_btc'] += int(options['winning_btc'].replace('.', ''))
+            state['balance_rp'] += options['winning_rp']
+            state['balance_lt'] += options['winning_lt']
+            state['next_play_at'] = time() + options['play_interval']
+            state['plays'] += 1
+            return 200, {'winning_btc': options['winning_btc'], 'winning_rp': options['winning_rp'],
+                         'winning_lt': options['winning_lt'], 'winning_wof': options['winning_wof'],
+                         'balance_btc': self._btc(state['balance_btc']), 'balance_rp': _format_rp(state['balance_rp']),
+                         'balance_lt': _format_rp(state['balance_lt']), 'modal': options['after_play_modal'],
+                         'countdown': options['play_interval']}, None
+        return 404, {'error': 'Not found'}, None
+
+
+class _Server(ThreadingMixIn, HTTPServer):  # http.server.ThreadingHTTPServer is available since Python 3.7
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: Union[str, bytes], content_type: str, cookie: str = None):
+        if isinstance(body, str):
+            body, content_type = body.encode('utf-8'), f'{content_type}; charset=utf-8'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        if cookie is not None:
+            self.send_header('Set-Cookie', f'{SESSION_COOKIE}={cookie}; Path=/' if cookie else
+                             f'{SESSION_COOKIE}=; Path=/; Max-Age=0')
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+            with self.server.site.lock:
+                self.server.site.bytes_sent += len(body)
+
+    def _handle(self):
+        site = self.server.site
+        path = self.path.split('?')[0]
+        site.requests.append((self.command, path))
+        sleep(site.options['latency'] + (site.options['api_latency'] if path.startswith('/api/') else 0))
+        if path == '/robots.txt':
+            self._send(200, 'User-agent: *\nDisallow: /api/\n', 'text/plain')
+        elif path.startswith('/api/') and self.command == 'POST':
+            try:
+                data = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            except ValueError:
+                data = {}
+            with site.lock:
+                status, data, cookie = site.api(path, data, self.headers.get('Cookie', ''))
+            self._send(status, json.dumps(data), 'application/json', cookie)
+        elif path in ('/', '/index.html') and self.command in ('GET', 'HEAD'):
+            with site.lock:
+                body = site.render_page(site.is_authenticated(self.headers.get('Cookie', '')))
+            self._send(200, body, 'text/html')
+        else:
+            asset = site.render_asset(path) if self.command in ('GET', 'HEAD') else None
+            if asset:
+                self._send(200, asset[1], asset[0])
+            else:
+                self._send(404, 'Not found', 'text/plain')
+
+    do_GET = do_HEAD = do_POST = _handle
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Local mock of the faucet site.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--address', default='', help='account email or BTC address (any by default)')
+    parser.add_argument('--password', default='', help='account password (any by default)')
+    parser.add_argument('--authenticated', action='store_true', help='the user is signed in from the start')
+    parser.add_argument('--countdown', type=int, default=0, help='free play countdown at the start, s')
+    parser.add_argument('--play-interval', type=int, default=3600, help='free play countdown after each play, s')
+    parser.add_argument('--no-captcha', action='store_true', help='free play without captcha is selected')
+    parser.add_argument('--no-modals', action='store_true', help='do not show the banner and modal windows')
+    parser.add_argument('--latency', type=float, default=0, help='delay of every response, s')
+    parser.add_argument('--api-latency', type=float, default=0, help='additional delay of the XHR responses, s')
+    parser.add_argument('--assets', type=int, default=0, help='size of each image, font and third-party resource, KiB')
+    args = parser.parse_args()
+    site = MockFaucetSite(args.host, args.port, address=args.address, password=args.password,
+                          authenticated=args.authenticated, countdown=args.countdown,
+                          play_interval=args.play_interval, captcha=not args.no_captcha,
+                          cookie_banner=not args.no_modals, notification_modal=not args.no_modals,
+                          after_play_modal=not args.no_modals, latency=args.latency, api_latency=args.api_latency,
+                          assets=args.assets)
+    print(f'Mock faucet site is served at {site.url} (Ctrl+C to stop).')
+    try:
+        site.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
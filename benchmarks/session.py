@@ -0,0 +1,74 @@
+#!/usr/bin/env python3 -B
+"""
+Benchmark of the session creation time (browser launch and WebDriver session, as on every restart of the browser) with
+a new temporary profile for every session and with a persistent profile directory.
+
+The first session with the persistent profile pre-seeds the profile (and its startup cache) and is reported separately
+as cold. The benchmark fails (exit status 1) if the median saving of the persistent profile is below the budget.
+
+    python benchmarks/session.py [--runs 5] [--settings settings] [--profile-dir PATH] [--min-saving 0.1]
+                                 [--json results.json]
+"""
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+from time import perf_counter
+from statistics import median
+
+from _common import faucet_kwds
+
+
+def create_session(kwds: dict) -> float:
+    """
+    Creates the faucet object (the browser and the WebDriver session) and quits it. Returns the creation time in
+    seconds (0 on failure).
+    """
+    import core
+    start = perf_counter()
+    faucet = core.FreeBitcoinFaucet(**kwds)
+    elapsed = perf_counter() - start
+    if not faucet:
+        return 0
+    faucet.quit()
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark of the session creation time.')
+    parser.add_argument('--runs', type=int, default=5, help='number of sessions of each mode (5 by default)')
+    parser.add_argument('--settings', default='settings', help='settings module ("settings" by default)')
+    parser.add_argument('--profile-dir', default='', help='persistent profile directory (temporary by default)')
+    parser.add_argument('--min-saving', type=float, default=0.1, help='time saving budget (0.1 (10%%) by default)')
+    parser.add_argument('--json', default='', help='path to save the results in JSON format')
+    args = parser.parse_args()
+    profile_dir = args.profile_dir or tempfile.mkdtemp(prefix='faucet-profile-')
+    kwds = faucet_kwds(args.settings, profile_dir='')
+    try:
+        temporary = [create_session(kwds) for _ in range(args.runs)]
+        persistent = [create_session(dict(kwds, profile_dir=profile_dir)) for _ in range(args.runs + 1)]
+    finally:
+        if not args.profile_dir:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+    if not all(temporary + persistent):
+        print('FAIL: the session could not be created.')
+        return 1
+    results = {'runs': args.runs, 'temporary_s': round(median(temporary), 3),
+               'persistent_cold_s': round(persistent[0], 3), 'persistent_s': round(median(persistent[1:]), 3)}
+    results['saving'] = round(1 - results['persistent_s'] / results['temporary_s'], 3)
+    print(f'Temporary profile (median of {args.runs}): {results["temporary_s"]} s')
+    print(f'Persistent profile: cold {results["persistent_cold_s"]} s, warm (median of {args.runs}) '
+          f'{results["persistent_s"]} s')
+    print(f'Saving: {results["saving"]:.1%} (budget {args.min_saving:.0%})')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if results['saving'] < args.min_saving:
+        print('FAIL: the saving is below the budget.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3 -B
+"""
+Startup benchmark: time to import the core module and time to the first open() of the site (from the interpreter start
+to the opened page, including the browser launch).
+
+Each measurement is made in a fresh interpreter, the median of the runs is compared with the budget. The benchmark
+fails (exit status 1) if any median exceeds its budget or if importing the core module loads heavy dependencies.
+
+    python benchmarks/startup.py [--runs 5] [--import-budget 60] [--open-budget 15] [--settings settings]
+                                 [--url URL] [--skip-open] [--json PATH]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from statistics import median
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules that must not be loaded by the import of the core module itself
+HEAVY_MODULES = ('selenium.webdriver', 'urllib3', 'pyotp', 'progress.bar', 'tarfile', 'zipfile')
+
+
+def _child_import() -> dict:
+    from time import perf_counter
+    start = perf_counter()
+    import core
+    return {'import': perf_counter() - start, 'heavy': [name for name in HEAVY_MODULES if name in sys.modules]}
+
+
+def _child_open(settings_name: str, url: str) -> dict:
+    from time import perf_counter
+    start = perf_counter()
+    import core
+    from _common import faucet_kwds
+    faucet = core.FreeBitcoinFaucet(**faucet_kwds(settings_name, open=True, open_url=url or core.FreeBitcoinFaucet.URL))
+    elapsed = perf_counter() - start
+    if faucet:
+        faucet.quit()
+    return {'open': elapsed if faucet else None}
+
+
+def _run_child(*args) -> dict:
+    process = subprocess.run([sys.executable, '-B', os.path.abspath(__file__), '--child', *args], cwd=BASE_DIR,
+                             stdout=subprocess.PIPE, universal_newlines=True)
+    if process.returncode:
+        raise RuntimeError(f'Benchmark run {args} failed with exit status {process.returncode}.')
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Startup benchmark of the faucet.')
+    parser.add_argument('--runs', type=int, default=5, help='number of runs of each measurement (5 by default)')
+    parser.add_argument('--import-budget', type=float, default=60, help='import time budget, ms (60 by default)')
+    parser.add_argument('--open-budget', type=float, default=15, help='time to first open() budget, s (15 by default)')
+    parser.add_argument('--settings', default='settings', help='settings module ("settings" by default)')
+    parser.add_argument('--url', default='', help='URL to open (the faucet site by default)')
+    parser.add_argument('--skip-open', action='store_true', help='measure only the import time')
+    parser.add_argument('--json', default='', help='path to save the results in JSON format')
+    parser.add_argument('--child', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        sys.path[:0] = [BASE_DIR, os.path.dirname(os.path.abspath(__file__))]
+        print(json.dumps(_child_import() if args.child[0] == 'import' else _child_open(*args.child[1:])))
+        return 0
+    results = {'runs': args.runs}
+    is_failed = False
+    runs = [_run_child('import') for _ in range(args.runs)]
+    results['import_ms'] = round(median(run['import'] for run in runs) * 1000, 2)
+    results['heavy_modules'] = sorted({name for run in runs for name in run['heavy']})
+    print(f'Import of core (median of {args.runs}): {results["import_ms"]} ms (budget {args.import_budget} ms)')
+    if results['import_ms'] > args.import_budget:
+        print('FAIL: import time exceeds the budget.')
+        is_failed = True
+    if results['heavy_modules']:
+        print(f'FAIL: heavy modules loaded on import: {", ".join(results["heavy_modules"])}.')
+        is_failed = True
+    if not args.skip_open:
+        runs = [_run_child('open', args.settings, args.url) for _ in range(args.runs)]
+        if None in (run['open'] for run in runs):
+            print('FAIL: the site could not be opened.')
+            return 1
+        results['open_s'] = round(median(run['open'] for run in runs), 3)
+        print(f'Time to first open() (median of {args.runs}): {results["open_s"]} s (budget {args.open_budget} s)')
+        if results['open_s'] > args.open_budget:
+            print('FAIL: time to first open() exceeds the budget.')
+            is_failed = True
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return int(is_failed)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,27 +2,93 @@ __author__ = 'norsulfazol'
 __version__ = '1.3.2'
 
 import os
+import re
 import sys
+import json
+import stat
+import base64
+import hashlib
 import shutil
-import urllib3
+import importlib
 import tempfile
 import ec as EC
-from typing import Union
+from typing import Union, NamedTuple
 from logging import getLogger
 from itertools import product
-from collections import namedtuple
+from functools import partial, wraps
+from time import time, monotonic, sleep
+from collections import namedtuple, deque
+from contextvars import ContextVar
+from types import FunctionType
+from threading import Lock, Thread
+from configparser import ConfigParser, Error as ConfigParserError
 from decimal import Decimal, InvalidOperation
-from progress import bar  # the progress bar is displayed only in the terminal (not in the python console)
-from pyotp import TOTP
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-# from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.common.exceptions import WebDriverException, TimeoutException, StaleElementReferenceException
+from urllib.parse import urlsplit
+from selenium.common.exceptions import WebDriverException, TimeoutException, StaleElementReferenceException, \
+    InvalidSelectorException, NoSuchElementException
 
 logger = getLogger(__name__)
 
 
+class _LazyImport:
+    """
+    Proxy of a module (or a module attribute) that is imported on first use, so that heavy dependencies are not loaded
+    on paths that never use them (for example, the driver update or the error exit).
+    """
+
+    def __init__(self, module_name: str, attr_name: str = ''):
+        self.__module_name = module_name
+        self.__attr_name = attr_name
+        self.__obj = None
+
+    def __resolve(self):
+        if self.__obj is None:
+            module = importlib.import_module(self.__module_name)
+            self.__obj = getattr(module, self.__attr_name) if self.__attr_name else module
+        return self.__obj
+
+    def __getattr__(self, name: str):
+        return getattr(self.__resolve(), name)
+
+    def __call__(self, *args, **kwds):
+        return self.__resolve()(*args, **kwds)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.__module_name!r}, {self.__attr_name!r})'
+
+
+tarfile = _LazyImport('tarfile')
+zipfile = _LazyImport('zipfile')
+plistlib = _LazyImport('plistlib')
+socket = _LazyImport('socket')
+ThreadPoolExecutor = _LazyImport('concurrent.futures', 'ThreadPoolExecutor')
+urllib3 = _LazyImport('urllib3')
+bar = _LazyImport('progress.bar')  # the progress bar is displayed only in the terminal (not in the python console)
+TOTP = _LazyImport('pyotp', 'TOTP')
+webdriver = _LazyImport('selenium.webdriver')
+w3c = _LazyImport('w3c')  # minimal W3C WebDriver client (the "w3c" driver backend)
+By = _LazyImport('selenium.webdriver.common.by', 'By')
+# Keys = _LazyImport('selenium.webdriver.common.keys', 'Keys')
+WebDriverWait = _LazyImport('selenium.webdriver.support.ui', 'WebDriverWait')
+
+# Caches of the executable file lookups, revalidated by the inode and modification time of the file:
+# (name, directories) => (directory, stamp) and (path, stamp, reg_key, version index) => version
+_directory_cache = {}
+_version_cache = {}
+# Serializes the read-modify-write of the driver update manifest and of the driver store index (the driver prefetch
+# writes them in a background thread)
+_driver_files_lock = Lock()
+# Name of the public operation of the faucet object being executed (the outermost public method or property), the
+# traced WebDriver commands are attributed to it (see CommandTracer)
+_current_operation = ContextVar('current_operation', default='')
+# Connection pool shared by all HTTP requests (created on first use) and download settings
+_http = None
+_DOWNLOAD_MIN_CHUNK = 64 * 1024
+_DOWNLOAD_MAX_CHUNK = 4 * 1024 * 1024
+_DOWNLOAD_MIN_SEGMENT = 1024 * 1024
+_DOWNLOAD_MAX_SEGMENTS = 8
+
+
 def _validate_argument(arg_value, arg_string: str, arg_obj: Union[type, tuple], allowed_values: tuple = tuple()):
     """
     Validates an argument.
@@ -73,18 +139,302 @@ def str2num(string: str, obj: type = int) -> Union[int, Decimal, float]:
     return obj()
 
 
-def download_file(url: str, target_dir: str = '', target_name: str = '', message: str = '', chunk_size: int = 2048,
-                  method: int = 0, progress_bar: type = bar.IncrementalBar) -> str:
+def _file_stamp(path: str) -> Union[tuple, None]:
+    """
+    Returns the inode and modification time of a regular file, or None if there is no such file.
+
+    :param path: str
+    :return: tuple or None
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns) if stat.S_ISREG(st.st_mode) else None
+
+
+def _version_tuple(version: str) -> tuple:
+    """
+    Returns the version as a tuple of integer values (non-numeric parts are zero), so that versions are compared
+    numerically.
+
+    :param version: str - for example, "0.34.0"
+    :return: tuple
+    """
+    return tuple(int(v) if v.isdigit() else 0 for v in version.strip().split('.'))
+
+
+def _find_directory(name: str, directories: list) -> str:
+    """
+    Returns the first of the directories containing a file with the given name, or an empty string.
+    The found directory is cached until the file is replaced or modified.
+
+    :param name: str
+    :param directories: list
+    :return: str
+    """
+    key = (name, tuple(directories))
+    if key in _directory_cache:
+        directory, stamp = _directory_cache[key]
+        if _file_stamp(os.path.join(directory, name)) == stamp:
+            return directory
+        del _directory_cache[key]
+    for directory in directories:
+        stamp = _file_stamp(os.path.join(directory, name)) if directory else None
+        if stamp:
+            _directory_cache[key] = (directory, stamp)
+            return directory
+    return ''
+
+
+def _file_sha256(path: str) -> str:
+    """
+    Returns the SHA-256 hex digest of the file or an empty string if the file could not be read.
+
+    :param path: str
+    :return: str
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    except OSError:
+        return ''
+    return digest.hexdigest()
+
+
+def _read_json(path: str) -> dict:
+    """
+    Returns the dictionary stored in the JSON file or an empty dictionary if the file does not exist or is corrupted.
+
+    :param path: str
+    :return: dict
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as err:
+        logger.warning('Reading the file "%s" failed. %s', path, err)
+        return {}
+
+
+def _write_json(path: str, data: dict, mode: int = 0o644) -> bool:
+    """
+    Atomically writes the dictionary to the JSON file.
+
+    :param path: str
+    :param data: dict
+    :param mode: int - permissions of the created file
+    :return: bool
+    """
+    tmp_path = f'{path}.tmp'
+    try:
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        return True
+    except OSError as err:
+        logger.warning('Writing the file "%s" failed. %s', path, err)
+        return False
+
+
+def _http_pool() -> 'urllib3.PoolManager':
+    """
+    Returns the connection pool shared by all HTTP requests of the module.
+
+    :return: urllib3.PoolManager
+    """
+    global _http
+    if _http is None:
+        _http = urllib3.PoolManager(maxsize=_DOWNLOAD_MAX_SEGMENTS, timeout=urllib3.Timeout(connect=15, read=60),
+                                    retries=urllib3.Retry(3, backoff_factor=0.5, raise_on_status=False))
+    return _http
+
+
+class _DownloadProgress:
+    """
+    Thread-safe download progress, redrawn no more often than the given interval.
+    """
+
+    def __init__(self, message: str, method: int, progress_bar: type, interval: float = 0.25):
+        self.message = message
+        self.method = method
+        self.progress_bar = progress_bar
+        self.interval = interval
+        self.__lock = Lock()
+        self.__pb = None
+        self.__done = 0
+        self.__drawn_at = 0
+        self.__is_started = False
+
+    def start(self, total: int, done: int = 0):
+        """
+        :param total: int - total size in bytes (negative - unknown)
+        :param done: int - size already downloaded in bytes (for example, a resumed part)
+        """
+        self.__done = done
+        self.__is_started = True
+        if not self.method:
+            print(f'{self.message} ...', end='\r')
+            return
+        progress_bar = self.progress_bar
+        var1 = shutil.get_terminal_size().columns - 15 - len(self.message) - progress_bar.width - len(
+            getattr(progress_bar, 'bar_prefix', 0)) - len(getattr(progress_bar, 'bar_suffix', 0))
+        progress_bar.width += var1 if var1 < 0 else 0
+        progress_bar.width = 1 if progress_bar.width < 1 else progress_bar.width
+        self.__pb = progress_bar(self.message, max=max(total, done, 1), suffix='%(percent)d%% [%(elapsed_td)s]')
+        self.__pb.goto(done)
+
+    def add(self, size: int):
+        with self.__lock:
+            self.__done += size
+            if self.__pb is not None and monotonic() - self.__drawn_at >= self.interval:
+                self.__pb.goto(min(self.__done, self.__pb.max))
+                self.__drawn_at = monotonic()
+
+    def finish(self):
+        if not self.__is_started:
+            return
+        if self.__pb is not None:
+            self.__pb.goto(min(self.__done, self.__pb.max))
+            self.__pb.finish()
+        elif not self.method:
+            print(f'{self.message} - done.')
+
+
+def _response_validator(response) -> str:
+    """
+    Returns the validator of the response usable in the If-Range header: the strong ETag or the Last-Modified date.
+
+    :param response: urllib3.response.HTTPResponse
+    :return: str
+    """
+    etag = response.getheader('etag', '')
+    return etag if etag and not etag.startswith('W/') else response.getheader('last-modified', '')
+
+
+def _download_range(url: str, path: str, start: int = 0, end: int = -1, chunk_size: int = 0,
+                    progress: _DownloadProgress = None, on_start=None, validator: str = '') -> int:
+    """
+    Downloads the byte range of the file at the given URL, appending to the partially downloaded file, if any.
+    Returns the total size of the range (the whole file for the open-ended range), -1 if the size is unknown or
+    None if the download failed.
+    The validator of the file (ETag or Last-Modified) is kept in the "<path>.validator" file and sent in the If-Range
+    header when the download is resumed, so the partial file is not continued with the bytes of a changed remote file:
+    the open-ended range is started over, the partial file of a closed range is discarded. A partial file without a
+    validator is started over.
+
+    :param url: str
+    :param path: str - path to the (partially downloaded) file of the range
+    :param start: int - first byte of the range
+    :param end: int - last byte of the range (negative - up to the end of the file)
+    :param chunk_size: int (0 - adaptive)
+    :param progress: _DownloadProgress
+    :param on_start: callable - called with the total and already downloaded size before the transfer begins
+    :param validator: str - expected validator of the remote file (for example, from the HEAD response)
+    :return: int or None
+    """
+    validator_path = f'{path}.validator'
+    offset = os.path.getsize(path) if os.path.isfile(path) else 0
+    if 0 <= end and end - start + 1 <= offset:
+        if end - start + 1 == offset:  # the range has already been downloaded entirely
+            return offset
+        offset = 0
+    if offset:
+        try:
+            with open(validator_path, encoding='utf-8') as f:
+                stored_validator = f.read().strip()
+        except OSError:
+            stored_validator = ''
+        if not stored_validator or validator and stored_validator != validator:
+            offset = 0  # the partial file cannot be validated or the remote file has changed, so it is started over
+        validator = stored_validator if offset else validator
+    headers = {}
+    if start + offset or 0 <= end:
+        headers['Range'] = f'bytes={start + offset}-{end if 0 <= end else ""}'
+        if validator:
+            headers['If-Range'] = validator
+    with _http_pool().request('GET', url, headers=headers, preload_content=False) as response:
+        content_range = response.getheader('content-range', '')
+        if response.status == 416 and not start and end < 0 and content_range.startswith('bytes */') and \
+                content_range[8:] == str(offset):  # the file has already been downloaded entirely
+            if on_start:
+                on_start(offset, offset)
+            return offset
+        if response.status == 200 and not start and end < 0:
+            offset = 0  # the server ignored the range or the remote file has changed, so the download is started over
+        elif response.status == 200 and 'If-Range' in headers:
+            logger.error('Downloading the range %s-%s of the file by URL "%s" failed. The remote file has changed.',
+                         start, end if 0 <= end else '', url)
+            for var in (path, validator_path):
+                if os.path.isfile(var):
+                    os.remove(var)
+            return None
+        elif response.status != 206 or not content_range.startswith(f'bytes {start + offset}-'):
+            logger.error('Downloading the range %s-%s of the file by URL "%s" failed. Response status - %s.',
+                         start + offset, end if 0 <= end else '', url, response.status)
+            return None
+        size = response.getheader('content-length')
+        total = offset + int(size) if size else -1
+        if response.status == 206 and end < 0 and content_range.rpartition('/')[2].isdigit():
+            total = int(content_range.rpartition('/')[2])
+        if on_start:
+            on_start(total, offset)
+        if not offset:
+            if _response_validator(response):
+                with open(validator_path, 'w', encoding='utf-8') as f:
+                    f.write(_response_validator(response))
+            elif os.path.isfile(validator_path):
+                os.remove(validator_path)
+        adaptive = not chunk_size
+        chunk_size = chunk_size or _DOWNLOAD_MIN_CHUNK
+        received = 0
+        with open(path, 'ab' if offset else 'wb') as target:
+            while True:
+                started_at = monotonic()
+                chunk = response.read(chunk_size, decode_content=False)
+                if not chunk:
+                    break
+                target.write(chunk)
+                received += len(chunk)
+                if progress:
+                    progress.add(len(chunk))
+                if adaptive:  # grow the chunk while it is read fast, shrink it when the connection is slow
+                    elapsed = monotonic() - started_at
+                    if elapsed < 0.05 and len(chunk) == chunk_size and chunk_size < _DOWNLOAD_MAX_CHUNK:
+                        chunk_size *= 2
+                    elif elapsed > 0.5 and chunk_size > _DOWNLOAD_MIN_CHUNK:
+                        chunk_size //= 2
+        response.release_conn()
+    if size and received != int(size):  # the connection was closed early, the partial file is kept to resume
+        logger.error('Downloading the range %s-%s of the file by URL "%s" failed. Received %s of %s bytes.',
+                     start + offset, end if 0 <= end else '', url, received, size)
+        return None
+    return total
+
+
+def download_file(url: str, target_dir: str = '', target_name: str = '', message: str = '', chunk_size: int = 0,
+                  method: int = 0, progress_bar: type = None, segments: int = 1,
+                  resume: bool = True) -> str:
     """
     Downloads a file at the given URL and returns the path to the downloaded file.
+    The file is downloaded to the "<target name>.part" file, which is renamed when the download is complete. If the
+    download is interrupted, the next call resumes it using HTTP Range requests (if the server supports them).
+    If the server supports ranges, the file can be downloaded in several segments in parallel.
 
     :param url: str
     :param target_dir: str
     :param target_name: str
     :param message: str
-    :param chunk_size: int (0 - length = COPY_BUFSIZE = 1024 * 1024 if _WINDOWS else 64 * 1024)
-    :param method: int (0 (default) - shutil.copyfileobj, 1 - response.stream)
+    :param chunk_size: int (0 (default) - adaptive, from 64 KiB to 4 MiB depending on the connection speed)
+    :param method: int (0 (default) - start and done messages, 1 - progress bar)
     :param progress_bar: type (bar.Bar, bar.IncrementalBar (default), bar.ChargingBar, etc.)
+    :param segments: int - number of segments downloaded in parallel (1 (default) - one stream)
+    :param resume: bool - resume the partial download (False - start over)
     :return: str
     """
     _validate_argument(url, 'url', str)
@@ -93,86 +443,248 @@ def download_file(url: str, target_dir: str = '', target_name: str = '', message
     _validate_argument(message, 'message', str)
     _validate_argument(chunk_size, 'chunk_size', int)
     _validate_argument(method, 'method', int, (0, 1))
+    progress_bar = progress_bar or bar.IncrementalBar
     _validate_argument(progress_bar, 'progress_bar', type)
+    _validate_argument(segments, 'segments', int, tuple(range(1, _DOWNLOAD_MAX_SEGMENTS + 1)))
+    _validate_argument(resume, 'resume', bool)
     log_msg = f'{message if message else "Downloading file"} by URL '
     if not url:
         logger.error('%sfailed. URL is empty.', log_msg)
         return ''
-    with urllib3.PoolManager().request('GET', url, preload_content=False) as response:
-        if response.status != 200:
-            logger.error('%s"%s" failed. Response status - %s.', log_msg, url, response.status)
-            return ''
-        target_size = int(response.getheader('content-length'))
-        with open(os.path.join(target_dir if os.path.isdir(target_dir) else tempfile.gettempdir(),
-                               target_name if target_name else url.split('/')[-1]), 'wb') as target:
-            if not message:
-                var1 = 50  # string max length
-                var2 = var1 // 2 - 2  # string part length
-                print(f'{log_msg}"{url.replace(url[var2:-var2], "....") if len(url) > var1 else url}"')
-                message = 'to PATH "{}"'.format(
-                    target.name.replace(target.name[var2:-var2], "....") if len(target.name) > var1 else target.name)
-            if method:
-                var1 = shutil.get_terminal_size().columns - 15 - len(message) - progress_bar.width - len(
-                    getattr(progress_bar, 'bar_prefix', 0)) - len(getattr(progress_bar, 'bar_suffix', 0))
-                progress_bar.width += var1 if var1 < 0 else 0
-                progress_bar.width = 1 if progress_bar.width < 1 else progress_bar.width
-                var1, var2 = divmod(target_size, chunk_size)
-                with progress_bar(message, max=var1 + bool(var2), suffix='%(percent)d%% [%(elapsed_td)s]') as pb:
-                    for chunk in response.stream(chunk_size):
-                        target.write(chunk)
-                        pb.next()
-            else:
-                print(f'{message} ...', end='\r')
-                shutil.copyfileobj(response, target, length=chunk_size)
-                print(f'{message} - done.')
-        if method:
-            response.release_conn()
-    if not os.path.isfile(target.name):
-        logger.error('%s"%s" failed. Target file "%s" not found or is not a file.', log_msg, url, target.name)
+    target_path = os.path.join(target_dir if os.path.isdir(target_dir) else tempfile.gettempdir(),
+                               target_name if target_name else url.split('/')[-1])
+    part_path = f'{target_path}.part'
+    if not message:
+        var1 = 50  # string max length
+        var2 = var1 // 2 - 2  # string part length
+        print(f'{log_msg}"{url.replace(url[var2:-var2], "....") if len(url) > var1 else url}"')
+        message = 'to PATH "{}"'.format(
+            target_path.replace(target_path[var2:-var2], "....") if len(target_path) > var1 else target_path)
+    bounds, validator = [], ''
+    if segments > 1:
+        response = _http_pool().request('HEAD', url)
+        validator = _response_validator(response)
+        size = int(response.getheader('content-length') or 0) if response.status == 200 else 0
+        if response.getheader('accept-ranges', '') == 'bytes' and size >= segments * _DOWNLOAD_MIN_SEGMENT:
+            var1 = -(-size // segments)
+            bounds = [(i, min(i + var1, size) - 1) for i in range(0, size, var1)]
+    paths = [f'{part_path}{i}' for i in range(len(bounds))] if bounds else [part_path]
+    if not resume:
+        for path in paths:
+            for var in (path, f'{path}.validator'):
+                if os.path.isfile(var):
+                    os.remove(var)
+    progress = _DownloadProgress(message, method, progress_bar)
+    try:
+        if bounds:
+            progress.start(bounds[-1][1] + 1, sum(os.path.getsize(path) for path in paths if os.path.isfile(path)))
+            with ThreadPoolExecutor(len(bounds)) as executor:
+                sizes = list(executor.map(lambda args: _download_range(url, args[0], *args[1], chunk_size, progress,
+                                                                       validator=validator), zip(paths, bounds)))
+            if None in sizes:
+                logger.error('%s"%s" failed. Partial files are kept to resume the download.', log_msg, url)
+                return ''
+            with open(part_path, 'wb') as target:
+                for path in paths:
+                    with open(path, 'rb') as source:
+                        shutil.copyfileobj(source, target)
+            for path in paths:
+                os.remove(path)
+                if os.path.isfile(f'{path}.validator'):
+                    os.remove(f'{path}.validator')
+            target_size = bounds[-1][1] + 1
+        else:
+            target_size = _download_range(url, part_path, chunk_size=chunk_size, progress=progress,
+                                          on_start=progress.start)
+            if target_size is None:
+                return ''
+    except (OSError, urllib3.exceptions.HTTPError) as err:
+        logger.error('%s"%s" failed. %s', log_msg, url, err)
         return ''
-    if os.path.getsize(target.name) != target_size:
-        logger.error('%s"%s" failed. Target file "%s" is not the correct size.', log_msg, url, target.name)
-        try:
-            os.remove(target.name)
-        except OSError:
-            logger.warning('Removing the corrupted file "%s" failed.', target.name)
+    finally:
+        progress.finish()
+    if not os.path.isfile(part_path):
+        logger.error('%s"%s" failed. Target file "%s" not found or is not a file.', log_msg, url, part_path)
         return ''
+    if 0 <= target_size != os.path.getsize(part_path):
+        logger.error('%s"%s" failed. Target file "%s" is not the correct size.', log_msg, url, part_path)
+        if os.path.getsize(part_path) > target_size:
+            try:
+                os.remove(part_path)
+            except OSError:
+                logger.warning('Removing the corrupted file "%s" failed.', part_path)
+        return ''
+    os.replace(part_path, target_path)
+    if os.path.isfile(f'{part_path}.validator'):
+        os.remove(f'{part_path}.validator')
     logger.info('%s"%s" successful.', log_msg, url)
-    return target.name
+    return target_path
 
 
-def unpack_archive(arch_path: str, target_dir: str = '', arch_format: str = '', is_remove: bool = True) -> bool:
+class _ProgressReader:
+    """
+    Wrapper of the readable stream reporting the number of bytes read to the download progress.
     """
-    Unpacks the archive to the specified directory.
 
-    :param arch_path: str
-    :param target_dir: str
-    :param arch_format: str (one of 'zip', 'tar', 'gztar', 'bztar', or 'xztar')
-    :param is_remove: bool
+    def __init__(self, stream, progress: _DownloadProgress):
+        self.stream = stream
+        self.progress = progress
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.stream.read(size, decode_content=False) if size and size > 0 else self.stream.read(
+            decode_content=False)
+        self.progress.add(len(chunk))
+        return chunk
+
+
+def _write_executable(source, target_path: str, mode: int = 0o755):
+    """
+    Atomically writes the contents of the readable stream to the file with the given permissions.
+
+    :param source: readable file-like object
+    :param target_path: str
+    :param mode: int
+    """
+    tmp_path = f'{target_path}.tmp'
+    try:
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), 'wb') as target:
+            shutil.copyfileobj(source, target, _DOWNLOAD_MAX_CHUNK)
+        os.chmod(tmp_path, mode)  # the mode passed to os.open is masked by the umask
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        if os.path.isfile(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _extract_member(source, arch_name: str, member: str, target_path: str, mode: int = 0o755,
+                    spool_size: int = 32 * 1024 * 1024) -> bool:
+    """
+    Extracts the file from the archive read from the stream (atomically, with the given permissions) and returns
+    whether it was found. A tar archive is read in stream mode. A zip archive needs random access, so a stream that is
+    not seekable is spooled in memory (or to a temporary file, if it is larger than the spool size).
+
+    :param source: readable file-like object
+    :param arch_name: str - name of the archive (the format is determined by the extension)
+    :param member: str - name of the file in the archive (in any archive directory)
+    :param target_path: str
+    :param mode: int
+    :param spool_size: int
     :return: bool
     """
-    _validate_argument(arch_path, 'arch_path', str)
-    _validate_argument(target_dir, 'target_dir', str)
-    _validate_argument(arch_format, 'arch_format', str)
-    _validate_argument(is_remove, 'is_remove', bool)
-    log_msg = 'Unpacking the archive '
-    if not arch_path:
-        logger.error('%sfailed. Archive path is empty.', log_msg)
+    tar_mode = _tar_mode(arch_name)
+    if tar_mode:
+        with tarfile.open(fileobj=source, mode=tar_mode) as arch:
+            for info in arch:
+                if info.isfile() and os.path.basename(info.name) == member:
+                    _write_executable(arch.extractfile(info), target_path, mode)
+                    return True
         return False
+    spool = None
+    if not (hasattr(source, 'seekable') and source.seekable()):
+        spool = tempfile.SpooledTemporaryFile(spool_size)
+        shutil.copyfileobj(source, spool, _DOWNLOAD_MAX_CHUNK)
+        source = spool
     try:
-        shutil.unpack_archive(arch_path, target_dir if target_dir else None, arch_format if arch_format else None)
-        logger.info('%s"%s" successful.', log_msg, arch_path)
-        if is_remove:
+        with zipfile.ZipFile(source) as arch:
+            for info in arch.infolist():
+                if not info.is_dir() and os.path.basename(info.filename) == member:
+                    with arch.open(info) as member_source:
+                        _write_executable(member_source, target_path, mode)
+                    return True
+        return False
+    finally:
+        if spool:
+            spool.close()
+
+
+def _tar_mode(arch_name: str) -> str:
+    """
+    Returns the stream mode of the tarfile module for the archive name or an empty string, if it is not a tar archive.
+    """
+    arch_name = arch_name.lower()
+    return next((f'r|{compression}' for extensions, compression in ((('.tar',), ''), (('.tar.gz', '.tgz'), 'gz'),
+                                                                     (('.tar.bz2', '.tbz2'), 'bz2'),
+                                                                     (('.tar.xz', '.txz'), 'xz'))
+                 if arch_name.endswith(extensions)), '')
+
+
+def stream_unpack(url: str, member: str, target_path: str, mode: int = 0o755, message: str = '', method: int = 0,
+                  progress_bar: type = None, spool_size: int = 32 * 1024 * 1024, part_dir: str = '') -> bool:
+    """
+    Extracts the file from the archive at the given URL directly from the response stream, without saving the archive.
+    Only the requested file is written (atomically, with the given permissions), the rest of the archive is skipped.
+    A tar archive is read in stream mode. A zip archive needs random access, so it is spooled in memory (or to a
+    temporary file, if it is larger than the spool size).
+    If the directory of the partial download is set, the archive is downloaded by download_file instead, so an
+    interrupted download is resumed by the next call, and the file is extracted from the downloaded archive, which is
+    then removed.
+
+    :param url: str (the archive format is determined by the extension: .tar, .tar.gz, .tgz, .tar.bz2, .tar.xz, .zip)
+    :param member: str - name of the file in the archive (in any archive directory)
+    :param target_path: str
+    :param mode: int - permissions of the extracted file
+    :param message: str
+    :param method: int (0 (default) - start and done messages, 1 - progress bar)
+    :param progress_bar: type (bar.Bar, bar.IncrementalBar (default), bar.ChargingBar, etc.)
+    :param spool_size: int - maximum size of the zip archive kept in memory
+    :param part_dir: str - directory of the partial (resumable) download of the archive ('' - read the response stream)
+    :return: bool
+    """
+    _validate_argument(url, 'url', str)
+    _validate_argument(member, 'member', str)
+    _validate_argument(target_path, 'target_path', str)
+    _validate_argument(mode, 'mode', int)
+    _validate_argument(message, 'message', str)
+    _validate_argument(method, 'method', int, (0, 1))
+    progress_bar = progress_bar or bar.IncrementalBar
+    _validate_argument(progress_bar, 'progress_bar', type)
+    _validate_argument(spool_size, 'spool_size', int)
+    _validate_argument(part_dir, 'part_dir', str)
+    log_msg = f'{message if message else "Unpacking the archive"} by URL '
+    if not url or not member or not target_path:
+        logger.error('%sfailed. URL, member name or target path is empty.', log_msg)
+        return False
+    arch_name = urlsplit(url).path.split('/')[-1]
+    if not _tar_mode(arch_name) and not arch_name.lower().endswith('.zip'):
+        logger.error('%s"%s" failed. Unregistered archive format.', log_msg, url)
+        return False
+    if part_dir:
+        arch_path = download_file(url, part_dir, arch_name, message if message else f'Downloading "{arch_name}"',
+                                  method=method, progress_bar=progress_bar)
+        if not arch_path:  # the partial download is kept and resumed by the next call
+            return False
+        try:
+            with open(arch_path, 'rb') as source:
+                is_found = _extract_member(source, arch_name, member, target_path, mode, spool_size)
+        except (OSError, tarfile.TarError, zipfile.BadZipFile) as err:
+            logger.error('%s"%s" failed. %s', log_msg, url, err)
+            return False
+        finally:
             try:
                 os.remove(arch_path)
-            except OSError:
-                logger.warning('Removing the unpacked archive "%s" failed.', arch_path)
-        return True
-    except shutil.ReadError:
-        logger.error('%s"%s" failed. Archive not found.', log_msg, arch_path)
-    except ValueError:
-        logger.error('%s"%s" failed. Unregistered archive format.', log_msg, arch_path)
-    return False
+            except OSError as err:
+                logger.warning('Removing the downloaded archive "%s" failed. %s', arch_path, err)
+    else:
+        progress = _DownloadProgress(message if message else f'Unpacking "{member}"', method, progress_bar)
+        try:
+            with _http_pool().request('GET', url, preload_content=False) as response:
+                if response.status != 200:
+                    logger.error('%s"%s" failed. Response status - %s.', log_msg, url, response.status)
+                    return False
+                progress.start(int(response.getheader('content-length') or -1))
+                is_found = _extract_member(_ProgressReader(response, progress), arch_name, member, target_path, mode,
+                                           spool_size)
+        except (OSError, tarfile.TarError, zipfile.BadZipFile, urllib3.exceptions.HTTPError) as err:
+            logger.error('%s"%s" failed. %s', log_msg, url, err)
+            return False
+        finally:
+            progress.finish()
+    if not is_found:
+        logger.error('%s"%s" failed. File "%s" not found in the archive.', log_msg, url, member)
+        return False
+    logger.info('%s"%s" successful.', log_msg, url)
+    return True
 
 
 class BrowserExecFileOrLink:
@@ -223,10 +735,7 @@ class BrowserExecFileOrLink:
         Returns the directory where the file is located, or an empty string if the file is not found in any directory,
         including directories in the PATH environment variable.
         """
-        for p in [self.__directory] + os.getenv('PATH', '').split((':', ';')[sys.platform.startswith('win32')]):
-            if p and os.path.isfile(os.path.join(p, self.name)):
-                return p
-        return ''
+        return _find_directory(self.name, [self.__directory] + os.getenv('PATH', '').split(os.pathsep))
 
     @directory.setter
     def directory(self, value: str):
@@ -249,6 +758,52 @@ class BrowserExecFileOrLink:
     def version(self) -> str:
         """
         Returns the version as a string. Read-only property.
+        The version is read from the installation metadata, if possible, otherwise it is requested from the executable
+        file (or from the registry). The result is cached until the file is replaced or modified.
+        """
+        p = self.path
+        stamp = _file_stamp(p)
+        key = (p, stamp, self.reg_key, self._ver_idx)
+        if stamp and key in _version_cache:
+            return _version_cache[key]
+        version = (self._read_version_metadata() if stamp else '') or self._query_version()
+        if stamp and version:
+            _version_cache[key] = version
+        return version
+
+    def _read_version_metadata(self) -> str:
+        """
+        Returns the version read from the installation metadata without running the executable file:
+        application.ini (Firefox), a version-named directory next to the executable (Chrome on Windows) or Info.plist
+        (macOS application bundle). Returns an empty string, if there is no such metadata.
+
+        :return: str
+        """
+        directory = os.path.dirname(os.path.realpath(self.path))
+        parser = ConfigParser(interpolation=None)
+        try:
+            if parser.read(os.path.join(directory, 'application.ini'), encoding='utf-8'):
+                return parser.get('App', 'Version', fallback='')
+        except ConfigParserError:
+            pass
+        try:
+            versions = [d for d in os.listdir(directory)
+                        if re.fullmatch(r'\d+(\.\d+){3}', d) and os.path.isdir(os.path.join(directory, d))]
+        except OSError:
+            versions = []
+        if versions:
+            return max(versions, key=lambda v: tuple(map(int, v.split('.'))))
+        try:
+            with open(os.path.join(os.path.dirname(directory), 'Info.plist'), 'rb') as f:
+                return str(plistlib.load(f).get('CFBundleShortVersionString', ''))
+        except (OSError, ValueError, plistlib.InvalidFileException):
+            return ''
+
+    def _query_version(self) -> str:
+        """
+        Returns the version requested from the executable file (or from the registry on the Windows platform).
+
+        :return: str
         """
         p = self.path
         if ' ' in p:
@@ -273,158 +828,1060 @@ class BrowserExecFileOrLink:
         ver = [int(v) if v.isdigit() else 0 for v in self.version.split('.')[:length]]
         return self.__version_info(*(ver + [0] * (length - len(ver))))
 
-    def is_exists(self) -> bool:
+    def is_exists(self) -> bool:
+        """
+        Checks for the existence of a file at the specified path.
+        """
+        return os.path.isfile(self.path)
+
+
+class DriverExecFileOrLink(BrowserExecFileOrLink):
+    __VALID_PERMS = tuple(f'{owner}{group}{other}' for owner, group, other in product('04567', repeat=3))
+    _upd_log_msg = 'Updating the driver '
+
+    def __init__(self, name: str, **kwds):
+        """
+        Initializes an instance of the current class.
+
+        ...
+        :param kwds:
+            store_size: int - maximum number of driver versions kept in the store (3 by default)
+        """
+        super().__init__(name, **kwds)
+        self.directory = kwds.get('directory', '')
+        self.store_size = kwds.get('store_size', 3)
+        self._ver_idx = 1
+
+    @property
+    def directory(self) -> str:
+        """
+        Returns the directory where the file should be located, or an empty string if such a directory is not set or
+        does not exist and the file is not found in any of the directories in the PATH environment variable.
+        """
+        if not self.__directory:
+            return _find_directory(self.name, os.getenv('PATH', '').split(os.pathsep))
+        return self.__directory if os.path.isdir(self.__directory) else ''
+
+    @directory.setter
+    def directory(self, value: str):
+        """
+        Creates (if it doesn't exist) and sets the file's location directory (empty value - the file is searched for
+        through the PATH).
+        """
+        _validate_argument(value, 'value', str)
+        value = os.path.abspath(os.path.normcase(value)) if value else ''
+        if value and not os.path.exists(value):
+            os.mkdir(value)
+        self.__directory = value if os.path.isdir(value) else ''
+
+    @property
+    def store_directory(self) -> str:
+        """
+        Returns the directory of the driver store or an empty string if the driver directory is not set (the driver
+        found through the PATH is never put into the store or replaced).
+        Each stored driver version is located in the "<store>/<SHA-256 of the file>/" directory, the store index
+        ("<store>/index.json") keeps the name, version and last use time of each stored file and the stamp of the
+        driver file of the active version. Read-only property.
+        """
+        return os.path.join(self.__directory, 'store') if self.__directory and os.path.isdir(self.__directory) else ''
+
+    @property
+    def is_path_resolved(self) -> bool:
+        """
+        Checks whether the driver directory is not set and the driver file is found through the PATH. Read-only
+        property.
+        """
+        return not self.__directory and self.is_exists()
+
+    @property
+    def store_size(self) -> int:
+        """
+        Returns the maximum number of driver versions kept in the store.
+        """
+        return self.__store_size
+
+    @store_size.setter
+    def store_size(self, value: int):
+        """
+        Sets the maximum number of driver versions kept in the store (at least 1).
+        """
+        _validate_argument(value, 'value', int)
+        self.__store_size = max(value, 1)
+
+    @property
+    def active_digest(self) -> str:
+        """
+        Returns the SHA-256 of the active driver version in the store or an empty string if the active driver file is
+        not in the store. Read-only property.
+        """
+        if not self.store_directory:
+            return ''
+        return self._active_digest(_read_json(os.path.join(self.store_directory, 'index.json')))
+
+    def _active_digest(self, index: dict) -> str:
+        """
+        Returns the SHA-256 of the stored driver file whose recorded stamp matches the driver file (the link, hard link
+        or copy made by the activation) or an empty string.
+
+        :param index: dict - store index
+        :return: str
+        """
+        stamp = _file_stamp(self.path)
+        return next((digest for digest, item in index.items() if item.get('name') == self.name and
+                     item.get('active_stamp') == list(stamp)), '') if stamp else ''
+
+    def stored_versions(self) -> list:
+        """
+        Returns the driver versions available in the store, most recently used first.
+
+        :return: list of tuples (digest, version, used_at)
+        """
+        index = _read_json(os.path.join(self.store_directory, 'index.json')) if self.store_directory else {}
+        return sorted(((digest, item.get('version', ''), item.get('used_at', 0)) for digest, item in index.items()
+                       if item.get('name') == self.name and
+                       os.path.isfile(os.path.join(self.store_directory, digest, self.name))),
+                      key=lambda var: var[2], reverse=True)
+
+    def activate(self, digest: str) -> bool:
+        """
+        Makes the stored driver version active by atomically replacing the driver file with a link to it.
+        If the driver file is a regular file (not from the store), it is put into the store first, so it can be
+        activated again later.
+
+        :param digest: str - SHA-256 of the stored driver file
+        :return: bool
+        """
+        _validate_argument(digest, 'digest', str)
+        source_path = os.path.join(self.store_directory, digest, self.name) if self.store_directory and digest else ''
+        if not source_path or not os.path.isfile(source_path):
+            logger.error('Activating the driver version "%s" failed. Version not found in the store.', digest)
+            return False
+        if not self.active_digest and os.path.isfile(self.path):
+            self._put_into_store(self.path, self.version)
+        tmp_path = f'{self.path}.tmp'
+        try:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            try:
+                os.symlink(os.path.relpath(source_path, self.directory), tmp_path)
+            except (OSError, NotImplementedError):  # Windows without the symlink privilege
+                try:
+                    os.link(source_path, tmp_path)
+                except OSError:
+                    shutil.copy2(source_path, tmp_path)
+            os.replace(tmp_path, self.path)
+        except OSError as err:
+            logger.error('Activating the driver version "%s" failed. %s', digest, err)
+            return False
+        self._update_store_index(digest, used_at=time(), active_stamp=list(_file_stamp(self.path) or ()))
+        logger.info('Driver version "%s" activated.', digest)
+        return True
+
+    def switch(self, version: str) -> bool:
+        """
+        Activates the most recently used stored driver file of the given version.
+
+        :param version: str
+        :return: bool
+        """
+        _validate_argument(version, 'version', str)
+        digest = next((digest for digest, ver, _ in self.stored_versions() if ver == version), '')
+        if not digest:
+            logger.debug('Driver version %s not found in the store.', version)
+            return False
+        return digest == self.active_digest or self.activate(digest)
+
+    def rollback(self) -> bool:
+        """
+        Activates the previously used driver version from the store.
+
+        :return: bool
+        """
+        active_digest = self.active_digest
+        digest = next((digest for digest, _, _ in self.stored_versions() if digest != active_digest), '')
+        if not digest:
+            logger.error('Rolling back the driver failed. There is no previous version in the store.')
+            return False
+        return self.activate(digest)
+
+    def _put_into_store(self, path: str, version: str) -> str:
+        """
+        Puts the driver file into the store (by hard link or copy) and returns its SHA-256 or an empty string on error.
+
+        :param path: str
+        :param version: str
+        :return: str
+        """
+        digest = _file_sha256(path)
+        if not digest:
+            return ''
+        digest_dir = os.path.join(self.store_directory, digest)
+        try:
+            os.makedirs(digest_dir, exist_ok=True)
+            target_path = os.path.join(digest_dir, self.name)
+            if not os.path.isfile(target_path):
+                try:
+                    os.link(path, f'{target_path}.tmp')
+                except OSError:
+                    shutil.copy2(path, f'{target_path}.tmp')
+                os.replace(f'{target_path}.tmp', target_path)
+        except OSError as err:
+            logger.error('Putting the driver file "%s" into the store failed. %s', path, err)
+            return ''
+        self._update_store_index(digest, name=self.name, version=version)
+        return digest
+
+    def _update_store_index(self, digest: str, **item):
+        """
+        Updates the store index item of the driver file and removes the least recently used versions of the driver
+        exceeding the store size (the active version is never removed). The stamp of the active version is kept only in
+        one item of the driver.
+
+        :param digest: str
+        :param item: fields of the index item
+        """
+        with _driver_files_lock:
+            self.__update_store_index(digest, **item)
+
+    def __update_store_index(self, digest: str, **item):
+        index_path = os.path.join(self.store_directory, 'index.json')
+        index = _read_json(index_path)
+        if 'active_stamp' in item:
+            for value in index.values():
+                if value.get('name') == self.name:
+                    value.pop('active_stamp', None)
+        index.setdefault(digest, {'used_at': 0}).update(item)
+        active_digest = self._active_digest(index)
+        stored = [var[0] for var in sorted(((key, value.get('used_at', 0)) for key, value in index.items()
+                                            if value.get('name') == self.name), key=lambda var: var[1], reverse=True)]
+        for key in stored[self.store_size:]:
+            if key in (digest, active_digest):
+                continue
+            shutil.rmtree(os.path.join(self.store_directory, key), ignore_errors=True)
+            del index[key]
+            logger.debug('Driver version "%s" removed from the store.', key)
+        _write_json(index_path, index)
+
+    def _remove_from_store(self, digest: str):
+        """
+        Removes the driver version from the store (for example, a corrupted one).
+
+        :param digest: str
+        """
+        if not self.store_directory or not digest:
+            return
+        shutil.rmtree(os.path.join(self.store_directory, digest), ignore_errors=True)
+        index_path = os.path.join(self.store_directory, 'index.json')
+        with _driver_files_lock:
+            index = _read_json(index_path)
+            if index.pop(digest, None) is not None:
+                _write_json(index_path, index)
+        logger.debug('Driver version "%s" removed from the store.', digest)
+
+    def _read_version_metadata(self) -> str:
+        """
+        Drivers have no installation metadata, the version is always requested from the executable file.
+        """
+        return ''
+
+    def perms(self, value: str = '') -> str:
+        """
+        Attempts to set and/or returns file permissions.
+
+        :param value: str
+        :return: str
+        """
+        if not self.is_exists():
+            return ''
+        if value:
+            _validate_argument(value, 'value', str, self.__VALID_PERMS)
+            try:
+                os.chmod(self.path, int(f'0o{value}', 8))
+            except PermissionError:
+                logger.error('Setting file permissions failed. The current user has insufficient rights.')
+        return oct(os.stat(self.path).st_mode)[-3:]
+
+    def update(self, url: str, **kwds) -> bool:
+        """
+        Updates the driver, if needed.
+        Returns True if the driver was successfully updated or does not need to be updated, otherwise returns False.
+        If the manifest path is passed, the installed version, its checksum and the result of the latest version check
+        are recorded in the manifest. While the recorded check is younger than the TTL, it is not repeated, so no
+        network access is needed. After that, the check is made with a conditional request (ETag / If-Modified-Since).
+        The installed driver file is verified against the recorded checksum, a corrupted file is downloaded again.
+        Drivers without a known source of the latest version (see _latest_query_url) are not updated.
+
+        :param url: str
+        :param kwds:
+            manifest: str - path to the update manifest (empty - the manifest is not used)
+            ttl: int or float - time (in seconds) during which the recorded check is valid (0 (default) - always check)
+            activate: bool - activate the new version (True by default), otherwise only download it into the store
+                             (see apply_staged)
+            ...
+        :return: bool
+        """
+        _validate_argument(url, 'url', str)
+        if not url:
+            logger.error('%sfailed. URL is empty.', self._upd_log_msg)
+            return False
+        manifest_path = kwds.get('manifest', '')
+        _validate_argument(manifest_path, 'manifest', str)
+        ttl = kwds.get('ttl', 0)
+        _validate_argument(ttl, 'ttl', (int, float))
+        activate = kwds.get('activate', True)
+        _validate_argument(activate, 'activate', bool)
+        query_url = self._latest_query_url(url, **kwds)
+        if not query_url:
+            logger.info('%snot needed.', self._upd_log_msg)
+            return True
+        entry = _read_json(manifest_path).get(self.name, {}) if manifest_path else {}
+        stamp = _file_stamp(self.path)
+        if stamp and entry.get('stamp') == list(stamp) and entry.get('sha256') and \
+                _file_sha256(self.path) != entry['sha256']:
+            logger.warning('%s: the driver file is corrupted (checksum mismatch), it will be downloaded again.',
+                           self._upd_log_msg.rstrip())
+            if not self.is_path_resolved:
+                self._remove_from_store(self.active_digest)
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+            stamp = None
+        if not stamp:
+            for key in ('installed_version', 'sha256', 'stamp'):
+                entry.pop(key, None)
+        elif entry.get('stamp') != list(stamp):  # the driver was installed or replaced outside the update
+            entry.update(installed_version=self.version, sha256=_file_sha256(self.path), stamp=list(stamp))
+        if entry.get('query_url') == query_url and 0 <= time() - entry.get('checked_at', 0) < ttl:
+            logger.debug('%scheck skipped, the last check is still valid.', self._upd_log_msg)
+        else:
+            headers = {}
+            if entry.get('query_url') == query_url and entry.get('latest_version'):
+                if entry.get('etag'):
+                    headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    headers['If-Modified-Since'] = entry['last_modified']
+            response = _http_pool().request('GET', query_url, headers=headers)
+            if response.status == 200:
+                entry['latest_version'], entry['latest_url'] = self._parse_latest(url, response)
+                entry['etag'] = response.getheader('etag', '')
+                entry['last_modified'] = response.getheader('last-modified', '')
+            elif response.status != 304 or not headers:
+                logger.error('%sfailed. Response status - %s.', self._upd_log_msg, response.status)
+                return False
+            entry.update(query_url=query_url, checked_at=time())
+        if not self._is_update_needed(entry['latest_version'], entry.get('installed_version', '')):
+            if manifest_path:
+                self._write_manifest(manifest_path, entry)
+            logger.info('%snot needed.', self._upd_log_msg)
+            return True
+        if self.is_path_resolved:
+            if manifest_path:
+                self._write_manifest(manifest_path, entry)
+            logger.warning('%sskipped, version %s is available. The driver found through the PATH is not replaced, '
+                           'set the driver directory to update it.', self._upd_log_msg, entry['latest_version'])
+            return True
+        if not activate:
+            if not self._stage(entry['latest_url'], entry['latest_version'], 0):
+                logger.error('%sfailed.', self._upd_log_msg)
+                return False
+            if manifest_path:
+                self._write_manifest(manifest_path, entry)
+            logger.info('%sstaged, version %s will be activated later.', self._upd_log_msg, entry['latest_version'])
+            return True
+        if not self.switch(entry['latest_version']) and \
+                not self._install(entry['latest_url'], entry['latest_version']):
+            logger.error('%sfailed.', self._upd_log_msg)
+            return False
+        stamp = _file_stamp(self.path)
+        entry.update(installed_version=self.version, sha256=_file_sha256(self.path), stamp=list(stamp or ()))
+        if manifest_path:
+            self._write_manifest(manifest_path, entry)
+        logger.info('%ssuccessful.', self._upd_log_msg)
+        return True
+
+    def _write_manifest(self, path: str, entry: dict) -> bool:
+        """
+        Writes the manifest entry of the driver, the entries of other drivers written in the meantime are kept.
+
+        :param path: str
+        :param entry: dict
+        :return: bool
+        """
+        with _driver_files_lock:
+            manifest = _read_json(path)
+            manifest[self.name] = entry
+            return _write_json(path, manifest)
+
+    def _latest_query_url(self, url: str, **kwds) -> str:
+        """
+        Returns the URL to request the latest version of the driver or an empty string if the latest version cannot be
+        requested (the driver is not updated).
+
+        :param url: str
+        :return: str
+        """
+        return ''
+
+    def _parse_latest(self, url: str, response) -> tuple:
+        """
+        Returns the latest version of the driver and its download URL obtained from the response.
+
+        :param url: str
+        :param response: urllib3.response.HTTPResponse
+        :return: tuple (str, str)
+        """
+        return '', ''
+
+    def _is_update_needed(self, latest_version: str, installed_version: str) -> bool:
+        """
+        Checks whether the installed version of the driver should be replaced with the latest one.
+
+        :param latest_version: str
+        :param installed_version: str
+        :return: bool
+        """
+        return latest_version != installed_version
+
+    def is_compatible(self, browser_version_info: tuple) -> bool:
+        """
+        Checks whether the installed driver is compatible with the browser version (by default, any version is).
+
+        :param browser_version_info: namedtuple
+        :return: bool
+        """
+        return True
+
+    def apply_staged(self, manifest: str) -> bool:
+        """
+        Activates the latest driver version downloaded into the store by the update without activation, if it is newer
+        than the active one. No network access is needed.
+
+        :param manifest: str - path to the update manifest
+        :return: bool
+        """
+        _validate_argument(manifest, 'manifest', str)
+        latest_version = _read_json(manifest).get(self.name, {}).get('latest_version', '') if manifest else ''
+        if not latest_version or not self._is_update_needed(latest_version, self.version):
+            return False
+        if not self.switch(latest_version):
+            return False
+        logger.info('%ssuccessful, staged version %s activated.', self._upd_log_msg, latest_version)
+        return True
+
+    def _stage(self, download_url: str, version: str, method: int = 1) -> str:
+        """
+        Downloads the driver into the store (if this version is not already there) and returns its SHA-256 or an empty
+        string on error. The archive is downloaded into the store directory with resumption (an interrupted download
+        is continued by the next update), then only the driver executable is extracted from it with the permissions
+        already set, and the archive is removed.
+
+        :param download_url: str
+        :param version: str
+        :param method: int (0 - start and done messages, 1 (default) - progress bar)
+        :return: str
+        """
+        digest = next((digest for digest, ver, _ in self.stored_versions() if ver == version), '')
+        if digest:
+            return digest
+        if not self.store_directory:
+            logger.error('Putting the driver into the store failed. The driver directory is not set.')
+            return ''
+        try:
+            os.makedirs(self.store_directory, exist_ok=True)
+        except OSError as err:
+            logger.error('Creating the driver store "%s" failed. %s', self.store_directory, err)
+            return ''
+        staging_path = os.path.join(self.store_directory, f'{self.name}.download')
+        try:
+            if not stream_unpack(download_url, self.name, staging_path, message='Downloading driver', method=method,
+                                 part_dir=self.store_directory):
+                return ''
+            return self._put_into_store(staging_path, version)
+        finally:
+            if os.path.isfile(staging_path):
+                os.remove(staging_path)
+
+    def _install(self, download_url: str, version: str) -> bool:
+        """
+        Downloads and installs the driver.
+        The driver is put into the store and activated, so the driver directory must be set (the driver found through
+        the PATH is not replaced, see update).
+
+        :param download_url: str
+        :param version: str
+        :return: bool
+        """
+        if not self.store_directory:
+            logger.error('Installing the driver failed. The driver directory is not set.')
+            return False
+        digest = self._stage(download_url, version)
+        return bool(digest) and self.activate(digest)
+
+
+class DriverPrefetcher:
+    """
+    Checks for the new driver version and downloads it into the driver store in a background thread without activating
+    it, so that the driver update does not delay the browser (re)start. The downloaded version is activated by apply.
+    """
+
+    def __init__(self, driver_file: DriverExecFileOrLink, url: str, **kwds):
+        """
+        Initializes an instance of the current class.
+
+        :param driver_file: DriverExecFileOrLink
+        :param url: str
+        :param kwds: keyword arguments of the driver update (see DriverExecFileOrLink.update), the manifest is required
+        """
+        _validate_argument(driver_file, 'driver_file', DriverExecFileOrLink)
+        _validate_argument(url, 'url', str)
+        _validate_argument(kwds.get('manifest', ''), 'manifest', str)
+        self.driver_file = driver_file
+        self.url = url
+        self.__kwds = dict(kwds, activate=False)
+        self.__thread = None
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Checks whether the driver is being prefetched. Read-only property.
+        """
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def start(self) -> bool:
+        """
+        Starts prefetching the driver in the background, if it is not already running.
+
+        :return: bool
+        """
+        if self.is_running or not self.__kwds.get('manifest'):
+            return False
+        self.__thread = Thread(target=self.__run, name='driver-prefetch', daemon=True)
+        self.__thread.start()
+        return True
+
+    def __run(self):
+        try:
+            self.driver_file.update(self.url, **self.__kwds)
+        except Exception as err:  # the background update must not break anything, the driver will be checked later
+            logger.warning('Driver prefetch failed. %s', err)
+
+    def join(self, timeout: Union[int, float, None] = None):
+        """
+        Waits until the prefetch ends (None - without a timeout).
+        """
+        if self.__thread is not None:
+            self.__thread.join(timeout)
+
+    def apply(self) -> bool:
+        """
+        Activates the prefetched driver version, if any. While the prefetch is running, nothing is activated.
+
+        :return: bool
+        """
+        if self.is_running:
+            logger.debug('Driver prefetch is still running, the new version (if any) will be activated later.')
+            return False
+        return self.driver_file.apply_staged(self.__kwds['manifest'])
+
+
+class FirefoxDriverExecFileOrLink(DriverExecFileOrLink):
+    def _latest_query_url(self, url: str, **kwds) -> str:
+        return f'{url.rstrip("/")}/latest'
+
+    def _parse_latest(self, url: str, response) -> tuple:
+        ver = response.geturl().rstrip('/').split('/')[-1].lstrip('v.')
+        return ver, '{}/{}-v{}-{}{}.{}'.format(response.geturl().replace('/tag/', '/download/'),
+                                               self.name.rstrip('ex')[:-1] if self.name.endswith('.exe') else self.name,
+                                               ver,
+                                               ('', 'linux')[sys.platform.startswith('linux')] or
+                                               ('', 'win')[sys.platform.startswith('win32')] or
+                                               ('', 'macos')[sys.platform.startswith('darwin')],
+                                               (('32', '64')[sys.maxsize == 2 ** 63 - 1], '')[
+                                                   sys.platform.startswith('darwin')],
+                                               ('tar.gz', 'zip')[sys.platform.startswith('win32')])
+
+    def _is_update_needed(self, latest_version: str, installed_version: str) -> bool:
+        # the versions are compared numerically ("0.100.0" is newer than "0.99.0")
+        return _version_tuple(latest_version) > _version_tuple(installed_version)
+
+
+class ChromeDriverExecFileOrLink(DriverExecFileOrLink):
+    def update(self, url: str, **kwds) -> bool:
+        """
+        :param url: str
+        :param kwds:
+            browser_version_info: namedtuple
+        ...
+        """
+        return super().update(url, **kwds)
+
+    def is_compatible(self, browser_version_info: tuple) -> bool:
+        # the driver supports only the major version of the browser it was released for
+        _validate_argument(browser_version_info, 'browser_version_info', tuple)
+        return not browser_version_info or not browser_version_info[0] or \
+            self.version_info[0] == browser_version_info[0]
+
+    def _latest_query_url(self, url: str, **kwds) -> str:
+        ver = ''
+        if kwds.get('browser_version_info'):
+            _validate_argument(kwds['browser_version_info'], 'browser_version_info', tuple)
+            ver = '.'.join(map(str, kwds['browser_version_info'][:-1]))
+        return f'{url.rstrip("/")}/LATEST_RELEASE{("", "_")[bool(ver)]}{ver}'
+
+    def _parse_latest(self, url: str, response) -> tuple:
+        ver = response.data.decode('utf-8').lstrip('v.')
+        return ver, '{}/{}/{}_{}.zip'.format(url.rstrip('/'), ver,
+                                             self.name.rstrip('ex')[:-1] if self.name.endswith('.exe') else self.name,
+                                             ('', 'linux64')[sys.platform.startswith('linux')] or
+                                             ('', 'win32')[sys.platform.startswith('win32')] or
+                                             ('', 'mac64')[sys.platform.startswith('darwin')])
+
+
+class SessionStore:
+    def __init__(self, path: str):
+        """
+        Initializes an instance of the current class.
+
+        :param path: str - path to the session file
+        """
+        _validate_argument(path, 'path', str)
+        self.path = os.path.abspath(path)
+
+    def load(self) -> dict:
+        """
+        Returns the saved session state or an empty dictionary if there is no saved session.
+
+        :return: dict
+        """
+        return _read_json(self.path)
+
+    def save(self, state: dict) -> bool:
+        """
+        Atomically saves the session state to a file readable only by the current user.
+
+        :param state: dict
+        :return: bool
+        """
+        _validate_argument(state, 'state', dict)
+        if not state or not _write_json(self.path, state, 0o600):
+            return False
+        logger.debug('Session saved to file "%s".', self.path)
+        return True
+
+    def clear(self) -> bool:
+        """
+        Removes the saved session.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as err:
+            logger.warning('Removing the session file "%s" failed. %s', self.path, err)
+            return False
+        return True
+
+
+class FirefoxProfileDir:
+    """
+    Persistent Firefox profile directory that is passed to the browser as is with the -profile argument. Unlike the
+    profile of the browser options (FirefoxProfile) and the temporary profile created by the driver, it is not created,
+    copied, zipped and base64-encoded for every new session, and the startup cache that the browser keeps in the profile
+    survives browser restarts (the first session pre-seeds it).
+    """
+    # Preferences that the driver sets in the profiles it creates itself
+    DEFAULT_PREFERENCES = {'app.update.disabledForTesting': True,
+                           'browser.aboutwelcome.enabled': False,
+                           'browser.shell.checkDefaultBrowser': False,
+                           'browser.startup.homepage': 'about:blank',
+                           'browser.startup.homepage_override.mstone': 'ignore',
+                           'browser.startup.page': 0,
+                           'browser.tabs.warnOnClose': False,
+                           'datareporting.policy.dataSubmissionEnabled': False,
+                           'startup.homepage_welcome_url': 'about:blank',
+                           'toolkit.telemetry.reportingpolicy.firstRun': False}
+    # Sidecar file with the names of the preferences written to user.js by the last preparation
+    MANAGED_FILE = 'user.js.json'
+    __PREF_NAME = re.compile(r'\s*user_pref\(\s*("(?:[^"\\]|\\.)*")')
+
+    def __init__(self, path: str, preferences: dict = None):
+        """
+        Initializes an instance of the current class.
+
+        :param path: str - path to the profile directory (it is created, if it does not exist)
+        :param preferences: dict - preferences of the browser options
         """
-        Checks for the existence of a file at the specified path.
+        _validate_argument(path, 'path', str)
+        _validate_argument(preferences or {}, 'preferences', dict)
+        self.path = os.path.abspath(path)
+        self.preferences = dict(preferences or {})
+
+    def prepare(self, marionette_port: int) -> bool:
         """
-        return os.path.isfile(self.path)
+        Creates the profile directory and writes the preferences and the Marionette port (the driver cannot set them
+        in a profile it has not created) to the user.js file of the profile. The file is rewritten only if it differs.
+        The browser copies the preferences of user.js to prefs.js, where they stay after they are removed from
+        user.js, so the names of the written preferences are kept in a sidecar file, and the preferences that are no
+        longer written are removed from prefs.js (the browser falls back to their default values).
 
+        :param marionette_port: int
+        :return: bool
+        """
+        _validate_argument(marionette_port, 'marionette_port', int)
+        preferences = dict(self.DEFAULT_PREFERENCES, **self.preferences)
+        preferences['marionette.port'] = marionette_port
+        content = ''.join(f'user_pref({json.dumps(name)}, {json.dumps(value)});\n'
+                          for name, value in sorted(preferences.items()))
+        path = os.path.join(self.path, 'user.js')
+        managed_path = os.path.join(self.path, self.MANAGED_FILE)
+        dropped = set(_read_json(managed_path).get('preferences', [])) - set(preferences)
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            if dropped:
+                self._remove_preferences(dropped)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    if f.read() == content and not dropped:
+                        return True
+            except FileNotFoundError:
+                pass
+            with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(f'{path}.tmp', path)
+        except OSError as err:
+            logger.error('Preparing the browser profile "%s" failed. %s', self.path, err)
+            return False
+        if not _write_json(managed_path, {'preferences': sorted(preferences)}):
+            return False
+        logger.debug('Browser profile preferences written to "%s".', path)
+        return True
 
-class DriverExecFileOrLink(BrowserExecFileOrLink):
-    __VALID_PERMS = tuple(f'{owner}{group}{other}' for owner, group, other in product('04567', repeat=3))
-    _upd_log_msg = 'Updating the driver '
+    def _remove_preferences(self, names: set):
+        """
+        Removes the preferences from the prefs.js file of the profile.
+        """
+        path = os.path.join(self.path, 'prefs.js')
+        try:
+            with open(path, encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        kept = []
+        for line in lines:
+            match = self.__PREF_NAME.match(line)
+            try:
+                if match and json.loads(match.group(1)) in names:
+                    continue
+            except ValueError:
+                pass
+            kept.append(line)
+        if len(kept) == len(lines):
+            return
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            f.writelines(kept)
+        os.replace(f'{path}.tmp', path)
+        logger.debug('Browser profile preferences removed from "%s": %s', path, ', '.join(sorted(names)))
+
+
+class ProcessWatchdog:
+    """
+    Samples the memory and CPU usage of a process tree (the driver and the browser processes it has launched) via
+    /proc and reports when the configured limits are exceeded, so that the browser can be restarted before it exhausts
+    the memory of the host. The memory of a process is its proportional set size (PSS, the shared pages are divided
+    between the processes sharing them), so the sum over the browser processes does not count the shared libraries
+    once per process. Without PSS (Linux before 4.14), the resident set size (RSS) is summed, which overestimates the
+    usage. Without /proc (not Linux), the usage is not sampled.
+    """
+    Usage = namedtuple('Usage', 'pids memory cpu_percent')
 
-    def __init__(self, name: str, **kwds):
+    def __init__(self, max_memory: int = 0, max_cpu: Union[int, float] = 0):
         """
         Initializes an instance of the current class.
+
+        :param max_memory: int - limit of the total memory (PSS) of the process tree in bytes (0 - no limit)
+        :param max_cpu: int or float - limit of the average CPU usage of the process tree since the previous sample in
+                                       percent of one core (0 - no limit)
         """
-        super().__init__(name, **kwds)
-        self.directory = kwds.get('directory', '')
-        self._ver_idx = 1
+        _validate_argument(max_memory, 'max_memory', int)
+        _validate_argument(max_cpu, 'max_cpu', (int, float))
+        self.max_memory = max_memory
+        self.max_cpu = max_cpu
+        self.__page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+        self.__clock_ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self.__last = None  # (root pid, time, CPU seconds) of the previous sample
 
     @property
-    def directory(self) -> str:
+    def is_supported(self) -> bool:
         """
-        Returns the directory where the file should be located, or an empty string if such a directory is not set or
-        does not exist and the file is not found in any of the directories in the PATH environment variable.
+        Checks whether the process usage can be sampled on this system. Read-only property.
         """
-        if not self.__directory:
-            for p in os.getenv('PATH', '').split((':', ';')[sys.platform.startswith('win32')]):
-                if p and os.path.isfile(os.path.join(p, self.name)):
-                    return p
-        return self.__directory if os.path.isdir(self.__directory) else ''
+        return os.path.isfile('/proc/self/stat')
 
-    @directory.setter
-    def directory(self, value: str):
+    def reset(self):
         """
-        Creates (if it doesn't exist) and sets the file's location directory.
+        Forgets the previous sample (for example, after the browser restart).
         """
-        _validate_argument(value, 'value', str)
-        value = os.path.abspath(os.path.normcase(value))
-        if value and not os.path.exists(value):
-            os.mkdir(value)
-        self.__directory = value if os.path.isdir(value) else ''
+        self.__last = None
 
-    def perms(self, value: str = '') -> str:
+    def _read_stat(self, pid: str) -> Union[tuple, None]:
         """
-        Attempts to set and/or returns file permissions.
+        Returns the parent pid and the CPU time (user and system, in seconds) of the process.
+        """
+        try:
+            with open(f'/proc/{pid}/stat', 'rb') as f:
+                fields = f.read().rsplit(b')', 1)[1].split()  # the command name can contain spaces and brackets
+        except (OSError, IndexError):
+            return None
+        return int(fields[1]), (int(fields[11]) + int(fields[12])) / self.__clock_ticks
 
-        :param value: str
+    def _read_memory(self, pid: int) -> int:
+        try:
+            with open(f'/proc/{pid}/smaps_rollup', 'rb') as f:
+                for line in f:
+                    if line.startswith(b'Pss:'):
+                        return int(line.split()[1]) * 1024  # in kB
+        except (OSError, IndexError, ValueError):
+            pass
+        try:
+            with open(f'/proc/{pid}/statm', 'rb') as f:
+                return int(f.read().split()[1]) * self.__page_size
+        except (OSError, IndexError, ValueError):
+            return 0
+
+    def sample(self, pid: int) -> Union[Usage, None]:
+        """
+        Returns the usage of the process and all its descendants: pids, total memory (PSS, or RSS if PSS is not
+        available) in bytes and average CPU usage since the previous sample of the same process in percent of one core
+        (None for the first sample).
+        Returns None if the usage cannot be sampled.
+
+        :param pid: int - pid of the root process (the driver)
+        :return: Usage or None
+        """
+        _validate_argument(pid, 'pid', int)
+        if not self.is_supported:
+            return None
+        stats = {}
+        for name in os.listdir('/proc'):
+            if name.isdigit():
+                stat_ = self._read_stat(name)
+                if stat_:
+                    stats[int(name)] = stat_
+        if pid not in stats:
+            return None
+        children = {}
+        for child, (parent, _) in stats.items():
+            children.setdefault(parent, []).append(child)
+        pids, stack = [], [pid]
+        while stack:
+            current = stack.pop()
+            pids.append(current)
+            stack.extend(children.get(current, ()))
+        now, cpu_seconds = monotonic(), sum(stats[current][1] for current in pids)
+        cpu_percent = None
+        if self.__last and self.__last[0] == pid and now > self.__last[1]:
+            # the CPU time of the processes that have exited is lost, so the difference can be negative
+            cpu_percent = round(max(cpu_seconds - self.__last[2], 0) / (now - self.__last[1]) * 100, 1)
+        self.__last = (pid, now, cpu_seconds)
+        return self.Usage(tuple(pids), sum(self._read_memory(current) for current in pids), cpu_percent)
+
+    def check(self, pid: Union[int, None]) -> str:
+        """
+        Samples the usage of the process tree and returns the description of the exceeded limits (empty string, if
+        the limits are not exceeded or the usage cannot be sampled).
+
+        :param pid: int or None - pid of the root process (the driver)
         :return: str
         """
-        if not self.is_exists():
+        if not pid or not (self.max_memory or self.max_cpu):
             return ''
-        if value:
-            _validate_argument(value, 'value', str, self.__VALID_PERMS)
-            try:
-                os.chmod(self.path, int(f'0o{value}', 8))
-            except PermissionError:
-                logger.error('Setting file permissions failed. The current user has insufficient rights.')
-        return oct(os.stat(self.path).st_mode)[-3:]
+        usage = self.sample(pid)
+        if not usage:
+            return ''
+        logger.debug('Driver and browser processes: %s, memory: %.1f MiB, CPU: %s%%', len(usage.pids),
+                     usage.memory / 2 ** 20, usage.cpu_percent if usage.cpu_percent is not None else '-')
+        exceeded = []
+        if self.max_memory and usage.memory > self.max_memory:
+            exceeded.append(f'memory {usage.memory / 2 ** 20:.1f} MiB > {self.max_memory / 2 ** 20:.1f} MiB')
+        if self.max_cpu and usage.cpu_percent is not None and usage.cpu_percent > self.max_cpu:
+            exceeded.append(f'CPU {usage.cpu_percent}% > {self.max_cpu}%')
+        return ', '.join(exceeded)
 
-    def update(self, url: str) -> bool:
-        """
-        Updates the driver, if needed.
-        Returns True if the driver was successfully updated or does not need to be updated, otherwise returns False.
 
-        :param url: str
-        :return: bool
-        """
-        _validate_argument(url, 'url', str)
-        if not url:
-            logger.error('%sfailed. URL is empty.', self._upd_log_msg)
-            return False
-        return True
+class CommandTracer:
+    """
+    Traces the WebDriver commands of the faucet object. Every command is recorded with its duration, the calling
+    operation (the outermost public method or property of the faucet object being executed), the locator of the element
+    wait it belongs to and whether that wait timed out. Durations are accumulated in fixed-bucket histograms, and only
+    the last records are kept, so the overhead and the memory do not grow with the run time.
+    """
+    # Upper bounds of the histogram buckets (in seconds), the last bucket is unbounded
+    BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30)
+    Record = namedtuple('Record', 'command operation locator seconds timed_out')
 
+    def __init__(self, size: int = 1000):
+        """
+        Initializes an instance of the current class.
 
-class FirefoxDriverExecFileOrLink(DriverExecFileOrLink):
-    def update(self, url: str, **kwds) -> bool:
-        if not super().update(url):
-            return False
-        response = urllib3.PoolManager().request('GET', f'{url.rstrip("/")}/latest')
-        if response.status != 200:
-            logger.error('%sfailed. Response status - %s.', self._upd_log_msg, response.status)
-            return False
-        ver = response.geturl().rstrip('/').split('/')[-1].lstrip('v.')
-        if ver <= self.version:
-            logger.info('%snot needed.', self._upd_log_msg)
-            return True
-        if not unpack_archive(
-                download_file('{}/{}-v{}-{}{}.{}'.format(response.geturl().replace('/tag/', '/download/'),
-                                                         self.name.rstrip('ex')[:-1] if self.name.endswith(
-                                                             '.exe') else self.name, ver,
-                                                         ('', 'linux')[sys.platform.startswith('linux')] or
-                                                         ('', 'win')[sys.platform.startswith('win32')] or
-                                                         ('', 'macos')[sys.platform.startswith('darwin')],
-                                                         (('32', '64')[sys.maxsize == 2 ** 63 - 1], '')[
-                                                             sys.platform.startswith('darwin')],
-                                                         ('tar.gz', 'zip')[sys.platform.startswith('win32')]),
-                              target_dir=self.directory, message='Downloading driver', method=1),
-                target_dir=self.directory):
-            logger.error('%sfailed.', self._upd_log_msg)
-            return False
-        if self.perms('755') < '755':
-            logger.error('%sfailed.', self._upd_log_msg)
-            return False
-        logger.info('%ssuccessful.', self._upd_log_msg)
-        return True
+        :param size: int - number of the last records kept
+        """
+        _validate_argument(size, 'size', int)
+        self.records = deque(maxlen=size)
+        self.commands = {}  # command name: [count, seconds, histogram]
+        self.waits = {}  # locator: [count, seconds, timeouts]
+        self.operations = {}  # operation name: [commands, seconds]
+        self.__wait = None  # [locator, start, pending records] of the current element wait
 
+    def reset(self):
+        """
+        Clears the statistics (the last records are kept).
+        """
+        self.commands = {}
+        self.waits = {}
+        self.operations = {}
 
-class ChromeDriverExecFileOrLink(DriverExecFileOrLink):
-    def update(self, url: str, **kwds) -> bool:
+    def attach(self, driver):
         """
-        :param url: str
-        :param kwds:
-            browser_version_info: namedtuple
-        ...
+        Wraps the command execution method of the driver (the driver elements execute commands through it as well).
         """
-        if not super().update(url):
-            return False
-        ver = ''
-        if kwds.get('browser_version_info'):
-            _validate_argument(kwds['browser_version_info'], 'browser_version_info', tuple)
-            ver = '.'.join(map(str, kwds['browser_version_info'][:-1]))
-        response = urllib3.PoolManager().request('GET', f'{url.rstrip("/")}/LATEST_RELEASE{("", "_")[bool(ver)]}{ver}')
-        if response.status != 200:
-            logger.error('%sfailed. Response status - %s.', self._upd_log_msg, response.status)
-            return False
-        ver = response.data.decode('utf-8').lstrip('v.')
-        if ver == self.version:
-            logger.info('%snot needed.', self._upd_log_msg)
-            return True
-        if not unpack_archive(
-                download_file('{}/{}/{}_{}.zip'.format(url.rstrip('/'), ver,
-                                                       self.name.rstrip('ex')[:-1] if self.name.endswith(
-                                                           '.exe') else self.name,
-                                                       ('', 'linux64')[sys.platform.startswith('linux')] or
-                                                       ('', 'win32')[sys.platform.startswith('win32')] or
-                                                       ('', 'mac64')[sys.platform.startswith('darwin')]),
-                              target_dir=self.directory, message='Downloading driver', method=1),
-                target_dir=self.directory):
-            logger.error('%sfailed.', self._upd_log_msg)
-            return False
+        execute = driver.execute
+
+        def traced_execute(driver_command, params=None):
+            start = monotonic()
+            try:
+                return execute(driver_command, params)
+            finally:
+                self._record(driver_command, params, monotonic() - start)
+
+        driver.execute = traced_execute
+
+    def _record(self, command: str, params: Union[dict, None], seconds: float):
+        operation = _current_operation.get() or '-'
+        item = self.commands.get(command)
+        if item is None:
+            item = self.commands[command] = [0, 0.0, [0] * (len(self.BUCKETS) + 1)]
+        item[0] += 1
+        item[1] += seconds
+        index = 0
+        while index < len(self.BUCKETS) and seconds > self.BUCKETS[index]:
+            index += 1
+        item[2][index] += 1
+        item = self.operations.setdefault(operation, [0, 0.0])
+        item[0] += 1
+        item[1] += seconds
+        if self.__wait is not None:
+            self.__wait[2].append((command, operation, self.__wait[0], seconds))
+        else:
+            locator = f'{params["using"]}: {params["value"]}' if params and 'using' in params else ''
+            self.records.append(self.Record(command, operation, locator, seconds, False))
+
+    def begin_wait(self, locator: str):
+        """
+        Marks the beginning of an element wait: the following commands are attributed to the locator.
+        """
+        self.__wait = [locator, monotonic(), []]
+
+    def end_wait(self, timed_out: bool = False):
+        """
+        Marks the end of the current element wait.
+        """
+        if self.__wait is None:
+            return
+        locator, start, pending = self.__wait
+        self.__wait = None
+        item = self.waits.setdefault(locator, [0, 0.0, 0])
+        item[0] += 1
+        item[1] += monotonic() - start
+        item[2] += bool(timed_out)
+        self.records.extend(self.Record(*record, timed_out) for record in pending)
+
+    def percentile(self, command: str, percent: float) -> float:
+        """
+        Returns the upper bound (in seconds) of the histogram bucket containing the percentile of the command
+        durations (inf - beyond the last bucket, 0 - no such commands).
+        """
+        item = self.commands.get(command)
+        if not item:
+            return 0.0
+        rank, total = item[0] * percent / 100, 0
+        for bound, number in zip(self.BUCKETS + (float('inf'),), item[2]):
+            total += number
+            if total >= rank:
+                return bound
+        return float('inf')
+
+    def summary(self, top: int = 5) -> dict:
+        """
+        Returns the summary of the traced commands: the total number and time of the commands, the number of element
+        waits that timed out, the top locators by the total wait time and the statistics of each command and operation.
+
+        :param top: int - number of the top locators
+        :return: dict
+        """
+        waits = sorted(self.waits.items(), key=lambda item: item[1][1], reverse=True)
+        return {'commands': sum(item[0] for item in self.commands.values()),
+                'seconds': sum(item[1] for item in self.commands.values()),
+                'timeouts': sum(item[2] for item in self.waits.values()),
+                'top_waits': [(locator, *item) for locator, item in waits[:top]],
+                'by_command': {name: {'count': item[0], 'seconds': item[1], 'p50': self.percentile(name, 50),
+                                      'p95': self.percentile(name, 95)} for name, item in self.commands.items()},
+                'by_operation': {name: {'commands': item[0], 'seconds': item[1]}
+                                 for name, item in self.operations.items()}}
+
+    def log_summary(self, title: str = 'Commands', top: int = 5, log_level: int = 20, reset: bool = True):
+        """
+        Logs the summary and, by default, clears the statistics.
+        """
+        summary = self.summary(top)
+        logger.log(log_level, '%s: %s WebDriver commands in %.2fs, %s element wait(s) timed out.', title,
+                   summary['commands'], summary['seconds'], summary['timeouts'])
+        for locator, number, seconds, timeouts in summary['top_waits']:
+            logger.log(log_level, 'Wait %.2fs (%s time(s)%s): %s', seconds, number,
+                       f', {timeouts} timed out' if timeouts else '', locator)
+        for name, item in sorted(summary['by_command'].items(), key=lambda item: item[1]['seconds'], reverse=True):
+            logger.log(min(log_level, 10), 'Command %s: %s time(s), %.3fs, p50 <= %ss, p95 <= %ss', name,
+                       item['count'], item['seconds'], item['p50'], item['p95'])
+        if reset:
+            self.reset()
+
+
+def _operation(func):
+    """
+    Decorator that sets the name of the current operation for the duration of the outermost public method or property
+    of the faucet object (the nested calls keep the name of the outermost one).
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwds):
+        if _current_operation.get():
+            return func(*args, **kwds)
+        token = _current_operation.set(name)
         try:
-            os.remove(os.path.join(self.directory, 'LICENSE.{}'.format(
-                self.name.rstrip('ex')[:-1] if self.name.endswith('.exe') else self.name)))
+            return func(*args, **kwds)
         finally:
-            pass
-        if self.perms('755') < '755':
-            logger.error('%sfailed.', self._upd_log_msg)
-            return False
-        logger.info('%ssuccessful.', self._upd_log_msg)
-        return True
+            _current_operation.reset(token)
 
+    return wrapper
 
+
+def _trace_operations(cls: type) -> type:
+    """
+    Class decorator that applies the operation decorator to the public methods and properties of the class.
+    """
+    for name, value in list(vars(cls).items()):
+        if name.startswith('_'):
+            continue
+        if isinstance(value, property):
+            setattr(cls, name, property(*(_operation(func) if func else None
+                                          for func in (value.fget, value.fset, value.fdel)), value.__doc__))
+        elif isinstance(value, FunctionType):
+            setattr(cls, name, _operation(value))
+    return cls
+
+
+@_trace_operations
 class FreeBitcoinFaucet:
     # For reference:
     #
@@ -439,6 +1896,75 @@ class FreeBitcoinFaucet:
     URL = 'https://freebitco.in'
     __VALID_LOG_LEVELS = tuple(range(0, 60, 10))
     __VALID_BONUS_KEYS = ('btc', 'lt', 'wof')
+    __VALID_WAIT_ENGINES = ('polling', 'browser', 'observer')
+    # The conditions of wait_any are evaluated together on the driver with the common timeout, so the keyword
+    # arguments of _get_elements per element wait (timeout, parent, probe, ...) are not supported
+    __VALID_CONDITION_KEYS = ('wait_until', 'ec', 'locator', 'locator_value', 'attr_or_prop', 'value')
+    __VALID_DRIVER_BACKENDS = ('selenium', 'w3c')
+    # Requests to the blocked hosts are sent to a closed local port (the discard port), so they fail immediately
+    __BLOCKING_PAC = '''
+        function FindProxyForURL(url, host) {
+            var hosts = %s;
+            for (var i = 0; i < hosts.length; i++) {
+                if (shExpMatch(host, hosts[i]) || hosts[i].indexOf('*.') === 0 && host === hosts[i].substring(2))
+                    return 'PROXY 127.0.0.1:9';
+            }
+            return 'DIRECT';
+        }'''
+    __FONT_URL_PATTERNS = ('*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot')
+    __snapshot = NamedTuple('snapshot', [('balance_btc', Decimal), ('balance_rp', int), ('balance_lt', int),
+                                         ('winning_btc', Decimal), ('winning_rp', int), ('winning_lt', int),
+                                         ('winning_wof', int), ('free_play_countdown', int), ('free_play_cost', int)])
+    # Collects the text content of all the elements read by the snapshot in a single WebDriver command.
+    # The selectors are the CSS equivalents of the locators used by the corresponding properties.
+    __SNAPSHOT_SCRIPT = '''
+        var text = function (selector) {
+            var element = document.querySelector(selector);
+            return element ? element.textContent : '';
+        };
+        return {
+            balance_btc: text('[id^="balance"]'),
+            balance_rp: text('#rewards_tab div[class*="user_reward_points"]'),
+            balance_lt: text('#user_lottery_tickets'),
+            winning_btc: text('#winnings'),
+            winning_rp: text('#fp_reward_points_won'),
+            winning_lt: text('#fp_lottery_tickets_won'),
+            winning_wof: text('#fp_bonus_wins > a'),
+            free_play_countdown: Array.prototype.map.call(
+                document.querySelectorAll('#time_remaining span.countdown_amount'),
+                function (element) { return element.textContent; }),
+            free_play_cost: text('#play_without_captcha_desc span')
+        };'''
+    # Waits in the browser until the condition is met (or is no longer met) and reports the result through the
+    # callback of execute_async_script. The condition is re-checked on every DOM mutation, and additionally at a short
+    # interval, since style changes coming from stylesheets and layout are not DOM mutations.
+    __OBSERVER_SCRIPT = '''
+        var done = arguments[arguments.length - 1], root = arguments[0] || document, until = arguments[1],
+            timeout = arguments[2], finished = false, observer, timer, interval;''' + EC.JS_HELPERS + '''
+        var condition = function (root) { /* condition */ };
+        var finish = function (result) {
+            if (finished) return;
+            finished = true;
+            if (observer) observer.disconnect();
+            clearTimeout(timer);
+            clearInterval(interval);
+            done(result);
+        };
+        var check = function () {
+            try {
+                var value = condition(root);
+                if (until ? value : !value) finish({value: until ? value : true});
+            } catch (e) {
+                finish({error: e.name + ': ' + e.message});
+            }
+        };
+        check();
+        if (!finished) {
+            observer = new MutationObserver(check);
+            observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+            interval = setInterval(check, 250);
+            timer = setTimeout(function () { finish(null); }, timeout * 1000);
+        }'''
 
     def __new__(cls, **kwds):
         """
@@ -447,6 +1973,26 @@ class FreeBitcoinFaucet:
 
         :param kwds:
             browser_name: str (firefox, chrome, edge, ie, opera, safari, etc.)
+            driver_type: callable - webdriver class or factory (by default, it is selected by browser_name and
+                                    driver_backend)
+            driver_backend: str - 'selenium' (default) - the Selenium webdriver class of the browser, 'w3c' - the
+                                  Selenium remote driver that sends the commands to the driver process through the
+                                  minimal W3C client over a single keep-alive connection (only Firefox and Chrome,
+                                  see the w3c module)
+            trace_commands: bool - trace the WebDriver commands (see CommandTracer and the tracer property)
+            block_resources: dict - resources that are not loaded by the browser (only Firefox and Chrome):
+                images: bool
+                fonts: bool - web fonts
+                media: bool - autoplay of audio and video
+                hosts: list - patterns of the blocked (third-party) hosts, for example, "*.doubleclick.net" (the
+                              pattern matches the domain itself and its subdomains)
+            profile_dir: str - persistent browser profile directory used as is by every session (only Firefox and
+                               Chrome; for Firefox, the preferences of the driver options are written to it, see
+                               FirefoxProfileDir)
+            http_cache_size: int - size limit (in bytes) of the HTTP disk cache kept in the persistent profile
+                                   directory across refreshes and restarts (0 - the cache settings of the driver
+                                   options are used as is); the private browsing of Firefox and the incognito mode of
+                                   Chrome, which discard the cache, are turned off
             driver_exec_path: str (None - search for the driver in the directories specified in the PATH environment
                                    variable)
             driver_log_path: str (None - logging will be done in the current directory)
@@ -455,7 +2001,13 @@ class FreeBitcoinFaucet:
         instance = super().__new__(cls)
         browser_name = kwds.get('browser_name', 'firefox')
         _validate_argument(browser_name, 'browser_name', str)
-        driver_type = getattr(webdriver, browser_name.capitalize(), webdriver.Firefox)
+        driver_backend = kwds.get('driver_backend', 'selenium')
+        _validate_argument(driver_backend, 'driver_backend', str, cls.__VALID_DRIVER_BACKENDS)
+        driver_type = kwds.get('driver_type')
+        if not driver_type and driver_backend == 'w3c':
+            driver_type = partial(w3c.WebDriver, browser_name)
+        elif not driver_type:
+            driver_type = getattr(webdriver, browser_name.capitalize(), webdriver.Firefox)
         driver_kwds = {}
         if kwds.get('driver_exec_path'):
             _validate_argument(kwds['driver_exec_path'], 'driver_exec_path', str)
@@ -478,15 +2030,30 @@ class FreeBitcoinFaucet:
                 _validate_argument(kwds['driver_options']['arguments'], 'driver_options_arguments', (list, tuple, set))
                 for option in kwds['driver_options']['arguments']:
                     driver_kwds['options'].add_argument(option)
+        instance.__blocked_urls = []
+        if kwds.get('block_resources'):
+            _validate_argument(kwds['block_resources'], 'block_resources', dict)
+            instance.__blocked_urls = cls._apply_blocking_profile(driver_kwds['options'], kwds['block_resources'])
+        instance.__profile = None
+        instance.__service_args = list(driver_kwds.get('service_args') or [])
+        if kwds.get('profile_dir'):
+            _validate_argument(kwds['profile_dir'], 'profile_dir', str)
+            http_cache_size = kwds.get('http_cache_size', 0)
+            _validate_argument(http_cache_size, 'http_cache_size', int)
+            instance.__profile = cls._apply_profile_dir(driver_kwds, kwds['profile_dir'], http_cache_size)
+        elif kwds.get('http_cache_size'):
+            logger.warning('HTTP disk cache is kept only in the persistent profile directory (profile_dir).')
+        instance.__driver_type = driver_type
+        instance.__driver_kwds = driver_kwds
+        instance.__tracer = CommandTracer() if kwds.get('trace_commands') else None
+        instance.__spent_free_play_cost = 0
+        instance.__probe_absent = bool(kwds.get('probe_absent', False))
         log_msg = 'Create faucet object '
-        try:
-            instance._driver = driver_type(**driver_kwds)
+        if instance._create_driver():
             logger.info('%ssuccessful.', log_msg)
             return instance
-        except WebDriverException as err:
-            logger.error(err.msg)
-            logger.critical('%sfailed.', log_msg)
-            return None
+        logger.critical('%sfailed.', log_msg)
+        return None
 
     def __init__(self, **kwds):
         """
@@ -499,9 +2066,17 @@ class FreeBitcoinFaucet:
             timeout_elem_wait: int or float - time to wait (in seconds) for an element(s) to appear in the DOM and/or
                                               (in)visibility before an exception TimeoutException is raised
             check_for_captcha: bool - captcha check status
+            probe_absent: bool - end the waits for elements that are often absent as soon as the page has settled
+            wait_engine: str - 'polling' (default) - WebDriverWait polling, 'browser' - WebDriverWait polling of the
+                               conditions evaluated in the browser (one WebDriver command per poll), 'observer' -
+                               waiting in the browser for DOM mutations (conditions without a browser-side version are
+                               always polled)
+            use_snapshot: bool - read balances, winnings and free play values from a fresh snapshot
             open: bool - open or not site
             open_url: str
-            sign_in: bool - sign-in or not (sign-in is only possible if the site is open)
+            session_state: dict - session state to restore before opening the site (see get_session_state)
+            sign_in: bool - sign-in or not (sign-in is only possible if the site is open and is skipped if the user is
+                            authenticated by the restored session)
             sign_in_address: str
             sign_in_password: str
             sign_in_totp_secret: str
@@ -509,7 +2084,8 @@ class FreeBitcoinFaucet:
         # WebDriver will wait until the page has fully loaded (that is, the “onload” event has fired) before returning
         # control to your script. Be aware that if your page uses a lot of AJAX on load then WebDriver may not know when
         # it has completely loaded.
-        if kwds.get('timeout_page_load'):
+        self.__is_timeout_page_load_set = bool(kwds.get('timeout_page_load'))
+        if self.__is_timeout_page_load_set:
             self._driver.set_page_load_timeout(kwds['timeout_page_load'])
         self.__timeout_page_load = kwds.get('timeout_page_load',
                                             self._driver.capabilities['timeouts'].get('pageLoad', 60))
@@ -517,11 +2093,20 @@ class FreeBitcoinFaucet:
         self.__timeout_elem_wait = kwds.get('timeout_elem_wait', 10)
         _validate_argument(self.__timeout_elem_wait, 'timeout_elem_wait', (int, float))
         self.__check_for_captcha = bool(kwds.get('check_for_captcha', True))
+        self.__use_snapshot = bool(kwds.get('use_snapshot', False))
+        self.__wait_engine = kwds.get('wait_engine', 'polling')
+        _validate_argument(self.__wait_engine, 'wait_engine', str, self.__VALID_WAIT_ENGINES)
+        self.__script_timeout = self._driver.capabilities.get('timeouts', {}).get('script', 30000) / 1000
+        self.__address = ''
         self.__password = ''
         self.__totp_secret = ''
         if kwds.get('open'):
+            session_state = kwds.get('session_state', {})
+            _validate_argument(session_state, 'session_state', dict)
+            if session_state:
+                self.set_session_state(session_state, False)
             if self.open(kwds.get('open_url', '')):
-                if kwds.get('sign_in'):
+                if kwds.get('sign_in') and not (session_state.get('authenticated') and self.is_authenticated()):
                     self.sign_in(kwds.get('sign_in_address', ''),
                                  kwds.get('sign_in_password', ''),
                                  kwds.get('sign_in_totp_secret', ''))
@@ -529,10 +2114,136 @@ class FreeBitcoinFaucet:
     def __str__(self):
         return self.__class__.__name__.replace('inFaucet', '.in')
 
+    def _create_driver(self) -> bool:
+        """
+        Creates an instance of the webdriver class with the arguments prepared when creating the current instance.
+        """
+        if not self._prepare_profile_dir():
+            return False
+        try:
+            self._driver = self.__driver_type(**self.__driver_kwds)
+            if self.__tracer:
+                self.__tracer.attach(self._driver)
+            if self.__blocked_urls:
+                try:
+                    self._driver.execute_cdp_cmd('Network.enable', {})
+                    self._driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.__blocked_urls})
+                except (WebDriverException, AttributeError) as err:
+                    logger.warning('Blocking of the URLs failed. %s', getattr(err, 'msg', err))
+            if self.__probe_absent and self._driver.capabilities.get('browserName') == 'chrome':
+                # the requests are tracked from the creation of each document, including the reloads made by the site
+                # itself, so the probes do not need the quiet period after a late installation
+                try:
+                    self._driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument',
+                                                 {'source': EC.JS_TRACK_REQUESTS_ON_NEW_DOCUMENT})
+                except (WebDriverException, AttributeError) as err:
+                    logger.debug('Tracking of the requests on new documents failed. %s', getattr(err, 'msg', err))
+            return True
+        except WebDriverException as err:
+            logger.error(err.msg)
+            return False
+
+    @classmethod
+    def _apply_blocking_profile(cls, options, policy: dict) -> list:
+        """
+        Sets the browser preferences (and, for Firefox, the proxy auto-config that blocks the hosts) of the blocking
+        policy. Returns the URL patterns to block with the DevTools protocol after the driver is created (Chrome).
+
+        :param options: browser options
+        :param policy: dict - see block_resources of the __new__ method
+        :return: list
+        """
+        hosts = policy.get('hosts', ())
+        _validate_argument(hosts, 'block_resources_hosts', (list, tuple, set))
+        blocked_urls = []
+        if hasattr(options, 'set_preference'):  # Firefox
+            preferences = {'network.prefetch-next': False, 'network.dns.disablePrefetch': True}
+            if policy.get('images'):
+                preferences['permissions.default.image'] = 2
+            if policy.get('fonts'):
+                preferences.update({'browser.display.use_document_fonts': 0, 'gfx.downloadable_fonts.enabled': False})
+            if policy.get('media'):
+                preferences['media.autoplay.default'] = 5
+            if hosts:
+                pac = cls.__BLOCKING_PAC % json.dumps(sorted(hosts))
+                preferences.update({'network.proxy.type': 2, 'network.proxy.failover_direct': False,
+                                    'network.proxy.autoconfig_url': 'data:application/x-ns-proxy-autoconfig;base64,' +
+                                                                    base64.b64encode(pac.encode()).decode()})
+            for name, value in preferences.items():
+                options.set_preference(name, value)
+        elif hasattr(options, 'add_experimental_option'):  # Chrome
+            prefs = dict(options.experimental_options.get('prefs', {}))
+            if policy.get('images'):
+                prefs['profile.managed_default_content_settings.images'] = 2
+            options.add_experimental_option('prefs', prefs)
+            if policy.get('fonts'):
+                blocked_urls.extend(cls.__FONT_URL_PATTERNS)
+            if policy.get('media'):
+                options.add_argument('--autoplay-policy=user-gesture-required')
+            for host in sorted(hosts):
+                for host_ in (host, host[2:]) if host.startswith('*.') else (host,):
+                    blocked_urls.extend((f'*://{host_}/*', f'*://{host_}:*'))
+        else:
+            logger.warning('Resource blocking is not supported by the browser.')
+        return blocked_urls
+
+    @staticmethod
+    def _apply_profile_dir(driver_kwds: dict, path: str, http_cache_size: int = 0) -> Union[FirefoxProfileDir, None]:
+        """
+        Makes the browser use the persistent profile directory. For Firefox, the preferences are moved from the
+        options (they would make the driver create a temporary profile) to the returned profile, which is prepared
+        before each launch of the browser (see _prepare_profile_dir).
+        If the HTTP cache size is set, the disk cache of the browser is kept in the profile with this size limit, and
+        the private browsing (Firefox) and the incognito mode (Chrome) are turned off, since they discard the cache.
+
+        :param driver_kwds: dict - keyword arguments of the webdriver class
+        :param path: str
+        :param http_cache_size: int - in bytes (0 - the cache settings of the options are used as is)
+        :return: FirefoxProfileDir or None
+        """
+        options = driver_kwds.get('options')
+        if hasattr(options, 'set_preference'):  # Firefox
+            profile = FirefoxProfileDir(path, options.preferences)
+            options.preferences.clear()
+            if http_cache_size > 0:
+                profile.preferences.update({'browser.privatebrowsing.autostart': False,
+                                            'browser.cache.disk.enable': True,
+                                            'browser.cache.disk.smart_size.enabled': False,
+                                            'browser.cache.disk.capacity': max(http_cache_size // 1024, 1)})  # in KiB
+            options.add_argument('-profile')
+            options.add_argument(profile.path)
+            return profile
+        if hasattr(options, 'add_experimental_option'):  # Chrome
+            if http_cache_size > 0:
+                options.arguments[:] = [argument for argument in options.arguments
+                                        if argument != '--incognito' and not argument.startswith('--disk-cache-size=')]
+                options.add_argument(f'--disk-cache-size={http_cache_size}')
+            options.add_argument(f'--user-data-dir={os.path.abspath(path)}')
+        else:
+            logger.warning('Persistent profile is not supported by the browser.')
+        return None
+
+    def _prepare_profile_dir(self) -> bool:
+        """
+        Writes the preferences of the persistent Firefox profile with a free Marionette port (the driver cannot set it
+        in the profile) and passes the port to the driver. The port is chosen for each launch of the browser, since
+        the port of the previous launch may have been taken by another process in the meantime.
+        """
+        if not self.__profile:
+            return True
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        if not self.__profile.prepare(port):
+            return False
+        self.__driver_kwds['service_args'] = self.__service_args + ['--marionette-port', str(port)]
+        return True
+
     def _get_elements(self, **kwds) -> list:
         """
         Returns existing and/or visible DOM elements.
-        Returns [True], if the condition is met but no element could be retrieved.
+        Returns [True], if the condition is met but no element could be retrieved, or if the condition is no longer met
+        (wait_until is False), whatever the wait engine.
 
         :param kwds:
             wait_until: bool
@@ -543,37 +2254,122 @@ class FreeBitcoinFaucet:
             locator_value: str
             attr_or_prop: str - attribute or property or css property
             value: str - title/text or attribute/property/css property value
+            wait_engine: str ('polling', 'browser' or 'observer') - by default, the engine set for the instance is used
+            probe: bool - if probing is enabled for the instance, the wait ends as soon as the page has settled (the
+                          document is loaded, the probe container has rendered and no XHR is in flight)
+            probe_locator: By - probe container locator (ID (default), ...)
+            probe_locator_value: str - probe container locator value (by default, the parent or the document body)
             log_level: int (0, 10, 20, 30, 40 (default), 50)
         :return: list
         """
         timeout = kwds.get('timeout', self.__timeout_elem_wait)
         _validate_argument(timeout, 'timeout', (int, float))
-        wait = WebDriverWait(kwds.get('parent', self._driver), timeout, ignored_exceptions=None)
-        wait = getattr(wait, f'until{("_not", "")[bool(kwds.get("wait_until", True))]}', wait.until)
+        wait_until = bool(kwds.get('wait_until', True))
+        wait_engine = kwds.get('wait_engine', self.__wait_engine)
+        _validate_argument(wait_engine, 'wait_engine', str, self.__VALID_WAIT_ENGINES)
+
+        def make_wait(seconds: Union[int, float]):
+            wait_ = WebDriverWait(kwds.get('parent', self._driver), seconds, ignored_exceptions=None)
+            return getattr(wait_, f'until{("_not", "")[wait_until]}', wait_.until)
+
         ec = kwds.get('ec', EC.presence_of_all_elements_located)
-        ec_args = []
-        if kwds.get('locator_value'):
-            _validate_argument(kwds['locator_value'], 'locator_value', str)
-            ec_args.append((kwds.get('locator', By.ID), kwds['locator_value']))
-        if kwds.get('attr_or_prop'):
-            _validate_argument(kwds['attr_or_prop'], 'attr_or_prop', str)
-            ec_args.append(kwds['attr_or_prop'])
-        if kwds.get('value'):
-            _validate_argument(kwds['value'], 'value', str)
-            ec_args.append(kwds['value'])
+        ec_args = self._get_ec_args(**kwds)
         log_level = kwds.get('log_level', 40)
         _validate_argument(log_level, 'log_level', int, self.__VALID_LOG_LEVELS)
+        probe = self.__probe_absent and wait_until and bool(kwds.get('probe'))
+        probe_locator = None
+        if probe and kwds.get('probe_locator_value'):
+            _validate_argument(kwds['probe_locator_value'], 'probe_locator_value', str)
+            probe_locator = (kwds.get('probe_locator', By.ID), kwds['probe_locator_value'])
+        js_ec = getattr(EC, f'js_{ec.__name__}', None) if wait_engine != 'polling' else None
+        condition = (js_ec or ec)(*ec_args)
+        if probe:
+            condition = EC.js_probe(condition, probe_locator) if js_ec else EC.probe(condition, probe_locator)
+        timed_out = False
+        if self.__tracer:
+            self.__tracer.begin_wait(': '.join(ec_args[0]) if ec_args and isinstance(ec_args[0], tuple) else
+                                     ec.__name__)
         try:
-            elements = wait(ec(*ec_args))
+            if js_ec and wait_engine == 'observer':
+                start = monotonic()
+                try:
+                    elements = self._wait_in_browser(condition, kwds.get('parent'), timeout, wait_until)
+                except (TimeoutException, StaleElementReferenceException, InvalidSelectorException):
+                    raise
+                except WebDriverException as err:  # for example, the page was unloaded while waiting
+                    logger.debug('Waiting in the browser was interrupted (%s), waiting continues by polling.',
+                                 err.msg)
+                    condition = EC.probe(ec(*ec_args), probe_locator) if probe else ec(*ec_args)
+                    elements = make_wait(max(timeout - (monotonic() - start), 0))(condition)
+            else:
+                elements = make_wait(timeout)(condition)
+            if isinstance(elements, dict) and elements.get('absent'):
+                logger.log(min(log_level, 10), 'None of the "%s" elements were found by %s, the page has settled.',
+                           *ec_args[0][::-1])
+                return []
+            if not wait_until:  # until_not returns the falsy value of the condition, the observer returns true
+                return [True]
             return elements if isinstance(elements, list) else [elements] if elements else []
         except TimeoutException:
+            timed_out = True
             logger.log(log_level, 'None of the "%s" elements were found by %s and/or are not (in)visible in the DOM for'
                                   ' %ss.', *ec_args[0][::-1], timeout)
         except StaleElementReferenceException:
             logger.log(log_level, 'Reference to the DOM element containing %s "%s" was lost because the parent element '
                                   'was updated.', *ec_args[0])
+        finally:
+            if self.__tracer:
+                self.__tracer.end_wait(timed_out)
         return []
 
+    @staticmethod
+    def _get_ec_args(**kwds) -> list:
+        """
+        Returns the arguments of the expected condition.
+
+        :param kwds:
+            locator: By (ID (default), ...)
+            locator_value: str
+            attr_or_prop: str
+            value: str
+        :return: list
+        """
+        ec_args = []
+        if kwds.get('locator_value'):
+            _validate_argument(kwds['locator_value'], 'locator_value', str)
+            ec_args.append((kwds.get('locator', By.ID), kwds['locator_value']))
+        if kwds.get('attr_or_prop'):
+            _validate_argument(kwds['attr_or_prop'], 'attr_or_prop', str)
+            ec_args.append(kwds['attr_or_prop'])
+        if kwds.get('value'):
+            _validate_argument(kwds['value'], 'value', str)
+            ec_args.append(kwds['value'])
+        return ec_args
+
+    def _wait_in_browser(self, condition: EC.JsCondition, parent=None, timeout: Union[int, float] = 0,
+                         wait_until: bool = True):
+        """
+        Waits in the browser for DOM mutations until the condition is met (or is no longer met, if wait_until is False)
+        and returns the value of the condition. Raises TimeoutException, if the time is up.
+
+        :param condition: EC.JsCondition
+        :param parent: element or None (document)
+        :param timeout: int or float
+        :param wait_until: bool
+        :return: element, list of elements or True
+        """
+        if timeout + 1 > self.__script_timeout:
+            self._driver.set_script_timeout(timeout + 1)
+            self.__script_timeout = timeout + 1
+        result = self._driver.execute_async_script(
+            self.__OBSERVER_SCRIPT.replace('/* condition */', condition.script), parent, wait_until, timeout)
+        if not result:
+            raise TimeoutException(f'Condition was not met in the browser for {timeout}s.')
+        if result.get('error'):
+            raise (InvalidSelectorException if result['error'].startswith('SyntaxError') else WebDriverException)(
+                result['error'])
+        return result.get('value')
+
     def _get_winning(self, locator_value: str, obj: type = int) -> Union[int, Decimal]:
         """
         Returns the amount of the win, if it exists in DOM.
@@ -632,14 +2428,14 @@ class FreeBitcoinFaucet:
         return dict(zip(self._get_bonus_keys(locator_value), self._get_bonus_costs(locator_value)))
 
     def _close_modal(self, locator_value: str, close_btn_locator_value: str,
-                     locator: By = By.ID, close_btn_locator: By = By.CSS_SELECTOR,
+                     locator: By = None, close_btn_locator: By = None,
                      if_success_log_level: int = 10, if_success_log_msg: str = '') -> bool:
         """
         Closes the modal window, if it exists in DOM and is visible.
 
-        :param locator: By - modal window locator
+        :param locator: By - modal window locator (ID by default)
         :param locator_value: str - modal window locator value
-        :param close_btn_locator: By - button or link locator to close the modal window
+        :param close_btn_locator: By - button or link locator to close the modal window (CSS_SELECTOR by default)
         :param close_btn_locator_value: str - button or link locator value to close the modal window
         :param if_success_log_level: int (0, 10 (default), 20, 30, 40, 50)
         :param if_success_log_msg: str
@@ -647,8 +2443,10 @@ class FreeBitcoinFaucet:
         """
         _validate_argument(if_success_log_level, 'if_success_log_level', int, self.__VALID_LOG_LEVELS)
         _validate_argument(if_success_log_msg, 'if_success_log_msg', str)
+        locator = locator or By.ID
+        close_btn_locator = close_btn_locator or By.CSS_SELECTOR
         elements = self._get_elements(ec=EC.displayed_of_element, locator=locator, locator_value=locator_value,
-                                      log_level=30)
+                                      probe=True, log_level=30)
         if not elements:
             return False
         elements = self._get_elements(parent=elements[0], ec=EC.presence_of_element_located, locator=close_btn_locator,
@@ -657,10 +2455,7 @@ class FreeBitcoinFaucet:
             return False
         self._driver.execute_script('arguments[0].click();', elements[0])
         elements = bool(self._get_elements(ec=EC.not_displayed_of_element, locator=locator, locator_value=locator_value,
-                                           log_level=0))
-        if not elements:
-            elements = bool(self._get_elements(wait_until=False, ec=EC.displayed_of_element, locator=locator,
-                                               locator_value=locator_value, log_level=30))
+                                           log_level=30))
         if elements:  # elements = bool([element]) or bool([True]) or bool([])
             logger.log(if_success_log_level, '%s closed.',
                        (f'Modal window with {locator} "{locator_value}"', if_success_log_msg)[bool(if_success_log_msg)])
@@ -684,13 +2479,13 @@ class FreeBitcoinFaucet:
                                           locator_value=locator_value.replace('form', 'menu_button'))
             if elements:
                 self._driver.execute_script('arguments[0].click();', elements[0])
-        elements = [self._get_elements(ec=EC.presence_of_element_located, locator_value=f'{e}_form')
-                    for e in ('signup', 'login')]
-        elements = [e[0].get_property('id') for e in elements if e and e[0].value_of_css_property('display') != 'none']
-        if elements and elements[0] == locator_value:
+        # the form being set is checked first, since the other form may still be displayed during the transition
+        form_ids = sorted(('signup_form', 'login_form'), key=lambda e: e != locator_value)
+        form_id = self.wait_any({e: {'ec': EC.displayed_of_element, 'locator_value': e} for e in form_ids})[0]
+        if form_id and form_id == locator_value:
             logger.log(if_success_log_level, '%s', (f'Current sign form id: "{locator_value}".',
                                                     if_success_log_msg)[bool(if_success_log_msg)])
-        return elements[0] if elements else ''
+        return form_id
 
     def _current_page_tab_id(self, locator_value: str = '',
                              if_success_log_level: int = 10, if_success_log_msg: str = '') -> str:
@@ -797,7 +2592,7 @@ class FreeBitcoinFaucet:
             elements = self._get_elements(ec=EC.presence_of_element_located, locator=By.XPATH,
                                           locator_value='//*[@id="bonus_container_'
                                                         f'{locator_value.replace("_rewards", "")}"]/p/span[1]',
-                                          log_level=10)
+                                          probe=True, probe_locator_value=locator_value, log_level=10)
             if elements:
                 bonus_key = str2num(elements[0].get_property('textContent').replace('%', '').split()[0])
                 if bonus_key not in bonus_keys:
@@ -842,6 +2637,29 @@ class FreeBitcoinFaucet:
         """
         return self._driver.capabilities.get('browserVersion', '')
 
+    @property
+    def tracer(self) -> Union[CommandTracer, None]:
+        """
+        Returns the WebDriver command tracer (None, if tracing is off). Read-only property.
+        """
+        return self.__tracer
+
+    @property
+    def spent_free_play_cost(self) -> int:
+        """
+        Returns the reward points spent on the last free play (the cost of a free play without captcha, 0 - the free
+        play with captcha or failed). Read-only property.
+        """
+        return self.__spent_free_play_cost
+
+    @property
+    def driver_pid(self) -> Union[int, None]:
+        """
+        Returns the pid of the driver process (None, if the driver is not a local service). Read-only property.
+        """
+        process = getattr(getattr(self._driver, 'service', None), 'process', None)
+        return getattr(process, 'pid', None)
+
     @property
     def window_handles(self) -> list:
         """
@@ -900,6 +2718,13 @@ class FreeBitcoinFaucet:
         """
         return self._value_input_field('rp_phone_number')
 
+    @property
+    def address(self) -> str:
+        """
+        Returns the email or BTC address used to sign in. Read-only property.
+        """
+        return self.__address
+
     @property
     def password(self) -> str:
         """
@@ -929,6 +2754,7 @@ class FreeBitcoinFaucet:
         _validate_argument(value, 'value', (int, float))
         self._driver.set_page_load_timeout(value)
         self.__timeout_page_load = value
+        self.__is_timeout_page_load_set = True
         logger.info('Page load timeout changed (sec): %s', value)
 
     @property
@@ -964,6 +2790,21 @@ class FreeBitcoinFaucet:
         self.__check_for_captcha = bool(value)
         logger.info('Captcha check status changed: %s', bool(value))
 
+    @property
+    def use_snapshot(self) -> bool:
+        """
+        Returns the status of reading balances, winnings and free play values from a snapshot.
+        """
+        return self.__use_snapshot
+
+    @use_snapshot.setter
+    def use_snapshot(self, value: bool):
+        """
+        Sets the status of reading balances, winnings and free play values from a snapshot.
+        """
+        self.__use_snapshot = bool(value)
+        logger.info('Snapshot usage status changed: %s', bool(value))
+
     @property
     def state_free_play_sound(self) -> Union[bool, None]:
         """
@@ -1011,6 +2852,8 @@ class FreeBitcoinFaucet:
         """
         Returns current balance in BTC. Read-only property.
         """
+        if self.__use_snapshot:
+            return self.snapshot().balance_btc
         elements = self._get_elements(locator=By.XPATH, locator_value='//*[starts-with(@id,"balance")]')
         return str2num(elements[0].get_property('textContent').strip(), Decimal) if elements else Decimal()
 
@@ -1019,6 +2862,8 @@ class FreeBitcoinFaucet:
         """
         Returns current number of reward points. Read-only property.
         """
+        if self.__use_snapshot:
+            return self.snapshot().balance_rp
         elements = self._get_elements(ec=EC.presence_of_element_located, locator=By.XPATH,
                                       locator_value='//*[@id="rewards_tab"]/descendant::'
                                                     'div[contains(@class,"user_reward_points")]')
@@ -1029,6 +2874,8 @@ class FreeBitcoinFaucet:
         """
         Returns current number of lottery tickets. Read-only property.
         """
+        if self.__use_snapshot:
+            return self.snapshot().balance_lt
         elements = self._get_elements(ec=EC.presence_of_element_located, locator_value='user_lottery_tickets')
         return str2num(elements[0].get_property('textContent').replace(',', '').strip()) if elements else 0
 
@@ -1037,6 +2884,8 @@ class FreeBitcoinFaucet:
         """
         Returns the amount of the win in BTC. Read-only property.
         """
+        if self.__use_snapshot:
+            return self._snapshot_after('winnings').winning_btc
         return self._get_winning('winnings', Decimal)
 
     @property
@@ -1044,6 +2893,8 @@ class FreeBitcoinFaucet:
         """
         Returns the number of reward points won. Read-only property.
         """
+        if self.__use_snapshot:
+            return self._snapshot_after('winnings').winning_rp
         return self._get_winning('fp_reward_points_won')
 
     @property
@@ -1051,6 +2902,8 @@ class FreeBitcoinFaucet:
         """
         Returns the number of lottery tickets won. Read-only property.
         """
+        if self.__use_snapshot:
+            return self._snapshot_after('winnings').winning_lt
         return self._get_winning('fp_lottery_tickets_won')
 
     @property
@@ -1058,8 +2911,11 @@ class FreeBitcoinFaucet:
         """
         Returns the number of wheel of fortune spins won. Read-only property.
         """
+        if self.__use_snapshot:
+            return self._snapshot_after('winnings').winning_wof
         elements = self._get_elements(ec=EC.presence_of_element_located, locator=By.XPATH,
-                                      locator_value='//*[@id="fp_bonus_wins"]/a', log_level=10)
+                                      locator_value='//*[@id="fp_bonus_wins"]/a',
+                                      probe=True, probe_locator_value='free_play_result', log_level=10)
         return str2num(elements[0].get_property('textContent').split()[0]) if elements else 0
 
     @property
@@ -1132,6 +2988,8 @@ class FreeBitcoinFaucet:
         """
         Returns the time (in seconds) remaining until the next free play. Read-only property.
         """
+        if self.__use_snapshot:
+            return self._snapshot_after('#time_remaining span.countdown_amount', By.CSS_SELECTOR).free_play_countdown
         elements = self._get_elements(ec=EC.presence_of_element_located, locator_value='time_remaining')
         if not elements:
             return 0
@@ -1153,10 +3011,122 @@ class FreeBitcoinFaucet:
         """
         Returns the cost (in RP) of a free play without captcha. Read-only property.
         """
+        if self.__use_snapshot:
+            return self.snapshot().free_play_cost
         elements = self._get_elements(ec=EC.presence_of_element_located, locator=By.XPATH,
                                       locator_value='//*[@id="play_without_captcha_desc"]/descendant::span')
         return str2num(elements[0].get_property('textContent').replace(',', '').strip()) if elements else 0
 
+    def _snapshot_after(self, locator_value: str, locator: By = None) -> namedtuple:
+        """
+        Returns the page snapshot taken after the element has appeared in DOM, since the snapshot itself does not wait
+        and the values that are not rendered yet would be read as zero.
+
+        :param locator_value: str
+        :param locator: By (ID by default)
+        :return: namedtuple
+        """
+        self._get_elements(ec=EC.presence_of_element_located, locator=locator or By.ID, locator_value=locator_value,
+                           log_level=10)
+        return self.snapshot()
+
+    def snapshot(self) -> namedtuple:
+        """
+        Returns an immutable record of balances, winnings and free play values read from the page in a single
+        WebDriver command. Values that could not be read are zero.
+
+        :return: namedtuple
+        """
+        try:
+            values = self._driver.execute_script(self.__SNAPSHOT_SCRIPT)
+        except WebDriverException as err:
+            logger.error('Taking a page snapshot failed. %s', err.msg)
+            values = {}
+        countdown = [str2num(v.strip()) for v in values.get('free_play_countdown', [])]
+        if len(countdown) == 1:
+            logger.error('Countdown timer has less than two sections.')
+        return self.__snapshot(
+            balance_btc=str2num(values.get('balance_btc', '').strip(), Decimal),
+            balance_rp=str2num(values.get('balance_rp', '').replace(',', '').strip()),
+            balance_lt=str2num(values.get('balance_lt', '').replace(',', '').strip()),
+            winning_btc=str2num(values.get('winning_btc', '').strip(), Decimal),
+            winning_rp=str2num(values.get('winning_rp', '').strip()),
+            winning_lt=str2num(values.get('winning_lt', '').strip()),
+            winning_wof=str2num((values.get('winning_wof', '').split() or [''])[0]),
+            free_play_countdown=countdown[0] * 60 + countdown[1] if len(countdown) > 1 else 0,
+            free_play_cost=str2num(values.get('free_play_cost', '').replace(',', '').strip()))
+
+    def wait_any(self, conditions: dict, timeout: Union[int, float, None] = None, log_level: int = 40) -> tuple:
+        """
+        Waits until any of the named conditions is met, evaluating all of them in a single poll (or in a single wait in
+        the browser), and returns the name of the first met condition and its elements.
+        Returns ('', []), if none of the conditions is met.
+
+        :param conditions: dict - condition name: dict of keyword arguments (wait_until, ec, locator, locator_value,
+                                  attr_or_prop, value - see _get_elements, other keys raise ValueError)
+        :param timeout: int or float or None (the element(s) wait timeout is used)
+        :param log_level: int (0, 10, 20, 30, 40 (default), 50)
+        :return: tuple (str, list)
+        """
+        _validate_argument(conditions, 'conditions', dict)
+        timeout = self.__timeout_elem_wait if timeout is None else timeout
+        _validate_argument(timeout, 'timeout', (int, float))
+        _validate_argument(log_level, 'log_level', int, self.__VALID_LOG_LEVELS)
+        items = []
+        for name, kwds in conditions.items():
+            _validate_argument(name, 'condition_name', str)
+            _validate_argument(kwds, f'conditions_{name}', dict)
+            for key in kwds:
+                _validate_argument(key, f'conditions_{name}_key', str, self.__VALID_CONDITION_KEYS)
+            items.append((name, bool(kwds.get('wait_until', True)),
+                          kwds.get('ec', EC.presence_of_all_elements_located), self._get_ec_args(**kwds)))
+        js_ecs = [getattr(EC, f'js_{ec.__name__}', None) for _, _, ec, _ in items]
+
+        def predicate(driver) -> Union[tuple, bool]:
+            for name_, until, condition in python_conditions:
+                try:
+                    value_ = condition(driver)
+                except (NoSuchElementException, StaleElementReferenceException):
+                    value_ = False
+                if value_ if until else not value_:
+                    return name_, value_ if until else True
+            return False
+
+        python_conditions = [(name, until, ec(*ec_args)) for name, until, ec, ec_args in items]
+        timed_out = False
+        if self.__tracer:
+            self.__tracer.begin_wait(f'any: {", ".join(conditions)}')
+        try:
+            if self.__wait_engine != 'polling' and items and all(js_ecs):
+                condition = EC.js_any([(js_ec(*ec_args), until)
+                                       for js_ec, (_, until, _, ec_args) in zip(js_ecs, items)])
+                if self.__wait_engine == 'observer':
+                    start = monotonic()
+                    try:
+                        index, value = self._wait_in_browser(condition, timeout=timeout)
+                        name = items[index][0]
+                    except (TimeoutException, InvalidSelectorException):
+                        raise
+                    except WebDriverException as err:  # for example, the page was unloaded while waiting
+                        logger.debug('Waiting in the browser was interrupted (%s), waiting continues by polling.',
+                                     err.msg)
+                        name, value = WebDriverWait(self._driver, max(timeout - (monotonic() - start), 0)).until(
+                            predicate)
+                else:
+                    index, value = WebDriverWait(self._driver, timeout).until(condition)
+                    name = items[index][0]
+            else:
+                name, value = WebDriverWait(self._driver, timeout).until(predicate)
+        except TimeoutException:
+            timed_out = True
+            logger.log(log_level, 'None of the conditions "%s" were met for %ss.', '", "'.join(conditions), timeout)
+            return '', []
+        finally:
+            if self.__tracer:
+                self.__tracer.end_wait(timed_out)
+        logger.debug('Condition "%s" was met.', name)
+        return name, value if isinstance(value, list) else [value] if value else []
+
     def is_available(self) -> bool:
         """
         Checks the site's availability.
@@ -1200,7 +3170,7 @@ class FreeBitcoinFaucet:
         """
         elements = self._get_elements(ec=EC.frame_to_be_available_and_switch_to_it, locator=By.XPATH,
                                       locator_value='//*[@id="free_play_recaptcha"]/descendant::iframe',
-                                      log_level=log_level)
+                                      probe=True, probe_locator_value='free_play_form_button', log_level=log_level)
         if elements:
             elements = self._get_elements(ec=EC.presence_of_element_located, locator_value='checkbox',
                                           log_level=log_level)
@@ -1219,8 +3189,12 @@ class FreeBitcoinFaucet:
         :param log_level: int (0, 10 (default), 20, 30, 40, 50)
         :return: bool
         """
-        elements = self._get_elements(ec=EC.displayed_of_element, locator_value='play_without_captchas_button',
-                                      log_level=log_level)
+        name, elements = self.wait_any({'switch': {'ec': EC.displayed_of_element,
+                                                   'locator_value': 'play_without_captchas_button'},
+                                        'ready': {'ec': EC.visibility_of_element_located,
+                                                  'locator_value': 'play_with_captcha_button'}}, log_level=log_level)
+        if name == 'ready':
+            return True
         if elements:
             self._driver.execute_script('arguments[0].click();', elements[0])
         return bool(self._get_elements(ec=EC.displayed_of_element, locator_value='play_with_captcha_button',
@@ -1231,9 +3205,15 @@ class FreeBitcoinFaucet:
         Plays a free play.
         """
         log_msg = 'Free play '
-        free_play_cost = 0
+        free_play_cost = self.__spent_free_play_cost = 0
         if self.__check_for_captcha:
-            elements = self.is_ready_free_play_with_captcha(30)
+            # the captcha path and the already selected path without captcha are raced instead of waiting for the
+            # captcha first
+            elements = self.wait_any({'captcha': {'ec': EC.presence_of_element_located, 'locator': By.XPATH,
+                                                  'locator_value': '//*[@id="free_play_recaptcha"]/descendant::iframe'},
+                                      'no_captcha': {'ec': EC.visibility_of_element_located,
+                                                     'locator_value': 'play_with_captcha_button'}}, log_level=30)[0]
+            elements = elements == 'captcha' and self.is_ready_free_play_with_captcha(30)
             log_msg = f'{log_msg}with{("out", "")[elements]} captcha '
             if not elements:
                 free_play_cost = self.free_play_cost
@@ -1250,6 +3230,7 @@ class FreeBitcoinFaucet:
             return False
         self._driver.execute_script('arguments[0].click();', elements[0])
         elements = bool(self._get_elements(ec=EC.displayed_of_element, locator_value='free_play_result'))
+        self.__spent_free_play_cost = free_play_cost if elements else 0
         logger.log((40, 20)[elements], '%s%s.', log_msg,
                    ('failed', f'successful{(f" ({free_play_cost} RP spent)", "")[free_play_cost == 0]}')[elements])
         return elements
@@ -1324,6 +3305,8 @@ class FreeBitcoinFaucet:
         log_msg = f'Open site by URL "{url}" '
         try:
             self._driver.get(url)
+            if self.__probe_absent:
+                self._driver.execute_script(EC.JS_TRACK_REQUESTS)
             logger.info('%ssuccessful.', log_msg)
             return True
         except WebDriverException as err:
@@ -1370,6 +3353,7 @@ class FreeBitcoinFaucet:
         self._driver.execute_script('arguments[0].click();', elements[0])
         elements = bool(self.is_authenticated())
         if elements:
+            self.__address = address
             self.__password = password
             self.__totp_secret = totp_secret
         logger.log((50, 20)[elements], '%s%s.', log_msg, ('failed', 'successful')[elements])
@@ -1387,6 +3371,7 @@ class FreeBitcoinFaucet:
         self._driver.execute_script('arguments[0].click();', elements[0])
         elements = bool(self.is_not_authenticated())
         if elements:
+            self.__address = ''
             self.__password = ''
             self.__totp_secret = ''
         logger.log((40, 20)[elements], '%s%s.', log_msg, ('failed', 'successful')[elements])
@@ -1399,6 +3384,8 @@ class FreeBitcoinFaucet:
         log_msg = 'Refresh '
         try:
             self._driver.refresh()
+            if self.__probe_absent:
+                self._driver.execute_script(EC.JS_TRACK_REQUESTS)
             logger.info('%ssuccessful.', log_msg)
             return True
         except WebDriverException as err:
@@ -1406,6 +3393,101 @@ class FreeBitcoinFaucet:
             logger.critical('%sfailed.', log_msg)
             return False
 
+    def get_session_state(self) -> dict:
+        """
+        Returns the session state: the current URL, cookies, local storage and authentication status.
+
+        :return: dict
+        """
+        try:
+            return {'url': self._driver.current_url, 'cookies': self._driver.get_cookies(),
+                    'local_storage': self._driver.execute_script('return Object.assign({}, window.localStorage);'),
+                    'authenticated': bool(self.is_authenticated(0))}
+        except WebDriverException as err:
+            logger.error('Getting the session state failed. %s', err.msg)
+            return {}
+
+    def set_session_state(self, state: dict, is_open: bool = True) -> bool:
+        """
+        Restores the session state (see get_session_state) and opens the site by the URL saved in the state.
+        Cookies and local storage are restored on a lightweight page of the site (robots.txt), so that the site itself
+        is loaded only once, already with the restored session.
+
+        :param state: dict
+        :param is_open: bool - open or not the site after restoring
+        :return: bool
+        """
+        _validate_argument(state, 'state', dict)
+        _validate_argument(is_open, 'is_open', bool)
+        if state.get('cookies') or state.get('local_storage'):
+            url = urlsplit(state.get('url') or self.URL)
+            try:
+                self._driver.get(f'{url.scheme}://{url.netloc}/robots.txt')
+                for cookie in state.get('cookies', []):
+                    try:
+                        self._driver.add_cookie(cookie)
+                    except WebDriverException as err:
+                        logger.debug('Restoring the cookie "%s" failed. %s', cookie.get('name'), err.msg)
+                if state.get('local_storage'):
+                    self._driver.execute_script('for (var key in arguments[0]) '
+                                                'window.localStorage.setItem(key, arguments[0][key]);',
+                                                state['local_storage'])
+                logger.info('Session state restored.')
+            except WebDriverException as err:
+                logger.error('Restoring the session state failed. %s', err.msg)
+                return False
+        return self.open(state.get('url', '')) if is_open else True
+
+    def restart(self, delay: Union[int, float] = 0, **kwds) -> bool:
+        """
+        Restarts the browser preserving the session: saves the session state, quits the driver, stays with the browser
+        shut down for the specified time (hibernation), relaunches the browser and restores the session. If the
+        restored session has expired or the session state could not be saved, signs in again with the passed
+        credentials or, by default, with the credentials of the last successful sign-in.
+        On failure, the browser remains shut down.
+
+        :param delay: int or float - time (in seconds) to stay with the browser shut down
+        :param kwds:
+            sign_in_address: str
+            sign_in_password: str
+            sign_in_totp_secret: str
+            on_relaunch: callable - called without arguments before the browser is relaunched (for example, to apply
+                                    the prefetched driver)
+        :return: bool
+        """
+        _validate_argument(delay, 'delay', (int, float))
+        on_relaunch = kwds.get('on_relaunch')
+        address = kwds.get('sign_in_address') or self.__address
+        password = kwds.get('sign_in_password') or self.__password
+        totp_secret = kwds.get('sign_in_totp_secret') or self.__totp_secret
+        log_msg = 'Browser restart '
+        state = self.get_session_state()
+        self.quit()
+        if delay > 0:
+            logger.info('Browser is shut down for %ss.', delay)
+            sleep(delay)
+        if on_relaunch:
+            on_relaunch()
+        if not self._create_driver():
+            logger.critical('%sfailed.', log_msg)
+            return False
+        if self.__is_timeout_page_load_set:
+            self._driver.set_page_load_timeout(self.__timeout_page_load)
+        self.__script_timeout = self._driver.capabilities.get('timeouts', {}).get('script', 30000) / 1000
+        is_restored = self.set_session_state(state) and self.is_available()
+        # the state is empty if it could not be saved (for example, the browser hung), so the sign-in is checked
+        # whenever the credentials are known, not only when the state says the session was authenticated
+        if is_restored and (password or state.get('authenticated')) and not self.is_authenticated():
+            logger.info(('Session state was not saved.', 'Restored session has expired.')[
+                bool(state.get('authenticated'))])
+            is_restored = bool(password) and self.sign_in(address, password, totp_secret)
+        if not is_restored:
+            self.quit()
+            logger.critical('%sfailed.', log_msg)
+            return False
+        logger.info('%ssuccessful.', log_msg)
+        return True
+
     def quit(self):
         """
         Quits the driver and close every associated window.
@@ -1,8 +1,124 @@
 __author__ = 'norsulfazol'
 __version__ = '1.1.0'
 
-from selenium.webdriver.support.expected_conditions import *
-from selenium.common.exceptions import InvalidSelectorException
+import sys
+import json
+from selenium.common.exceptions import InvalidSelectorException, JavascriptException, NoSuchElementException, \
+    StaleElementReferenceException
+
+# The standard expectations are re-exported from Selenium. Their module imports the whole selenium.webdriver package,
+# so since Python 3.7 it is imported on first access to any of them (PEP 562), in earlier versions - immediately.
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        from selenium.webdriver.support import expected_conditions
+        try:
+            value = getattr(expected_conditions, name)
+        except AttributeError:
+            raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+        globals()[name] = value
+        return value
+else:
+    from selenium.webdriver.support.expected_conditions import *
+
+# Helper functions available to the scripts of the expectations evaluated in the browser.
+JS_HELPERS = '''
+    var xpath = function (expression, root, all) {
+        var result = document.evaluate(expression, root, null, all ? XPathResult.ORDERED_NODE_SNAPSHOT_TYPE :
+                                       XPathResult.FIRST_ORDERED_NODE_TYPE, null), elements = [];
+        if (!all) return result.singleNodeValue;
+        for (var i = 0; i < result.snapshotLength; i++) elements.push(result.snapshotItem(i));
+        return elements;
+    };
+    var visible = function (element) {
+        var style = window.getComputedStyle(element);
+        return style.display !== 'none' && style.visibility !== 'hidden' &&
+            (element.offsetWidth > 0 || element.offsetHeight > 0 || element.getClientRects().length > 0);
+    };
+    var attribute = function (element, name) {
+        var value = element.getAttribute(name);
+        return value !== null ? value : element[name] !== undefined && element[name] !== null ?
+            String(element[name]) : null;
+    };
+    var track = function (early) {
+        if (window.__faucetRequests) return window.__faucetRequests;
+        var requests = window.__faucetRequests = {pending: 0, last: 0, installed: early ? 0 : Date.now()},
+            send = XMLHttpRequest.prototype.send, fetch = window.fetch;
+        var end = function () {
+            requests.pending--;
+            requests.last = Date.now();
+        };
+        XMLHttpRequest.prototype.send = function () {
+            requests.pending++;
+            this.addEventListener('loadend', end);
+            return send.apply(this, arguments);
+        };
+        if (fetch) window.fetch = function () {
+            requests.pending++;
+            return fetch.apply(this, arguments).then(function (response) { end(); return response; },
+                                                     function (error) { end(); throw error; });
+        };
+        return requests;
+    };
+    var settled = function (container) {
+        var requests = track(), now = Date.now();
+        // the requests sent before the tracking was installed in the loaded document are not seen, so such a document
+        // is settled only after a quiet period since the installation
+        return document.readyState === 'complete' && !!container && requests.pending <= 0 &&
+            now - requests.last >= 250 && now - requests.installed >= 1000;
+    };'''
+# Installs the tracking of XHR and fetch requests in flight used to decide that the page has settled.
+JS_TRACK_REQUESTS = f'{JS_HELPERS}\ntrack();'
+# The same, evaluated when a document is created (before its scripts run), so all its requests are seen.
+JS_TRACK_REQUESTS_ON_NEW_DOCUMENT = f'(function () {{ {JS_HELPERS}\ntrack(true); }})();'
+
+
+class JsCondition:
+    """
+    An expectation evaluated in the browser.
+    The script is the body of a JavaScript function that takes the root node (the document or the parent element) as
+    "root" and returns a truthy value (an element, an array of elements or true) when the condition is met.
+    Calling an instance with a driver or an element evaluates the condition with a single WebDriver command, so it can
+    be used as a predicate of WebDriverWait.
+    """
+
+    def __init__(self, script: str):
+        self.script = script
+        self._call_script = f'{JS_HELPERS}\nreturn (function (root) {{ {script} }})(arguments[0] || document);'
+
+    def __call__(self, driver):
+        from selenium.webdriver.remote.webelement import WebElement
+        root = driver if isinstance(driver, WebElement) else None
+        try:
+            return (driver.parent if root else driver).execute_script(self._call_script, root)
+        except JavascriptException as e:
+            if 'SyntaxError' in e.msg:
+                raise InvalidSelectorException(e.msg)
+            return False
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.script!r})'
+
+
+def _js_locate(locator, all_=False) -> str:
+    """
+    Compiles the locator into a JavaScript expression that returns the first element found relative to the root node
+    (or null) or an array of all such elements.
+    """
+    from selenium.webdriver.common.by import By
+    by, value = locator
+    if by == By.XPATH:
+        return f'xpath({json.dumps(value)}, root, {json.dumps(all_)})'
+    if by in (By.LINK_TEXT, By.PARTIAL_LINK_TEXT):
+        test = 'text === value' if by == By.LINK_TEXT else 'text.indexOf(value) >= 0'
+        elements = f'Array.prototype.filter.call(root.querySelectorAll("a"), function (e) {{ ' \
+                   f'var text = e.textContent.trim(), value = {json.dumps(value)}; return {test}; }})'
+        return elements if all_ else f'({elements}[0] || null)'
+    quoted = value.replace('\\', '\\\\').replace('"', '\\"')
+    selector = {By.ID: f'[id="{quoted}"]', By.NAME: f'[name="{quoted}"]', By.CLASS_NAME: f'.{value}'}.get(by, value)
+    if by not in (By.ID, By.NAME, By.CLASS_NAME, By.TAG_NAME, By.CSS_SELECTOR):
+        raise InvalidSelectorException(f'Unsupported locator strategy "{by}".')
+    return f'Array.prototype.slice.call(root.querySelectorAll({json.dumps(selector)}))' if all_ else \
+        f'root.querySelector({json.dumps(selector)})'
 
 
 def title_contains_lower(title):
@@ -178,3 +294,143 @@ def value_to_be_equal_to_property_value_of_element(locator, property_, value):
             return False
 
     return _predicate
+
+
+def js_presence_of_element_located(locator):
+    """
+    Browser-side version of "presence_of_element_located".
+    """
+    return JsCondition(f'return {_js_locate(locator)} || false;')
+
+
+def js_presence_of_all_elements_located(locator):
+    """
+    Browser-side version of "presence_of_all_elements_located".
+    """
+    return JsCondition(f'var elements = {_js_locate(locator, True)}; return elements.length ? elements : false;')
+
+
+def js_visibility_of_element_located(locator):
+    """
+    Browser-side version of "visibility_of_element_located".
+    """
+    return JsCondition(f'var e = {_js_locate(locator)}; return e && visible(e) ? e : false;')
+
+
+def js_title_contains_lower(title):
+    """
+    Browser-side version of "title_contains_lower".
+    """
+    return JsCondition(f'return document.title.toLowerCase().indexOf({json.dumps(title.lower())}) >= 0;')
+
+
+def js_displayed_of_element(locator):
+    """
+    Browser-side version of "displayed_of_element".
+    """
+    return JsCondition(f'var e = {_js_locate(locator)}; '
+                       'return e && (visible(e) || window.getComputedStyle(e).display !== "none") ? e : false;')
+
+
+def js_not_displayed_of_element(locator):
+    """
+    Browser-side version of "not_displayed_of_element".
+    """
+    return JsCondition(f'var e = {_js_locate(locator)}; '
+                       'return !e || (!visible(e) || window.getComputedStyle(e).display === "none" ? e : false);')
+
+
+def js_value_to_be_equal_to_css_property_value_of_element(locator, css_property, value):
+    """
+    Browser-side version of "value_to_be_equal_to_css_property_value_of_element".
+    """
+    return JsCondition(f'var e = {_js_locate(locator)}; return !!e && window.getComputedStyle(e)'
+                       f'.getPropertyValue({json.dumps(css_property)}) === {json.dumps(value)};')
+
+
+def js_element_attribute_to_include(locator, attribute_):
+    """
+    Browser-side version of "element_attribute_to_include".
+    """
+    return JsCondition(f'var e = {_js_locate(locator)}; '
+                       f'return !!e && attribute(e, {json.dumps(attribute_)}) !== null;')
+
+
+def js_text_to_be_present_in_element_attribute(locator, attribute_, text_):
+    """
+    Browser-side version of "text_to_be_present_in_element_attribute".
+    """
+    return JsCondition(f'var e = {_js_locate(locator)}, v = e ? attribute(e, {json.dumps(attribute_)}) : null; '
+                       f'return v !== null && v.indexOf({json.dumps(text_)}) >= 0;')
+
+
+def js_value_to_be_equal_to_attribute_value_of_element(locator, attribute_, value):
+    """
+    Browser-side version of "value_to_be_equal_to_attribute_value_of_element".
+    """
+    return JsCondition(f'var e = {_js_locate(locator)}; '
+                       f'return !!e && attribute(e, {json.dumps(attribute_)}) === {json.dumps(value)};')
+
+
+def js_element_property_to_include(locator, property_):
+    """
+    Browser-side version of "element_property_to_include".
+    """
+    return JsCondition(f'var e = {_js_locate(locator)}, v = e ? e[{json.dumps(property_)}] : null; '
+                       'return v !== undefined && v !== null;')
+
+
+def js_text_to_be_present_in_element_property(locator, property_, text_):
+    """
+    Browser-side version of "text_to_be_present_in_element_property".
+    """
+    return JsCondition(f'var e = {_js_locate(locator)}, v = e ? e[{json.dumps(property_)}] : null; '
+                       f'return v !== undefined && v !== null && String(v).indexOf({json.dumps(text_)}) >= 0;')
+
+
+def js_value_to_be_equal_to_property_value_of_element(locator, property_, value):
+    """
+    Browser-side version of "value_to_be_equal_to_property_value_of_element".
+    """
+    return JsCondition(f'var e = {_js_locate(locator)}; '
+                       f'return !!e && e[{json.dumps(property_)}] === {json.dumps(value)};')
+
+
+def probe(predicate, container_locator=None):
+    """
+    Wraps the expectation so that the wait also ends (with the value {"absent": True}) as soon as the page has settled:
+    the document is loaded, the container (or the root node) is present, and no XHR or fetch request is in flight.
+    """
+    container = _js_locate(container_locator) if container_locator else '(root === document ? document.body : root)'
+    settled = JsCondition(f'return settled({container}) ? {{absent: true}} : false;')
+
+    def _predicate(driver):
+        try:
+            value = predicate(driver)
+        except (NoSuchElementException, StaleElementReferenceException):
+            value = False
+        return value or settled(driver)
+
+    return _predicate
+
+
+def js_probe(condition, container_locator=None):
+    """
+    Browser-side version of "probe".
+    """
+    container = _js_locate(container_locator) if container_locator else '(root === document ? document.body : root)'
+    return JsCondition(f'var value = (function (root) {{ {condition.script} }})(root); '
+                       f'return value || (settled({container}) ? {{absent: true}} : false);')
+
+
+def js_any(conditions):
+    """
+    Browser-side expectation that is met when any of the conditions is met (or is no longer met, if its "until" flag is
+    False). Returns the index of the first such condition and its value as [index, value].
+
+    :param conditions: list of tuples (JsCondition, until: bool)
+    """
+    checks = ', '.join(f'[function (root) {{ {c.script} }}, {json.dumps(bool(until))}]' for c, until in conditions)
+    return JsCondition(f'var checks = [{checks}]; for (var i = 0; i < checks.length; i++) {{ '
+                       'var value = checks[i][0](root); '
+                       'if (checks[i][1] ? value : !value) return [i, checks[i][1] ? value : true]; } return false;')
@@ -0,0 +1,208 @@
+__author__ = 'norsulfazol'
+__version__ = '1.0.0'
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import argparse
+from time import time, mktime, strptime, strftime, localtime, perf_counter
+from logging import getLogger
+from decimal import Decimal
+from threading import Lock
+
+logger = getLogger(__name__)
+
+SATOSHI = 10 ** 8
+# Shortest time window (in seconds, one free play interval) for which the per-hour figures are reported, over a shorter
+# window a single free play would be extrapolated to a whole hour
+MIN_RATE_WINDOW = 3600
+
+
+class History:
+    """
+    History of the events of the program (free plays, bonus activations, refresh retries, failures) in an SQLite
+    database. The events are indexed by time and by type and time, so that reports over any time window only read the
+    rows of that window.
+    """
+    # Fields stored in the columns of the events table (BTC amounts in satoshi), other fields are stored in JSON
+    COLUMNS = ('num', 'attempts', 'winning_btc', 'winning_rp', 'winning_lt', 'winning_wof', 'balance_btc', 'balance_rp',
+               'balance_lt', 'rp_spent', 'countdown_slack', 'duration')
+    __SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            event TEXT NOT NULL,
+            num INTEGER,
+            attempts INTEGER,
+            winning_btc INTEGER,
+            winning_rp INTEGER,
+            winning_lt INTEGER,
+            winning_wof INTEGER,
+            balance_btc INTEGER,
+            balance_rp INTEGER,
+            balance_lt INTEGER,
+            rp_spent INTEGER,
+            countdown_slack REAL,
+            duration REAL,
+            details TEXT
+        );
+        CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+        CREATE INDEX IF NOT EXISTS events_event_ts ON events (event, ts);'''
+
+    def __init__(self, path: str):
+        """
+        Initializes an instance of the current class.
+
+        :param path: str - path to the database file (it is created, if it does not exist)
+        """
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.__lock = Lock()
+        self.__db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.__db.execute('PRAGMA journal_mode=WAL')
+        self.__db.execute('PRAGMA synchronous=NORMAL')
+        self.__db.executescript(self.__SCHEMA)
+
+    def __enter__(self) -> 'History':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        with self.__lock:
+            self.__db.close()
+
+    def write(self, event: str, **fields) -> bool:
+        """
+        Adds an event at the current time. The fields of the columns (see COLUMNS) are stored in their columns, BTC
+        amounts (Decimal) are converted to satoshi, the other fields are stored in JSON format in the details column.
+
+        :param event: str - event type (for example, play, play_failed, bonus, refresh, failure)
+        :param fields: event fields
+        :return: bool
+        """
+        values = {name: fields.pop(name) for name in self.COLUMNS if name in fields}
+        for name in ('winning_btc', 'balance_btc'):
+            if isinstance(values.get(name), (Decimal, float, str)):
+                values[name] = int(Decimal(values[name]) * SATOSHI)
+        values['details'] = json.dumps(fields, default=str, separators=(',', ':')) if fields else None
+        names = ', '.join(values)
+        try:
+            with self.__lock:
+                self.__db.execute(f'INSERT INTO events (ts, event, {names}) VALUES (?, ?{", ?" * len(values)})',
+                                  (round(time(), 3), event, *values.values()))
+        except sqlite3.Error as err:
+            logger.error('Adding the event "%s" to the history "%s" failed. %s', event, self.path, err)
+            return False
+        return True
+
+    def report(self, since: float = 0, until: float = 0) -> dict:
+        """
+        Returns the report for the time window: the number of events of each type, the winnings, BTC and RP per hour,
+        the failure rate and the countdown slack (the time from the end of the countdown to the free play).
+        If the beginning of the window is not set, it is the time of the first event. The per-hour figures are None for
+        a window shorter than MIN_RATE_WINDOW.
+
+        :param since: float - seconds since the epoch (0 - from the first event)
+        :param until: float - seconds since the epoch (0 - now)
+        :return: dict
+        """
+        until = until or time()
+        with self.__lock:
+            db = self.__db
+            if not since:
+                since = db.execute('SELECT MIN(ts) FROM events WHERE ts < ?', (until,)).fetchone()[0] or until
+            window = (since, until)
+            counts = {event: (number, rp_spent or 0) for event, number, rp_spent in db.execute(
+                'SELECT event, COUNT(*), SUM(rp_spent) FROM events WHERE ts >= ? AND ts < ? GROUP BY event', window)}
+            plays, btc, rp, lt, wof, slack_count, slack_avg, slack_max, duration_avg = db.execute(
+                'SELECT COUNT(*), SUM(winning_btc), SUM(winning_rp), SUM(winning_lt), SUM(winning_wof), '
+                'COUNT(countdown_slack), AVG(countdown_slack), MAX(countdown_slack), AVG(duration) '
+                'FROM events WHERE event = ? AND ts >= ? AND ts < ?', ('play', *window)).fetchone()
+            slack_median = db.execute(
+                'SELECT countdown_slack FROM events WHERE event = ? AND ts >= ? AND ts < ? AND countdown_slack IS NOT '
+                'NULL ORDER BY countdown_slack LIMIT 1 OFFSET ?', ('play', *window, slack_count // 2)).fetchone()
+        hours = max(until - since, 1) / 3600
+        is_rated = until - since >= MIN_RATE_WINDOW
+        failed = counts.get('play_failed', (0, 0))[0] + counts.get('failure', (0, 0))[0]
+        rp_spent = sum(counts.get(event, (0, 0))[1] for event in ('play', 'play_failed'))  # per free play cycle
+        return {'since': since, 'until': until, 'hours': round(hours, 3),
+                'events': {event: item[0] for event, item in sorted(counts.items())},
+                'plays': plays, 'failures': failed,
+                'failure_rate': round(failed / (plays + failed), 4) if plays + failed else 0.0,
+                'refreshes': counts.get('refresh', (0, 0))[0],
+                'bonuses': counts.get('bonus', (0, 0))[0],
+                'winning_btc': f'{Decimal(btc or 0) / SATOSHI:.8f}', 'winning_rp': rp or 0,
+                'winning_lt': lt or 0, 'winning_wof': wof or 0, 'rp_spent': rp_spent,
+                'btc_per_hour': f'{Decimal(btc or 0) / SATOSHI / Decimal(hours):.8f}' if is_rated else None,
+                'rp_per_hour': round((rp or 0) / hours, 2) if is_rated else None,
+                'net_rp_per_hour': round(((rp or 0) - rp_spent) / hours, 2) if is_rated else None,
+                'countdown_slack_avg': round(slack_avg, 1) if slack_avg is not None else None,
+                'countdown_slack_median': round(slack_median[0], 1) if slack_median else None,
+                'countdown_slack_max': round(slack_max, 1) if slack_max is not None else None,
+                'play_duration_avg': round(duration_avg, 1) if duration_avg is not None else None}
+
+
+def _parse_time(value: str, now: float) -> float:
+    """
+    Parses the time: relative to now ("90m", "12h", "7d", "4w") or local date and time ("2024-01-31",
+    "2024-01-31 18:00", "2024-01-31T18:00:00").
+    """
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([mhdw])', value.strip())
+    if match:
+        return now - float(match.group(1)) * {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}[match.group(2)]
+    value = value.strip().replace('T', ' ')
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return mktime(strptime(value, fmt))
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f'invalid time "{value}"')
+
+
+def main(settings, args: list) -> int:
+    """
+    Report entry point: python -m main report [<custom settings file name>] [--since 7d] [--until ...] [--json]
+
+    :param settings: settings module
+    :param args: list - command line arguments
+    :return: int - exit status
+    """
+    now = time()
+    parser = argparse.ArgumentParser(prog='main report', description='Report on the history of the free plays.')
+    parser.add_argument('--since', type=lambda value: _parse_time(value, now), default=0,
+                        help='beginning of the window: 12h, 7d, 4w or 2024-01-31[ 18:00] (the first event by default)')
+    parser.add_argument('--until', type=lambda value: _parse_time(value, now), default=0,
+                        help='end of the window (now by default)')
+    parser.add_argument('--file', default=getattr(settings, 'HISTORY_FILE', ''),
+                        help='history file (HISTORY_FILE from the settings by default)')
+    parser.add_argument('--json', action='store_true', help='print the report in JSON format')
+    args = parser.parse_args(args)
+    if not args.file or not os.path.isfile(args.file):
+        print(f'History file "{args.file}" not found.')
+        return 1
+    start = perf_counter()
+    with History(args.file) as history:
+        report = history.report(args.since, args.until)
+    elapsed = (perf_counter() - start) * 1000
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f'Window: {strftime("%Y-%m-%d %H:%M:%S", localtime(report["since"]))} - '
+          f'{strftime("%Y-%m-%d %H:%M:%S", localtime(report["until"]))} ({report["hours"]} h)')
+    for title, key in (('Free plays', 'plays'), ('Failures', 'failures'), ('Failure rate', 'failure_rate'),
+                       ('Refresh retries', 'refreshes'), ('Bonus activations', 'bonuses'),
+                       ('Won BTC', 'winning_btc'), ('Won reward points', 'winning_rp'),
+                       ('Won lottery tickets', 'winning_lt'), ('Won WOF spins', 'winning_wof'),
+                       ('Spent reward points', 'rp_spent'), ('BTC/hour', 'btc_per_hour'), ('RP/hour', 'rp_per_hour'),
+                       ('Net RP/hour', 'net_rp_per_hour'), ('Countdown slack avg (sec)', 'countdown_slack_avg'),
+                       ('Countdown slack median (sec)', 'countdown_slack_median'),
+                       ('Countdown slack max (sec)', 'countdown_slack_max'),
+                       ('Free play duration avg (sec)', 'play_duration_avg')):
+        print(f'{title + ":":<32}{report[key] if report[key] is not None else "-"}')
+    print(f'{"Events:":<32}{", ".join(f"{k}: {v}" for k, v in report["events"].items()) or "-"}')
+    print(f'Computed in {elapsed:.1f} ms.', file=sys.stderr)
+    return 0
@@ -0,0 +1,237 @@
+__author__ = 'norsulfazol'
+__version__ = '1.0.0'
+
+import os
+import re
+import json
+import gzip
+import shutil
+from time import time, strftime, strptime, localtime, mktime
+from logging import getLogger
+from threading import Lock, Timer
+from decimal import Decimal
+
+logger = getLogger(__name__)
+
+
+def _json_default(value) -> str:
+    return format(value, 'f') if isinstance(value, Decimal) else str(value)
+
+
+class Ledger:
+    """
+    Append-only ledger of events in JSON lines format (one JSON object per line).
+    Records are buffered in memory and appended to the current segment file when the buffer exceeds its size, when it
+    is older than the flush interval (by a timer) or when a record of one of the flush events is written. The segment is
+    closed (renamed with the time of its first record) when it exceeds the size or age limit, and closed segments are
+    compressed with gzip.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1024 * 1024, max_age: int = 60 * 60 * 24 * 7,
+                 buffer_size: int = 64 * 1024, flush_interval: float = 60, compress: bool = True,
+                 flush_events: tuple = ()):
+        """
+        Initializes an instance of the current class.
+
+        :param path: str - path to the current segment file (for example, logs/ledger.jsonl)
+        :param max_bytes: int - size limit of a segment in bytes (0 - unlimited)
+        :param max_age: int - age limit of a segment in seconds (0 - unlimited)
+        :param buffer_size: int - the buffer is flushed when it exceeds the size in bytes
+        :param flush_interval: float - the buffer is flushed when it is older than the interval in seconds
+        :param compress: bool - compress closed segments with gzip
+        :param flush_events: tuple - names of the events whose records are written to the file immediately
+        """
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.flush_events = flush_events
+        self.__lock = Lock()
+        self.__timer = None
+        self.__buffer = []
+        self.__buffered = 0
+        self.__buffered_at = 0
+        self.__size = 0
+        self.__started_at = 0
+        root, ext = os.path.splitext(self.path)
+        self.__segment_re = re.compile(re.escape(os.path.basename(root)) + r'-\d{8}-\d{6}(?:-\d+)?' +
+                                       re.escape(ext) + r'(?:\.gz)?$')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._open_segment()
+        if self.compress:
+            for segment in self.segments():
+                if not segment.endswith('.gz') and segment != self.path:
+                    self._compress(segment)
+
+    def __enter__(self) -> 'Ledger':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _open_segment(self):
+        """
+        Reads the size and the time of the first record of the current segment.
+        """
+        self.__size, self.__started_at = 0, 0
+        try:
+            self.__size = os.path.getsize(self.path)
+            with open(self.path, encoding='utf-8') as f:
+                self.__started_at = json.loads(f.readline() or '{}').get('ts', 0)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as err:
+            logger.warning('Reading the ledger file "%s" failed. %s', self.path, err)
+            self.__started_at = time()
+
+    def segments(self) -> list:
+        """
+        Returns the paths of all segments (closed ones first, in chronological order, then the current one).
+
+        :return: list
+        """
+        directory = os.path.dirname(self.path)
+        closed = sorted((os.path.join(directory, name) for name in os.listdir(directory)
+                         if self.__segment_re.match(name)), key=self._segment_key)
+        return closed + ([self.path] if os.path.exists(self.path) else [])
+
+    def write(self, event: str, **fields) -> dict:
+        """
+        Adds a record with the event name and the current time (the "ts" field, seconds since the epoch) to the buffer.
+        Values that are not serializable to JSON (for example, Decimal) are written as strings (Decimal - in fixed-point
+        notation).
+
+        :param event: str
+        :param fields: record fields
+        :return: dict - record
+        """
+        record = dict({'ts': round(time(), 3), 'event': event}, **fields)
+        line = json.dumps(record, default=_json_default, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self.__lock:
+            if not self.__buffer:
+                self.__buffered_at = record['ts']
+            self.__buffer.append(line)
+            self.__buffered += len(line.encode('utf-8'))
+            if self.__buffered >= self.buffer_size or record['ts'] - self.__buffered_at >= self.flush_interval or \
+                    event in self.flush_events:
+                self._flush()
+            elif self.__timer is None:  # the buffer is flushed by age even if no more records are written
+                self.__timer = Timer(self.flush_interval, self.flush)
+                self.__timer.daemon = True
+                self.__timer.start()
+        return record
+
+    def flush(self) -> bool:
+        """
+        Appends the buffered records to the current segment.
+
+        :return: bool
+        """
+        with self.__lock:
+            return self._flush()
+
+    def _flush(self) -> bool:
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        if not self.__buffer:
+            return True
+        lines, self.__buffer, self.__buffered = self.__buffer, [], 0
+        if self.__started_at and (self.max_age and time() - self.__started_at >= self.max_age or
+                                  self.max_bytes and self.__size >= self.max_bytes):
+            self._rotate()
+        try:
+            data = ''.join(lines).encode('utf-8')
+            with open(self.path, 'ab') as f:
+                f.write(data)
+        except OSError as err:
+            logger.error('Writing to the ledger file "%s" failed. %s', self.path, err)
+            return False
+        if not self.__started_at:
+            self.__started_at = json.loads(lines[0])['ts']
+        self.__size += len(data)
+        return True
+
+    def _rotate(self):
+        """
+        Closes the current segment: renames it with the time of its first record and compresses it.
+        """
+        root, ext = os.path.splitext(self.path)
+        target = f'{root}-{strftime("%Y%m%d-%H%M%S", localtime(self.__started_at))}{ext}'
+        for index in range(1, 1000):
+            if not os.path.exists(target) and not os.path.exists(f'{target}.gz'):
+                break
+            target = f'{root}-{strftime("%Y%m%d-%H%M%S", localtime(self.__started_at))}-{index}{ext}'
+        try:
+            os.replace(self.path, target)
+        except OSError as err:
+            logger.error('Rotation of the ledger file "%s" failed. %s', self.path, err)
+            return
+        self.__size, self.__started_at = 0, 0
+        logger.debug('Ledger segment closed: "%s".', target)
+        if self.compress:
+            self._compress(target)
+
+    @staticmethod
+    def _compress(path: str) -> bool:
+        """
+        Compresses the closed segment with gzip (the compressed file replaces it atomically).
+        """
+        try:
+            with open(path, 'rb') as source, gzip.open(f'{path}.gz.tmp', 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.replace(f'{path}.gz.tmp', f'{path}.gz')
+            os.remove(path)
+            return True
+        except OSError as err:
+            logger.error('Compression of the ledger segment "%s" failed. %s', path, err)
+            return False
+
+    def close(self):
+        """
+        Flushes the buffer.
+        """
+        self.flush()
+
+    def read(self, since: float = 0, until: float = 0, events: tuple = ()):
+        """
+        Yields the records of all segments in chronological order (the buffer is flushed first).
+        Segments that end before the "since" time are skipped without being decompressed.
+
+        :param since: float - seconds since the epoch (0 - from the beginning)
+        :param until: float - seconds since the epoch (0 - to the end)
+        :param events: tuple - event names (empty - all events)
+        """
+        self.flush()
+        segments = self.segments()
+        for index, segment in enumerate(segments):
+            # the names have a resolution of one second
+            if since and index + 1 < len(segments) and self._segment_key(segments[index + 1])[0] + 1 <= since:
+                continue
+            opener = gzip.open if segment.endswith('.gz') else open
+            try:
+                with opener(segment, 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        if since and record.get('ts', 0) < since or events and record.get('event') not in events:
+                            continue
+                        if until and record.get('ts', 0) >= until:
+                            return
+                        yield record
+            except OSError as err:
+                logger.error('Reading the ledger segment "%s" failed. %s', segment, err)
+
+    @staticmethod
+    def _segment_key(path: str) -> tuple:
+        """
+        Returns the time of the first record and the index of the closed segment from its name.
+        """
+        match = re.search(r'-(\d{8}-\d{6})(?:-(\d+))?\.', os.path.basename(path))
+        if not match:
+            return float('inf'), 0
+        return mktime(strptime(match.group(1), '%Y%m%d-%H%M%S')), int(match.group(2) or 0)
@@ -2,9 +2,18 @@
 import os
 import sys
 import core
-from time import sleep
+import atexit
+from time import sleep, monotonic
 from itertools import count
 from logging import basicConfig, getLogger
+from ledger import Ledger
+from history import History, main as report_main
+
+# Reporting mode: python -m main report [<custom settings file name>] [<report options>]
+report_args = sys.argv[2:] if sys.argv[1:2] == ['report'] else None
+if report_args is not None:
+    sys.argv[1:] = report_args[:1] if report_args and not report_args[0].startswith('-') else []
+    report_args = report_args[len(sys.argv) - 1:]
 
 # Import custom settings
 try:
@@ -13,7 +22,10 @@ except (IndexError, ModuleNotFoundError, ImportError) as err:
     settings = __import__('settings')
     if err.__class__.__name__ != 'IndexError':
         print({'ModuleNotFoundError': f'Module "{sys.argv[1]}" not found.',
-               'ImportError': f'Failed to import module "{sys.argv[1]}".'}[err.__class__.__name__])
+               'ImportError': f'Failed to import module "{sys.argv[1]}".'}[err.__class__.__name__],
+              file=sys.stdout if report_args is None else sys.stderr)
+if report_args is not None:  # the report (possibly in JSON format) is the only output to stdout
+    sys.exit(report_main(settings, report_args))
 print(f'Current settings module "{settings.__name__}".')
 
 # Logging initialization
@@ -49,7 +61,9 @@ def scenario() -> int:
                 logger.info('Refresh attempt: %s/%s', att,
                             (on_unavailable_attempts, 'infinity')[on_unavailable_attempts == 0])
             if faucet.refresh() and faucet.is_available():
+                record('refresh', attempts=att, is_available=True)
                 return True
+            record('refresh', attempts=att, is_available=False)
             if att == on_unavailable_attempts:
                 return False
             logger.info('Timeout for next refresh attempt (sec): %s => %sh %sm %ss', timeout,
@@ -57,6 +71,24 @@ def scenario() -> int:
             sleep(timeout)
             timeout *= on_unavailable_attempts_timeout_increase
 
+    # the history and the ledger are opened before the startup, so that the startup failures are recorded too
+    play_ledger = Ledger(settings.LEDGER_FILE, max_bytes=getattr(settings, 'LEDGER_MAX_BYTES', 1024 * 1024),
+                         max_age=getattr(settings, 'LEDGER_MAX_AGE', 0),
+                         compress=getattr(settings, 'LEDGER_COMPRESS', True),
+                         flush_events=('play', 'play_failed', 'recycle', 'failure', 'stop')) \
+        if getattr(settings, 'LEDGER_FILE', '') else None
+    if play_ledger:
+        atexit.register(play_ledger.close)
+    play_history = History(settings.HISTORY_FILE) if getattr(settings, 'HISTORY_FILE', '') else None
+    if play_history:
+        atexit.register(play_history.close)
+
+    def record(event: str, **fields):
+        if play_ledger:
+            play_ledger.write(event, **fields)
+        if play_history:
+            play_history.write(event, **fields)
+
     browser = getattr(settings, 'BROWSER', 'firefox').strip()
     browser_file = getattr(settings, f'{browser.upper()}_BROWSER_FILE', browser).strip()
     browser_file = core.BrowserExecFileOrLink(browser_file if browser_file else browser,
@@ -64,45 +96,90 @@ def scenario() -> int:
                                               reg_key=getattr(settings,
                                                               f'{browser.upper()}_BROWSER_REG_KEY', '').strip())
     if not browser_file:
+        record('failure', reason='browser_not_found')
         return 1
     print(browser_file)
     driver_file_type = getattr(core, f'{browser.capitalize()}DriverExecFileOrLink', None)
     if not driver_file_type:
+        record('failure', reason='browser_not_supported')
         return 1
     driver_file = getattr(settings, f'{browser.upper()}_DRIVER_FILE', browser).strip()
     driver_file = driver_file_type(driver_file if driver_file else browser,
-                                   directory=getattr(settings, f'{browser.upper()}_DRIVER_DIR', '').strip())
+                                   directory=getattr(settings, f'{browser.upper()}_DRIVER_DIR', '').strip(),
+                                   store_size=getattr(settings, 'DRIVERS_STORE_SIZE', 3))
     del driver_file_type
     if not driver_file:
+        record('failure', reason='driver_not_found')
         return 1
     print(driver_file)
-    if not driver_file.update(getattr(settings, f'{browser.upper()}_DRIVER_URL', '').strip(),
-                              browser_version_info=browser_file.version_info):
+    driver_url = getattr(settings, f'{browser.upper()}_DRIVER_URL', '').strip()
+    driver_update_kwds = {'browser_version_info': browser_file.version_info,
+                          'manifest': getattr(settings, 'DRIVERS_MANIFEST_FILE', '').strip(),
+                          'ttl': getattr(settings, 'DRIVERS_UPDATE_TTL', 0)}
+    prefetcher = core.DriverPrefetcher(driver_file, driver_url, **driver_update_kwds) if getattr(
+        settings, 'DRIVERS_PREFETCH', False) and driver_url and driver_update_kwds['manifest'] else None
+    is_prefetched = False
+    if prefetcher and driver_file.is_exists():
+        prefetcher.apply()
+        # the driver of another major version of the browser (for example, after the browser auto-update) cannot start
+        # the browser, so it is updated at once without regard to the time of the last check
+        is_prefetched = driver_file.is_compatible(browser_file.version_info)
+        if not is_prefetched:
+            driver_update_kwds['ttl'] = 0
+    if is_prefetched:  # the update is made in the background, startup is not delayed
+        prefetcher.start()
+    elif not driver_file.update(driver_url, **driver_update_kwds):
+        record('failure', reason='driver_update')
         return 1
     #
     quick_start = getattr(settings, 'QUICK_START', True)
-    faucet = core.FreeBitcoinFaucet(browser_name=browser,
-                                    driver_exec_path=driver_file.path,
-                                    driver_log_path=os.path.join(getattr(settings, 'LOGS_DIR', ''),
-                                                                 f'{getattr(settings, "LOGS_PREFIX", "")}'
-                                                                 f'{getattr(settings, "DRIVER_LOG_FILE", "driver.log")}'
-                                                                 f'{getattr(settings, "LOGS_SUFFIX", "")}'),
-                                    driver_options=getattr(settings, f'{browser.upper()}_BROWSER_OPTIONS', {}),
-                                    timeout_page_load=getattr(settings, 'TIMEOUT_PAGE_LOAD', 30),
-                                    timeout_elem_wait=getattr(settings, 'TIMEOUT_ELEM_WAIT', 10),
-                                    check_for_captcha=getattr(settings, 'CHECK_FOR_CAPTCHA', True),
-                                    **({'open': True, 'sign_in': True,
-                                        'sign_in_address': getattr(settings, 'AUTH_ADDRESS', ''),
-                                        'sign_in_password': getattr(settings, 'AUTH_PASSWORD', ''),
-                                        'sign_in_totp_secret': getattr(settings, 'AUTH_TOTP_SECRET', '')}
-                                       if quick_start else {}))
+    session_store = core.SessionStore(settings.SESSION_FILE) if getattr(settings, 'SESSION_FILE', '') else None
+    session_state = session_store.load() if session_store else {}
+    driver_log_path = os.path.join(getattr(settings, 'LOGS_DIR', ''),
+                                   f'{getattr(settings, "LOGS_PREFIX", "")}'
+                                   f'{getattr(settings, "DRIVER_LOG_FILE", "driver.log")}'
+                                   f'{getattr(settings, "LOGS_SUFFIX", "")}')
+
+    def create_faucet() -> core.FreeBitcoinFaucet:
+        return core.FreeBitcoinFaucet(browser_name=browser,
+                                      driver_backend=getattr(settings, 'DRIVER_BACKEND', 'selenium'),
+                                      driver_exec_path=driver_file.path,
+                                      driver_log_path=driver_log_path,
+                                      driver_options=getattr(settings, f'{browser.upper()}_BROWSER_OPTIONS', {}),
+                                      timeout_page_load=getattr(settings, 'TIMEOUT_PAGE_LOAD', 30),
+                                      timeout_elem_wait=getattr(settings, 'TIMEOUT_ELEM_WAIT', 10),
+                                      check_for_captcha=getattr(settings, 'CHECK_FOR_CAPTCHA', True),
+                                      use_snapshot=getattr(settings, 'USE_SNAPSHOT', False),
+                                      wait_engine=getattr(settings, 'WAIT_ENGINE', 'polling'),
+                                      probe_absent=getattr(settings, 'PROBE_ABSENT_ELEMENTS', False),
+                                      trace_commands=getattr(settings, 'TRACE_COMMANDS', False),
+                                      block_resources=getattr(settings, 'BLOCK_RESOURCES', {}),
+                                      profile_dir=getattr(settings, f'{browser.upper()}_PROFILE_DIR', ''),
+                                      http_cache_size=getattr(settings, 'HTTP_CACHE_SIZE', 0),
+                                      **({'open': True, 'sign_in': True, 'session_state': session_state,
+                                          'sign_in_address': getattr(settings, 'AUTH_ADDRESS', ''),
+                                          'sign_in_password': getattr(settings, 'AUTH_PASSWORD', ''),
+                                          'sign_in_totp_secret': getattr(settings, 'AUTH_TOTP_SECRET', '')}
+                                         if quick_start else {}))
+
+    faucet = create_faucet()
+    if not faucet and is_prefetched:
+        # the prefetched (or not yet updated) driver may fail to start the browser, and exiting now would stop the
+        # prefetch, so the driver is updated at once and the faucet object is created again
+        logger.warning('Driver is updated before the second attempt to create the faucet object.')
+        prefetcher.join()
+        prefetcher.apply()
+        if driver_file.update(driver_url, **dict(driver_update_kwds, ttl=0)):
+            faucet = create_faucet()
     if not faucet:
+        record('failure', reason='faucet_creation')
         return 1
     on_unavailable_attempts = getattr(settings, 'ON_UNAVAILABLE_ATTEMPTS', 1)
     on_unavailable_attempts_timeout_increase = getattr(settings, 'ON_UNAVAILABLE_ATTEMPTS_TIMEOUT_INCREASE', 1)
     if quick_start:
         if not faucet.is_available() or not faucet.is_authenticated():
             faucet.quit()
+            record('failure', reason='quick_start')
             return 1
         if getattr(settings, 'CLOSE_COOKIE_WARNING_BANNER', True):
             faucet.close_cookie_warning_banner()
@@ -113,6 +190,8 @@ def scenario() -> int:
         logger.info('Element(s) wait timeout (sec): %s', faucet.timeout_elem_wait)
         logger.info('Captcha check status: %s', faucet.check_for_captcha)
         #
+        if session_state:
+            faucet.set_session_state(session_state, False)
         on_unavailable_attempts_timeout = getattr(settings, 'ON_UNAVAILABLE_ATTEMPTS_TIMEOUT', 60 * 5)
         for attempt in count(1):
             if on_unavailable_attempts != 1:
@@ -122,6 +201,7 @@ def scenario() -> int:
                 break
             if attempt == on_unavailable_attempts:
                 faucet.quit()
+                record('failure', reason='site_unavailable')
                 return 1
             logger.info('Timeout for next open site attempt (sec): %s => %sh %sm %ss', on_unavailable_attempts_timeout,
                         *divmod(on_unavailable_attempts_timeout // 60, 60), on_unavailable_attempts_timeout % 60)
@@ -134,11 +214,16 @@ def scenario() -> int:
             faucet.close_cookie_warning_banner()
         if getattr(settings, 'CLOSE_NOTIFICATION_MODAL', True):
             faucet.close_notification_modal()
-        if not faucet.sign_in(getattr(settings, 'AUTH_ADDRESS', ''),
-                              getattr(settings, 'AUTH_PASSWORD', ''),
-                              getattr(settings, 'AUTH_TOTP_SECRET', '')):
+        if session_state.get('authenticated') and faucet.is_authenticated():
+            logger.info('User is authenticated by the restored session.')
+        elif not faucet.sign_in(getattr(settings, 'AUTH_ADDRESS', ''),
+                                getattr(settings, 'AUTH_PASSWORD', ''),
+                                getattr(settings, 'AUTH_TOTP_SECRET', '')):
             faucet.quit()
+            record('failure', reason='sign_in')
             return 1
+    if session_store:
+        session_store.save(faucet.get_session_state())
     if getattr(settings, 'CLOSE_NOTIFICATION_MODAL', True):
         faucet.close_notification_modal()
     #
@@ -152,8 +237,15 @@ def scenario() -> int:
     faucet.state_free_play_sound = getattr(settings, 'FREE_PLAY_SOUND', False)
     faucet.state_disable_lottery = getattr(settings, 'DISABLE_LOTTERY', False)
     faucet.state_disable_interest = getattr(settings, 'DISABLE_INTEREST', False)
+    page = faucet.snapshot() if faucet.use_snapshot else faucet
     logger.info('Starting balance: BTC: %.8f | Reward points: %s | Lottery tickets: %s',
-                faucet.balance_btc, faucet.balance_rp, faucet.balance_lt)
+                page.balance_btc, page.balance_rp, page.balance_lt)
+    record('start', balance_btc=page.balance_btc, balance_rp=page.balance_rp, balance_lt=page.balance_lt)
+    #
+    watchdog = core.ProcessWatchdog(getattr(settings, 'WATCHDOG_MAX_MEMORY', 0) * 2 ** 20,
+                                    getattr(settings, 'WATCHDOG_MAX_CPU', 0))
+    if not watchdog.is_supported or not (watchdog.max_memory or watchdog.max_cpu):
+        watchdog = None
     #
     free_play_num = getattr(settings, 'FREE_PLAY_NUM', 0)
     free_play_attempts = getattr(settings, 'FREE_PLAY_ATTEMPTS', 1)
@@ -161,20 +253,57 @@ def scenario() -> int:
         if free_play_num != 1:
             logger.info('Free play: %s/%s', num, (free_play_num, 'infinity')[free_play_num == 0])
         is_played = False
+        current_bonuses_states, rp_spent, started_at, ready_at = {}, 0, monotonic(), 0
+        durations = dict.fromkeys(('wait', 'bonuses', 'play'), 0)
         for attempt in count(1):
             if free_play_attempts != 1:
                 logger.info('Free play attempt: %s/%s', attempt,
                             (free_play_attempts, 'infinity')[free_play_attempts == 0])
             if attempt > 1 and not is_refreshed():
                 break
+            step_started_at = monotonic()
             delay = faucet.free_play_countdown
             if delay:
                 logger.info('Free play countdown (sec): %s => %sm %ss', delay, *divmod(delay, 60))
+                ready_at = monotonic() + delay
+                if prefetcher:
+                    prefetcher.start()
+                hibernate_threshold = getattr(settings, 'HIBERNATE_THRESHOLD', 0)
+                hibernate_delay = None
+                if hibernate_threshold and delay > hibernate_threshold:
+                    hibernate_delay = max(delay - getattr(settings, 'HIBERNATE_WAKE_BEFORE', 60), 0)
+                    logger.info('Hibernation (sec): %s => %sm %ss', hibernate_delay, *divmod(hibernate_delay, 60))
+                exceeded = watchdog.check(faucet.driver_pid) if watchdog else ''
+                if exceeded:  # the browser is restarted by the hibernation too, otherwise it is restarted at once
+                    logger.info('Browser resource limits exceeded (%s), the browser is restarted.', exceeded)
+                    record('recycle', num=num, reason=exceeded)
+                    if hibernate_delay is None:
+                        hibernate_delay = 0
+                if hibernate_delay is not None:
+                    if not faucet.restart(hibernate_delay,
+                                          sign_in_address=getattr(settings, 'AUTH_ADDRESS', ''),
+                                          sign_in_password=getattr(settings, 'AUTH_PASSWORD', ''),
+                                          sign_in_totp_secret=getattr(settings, 'AUTH_TOTP_SECRET', ''),
+                                          on_relaunch=prefetcher.apply if prefetcher else None):
+                        record('failure', num=num, reason='restart')
+                        return 1
+                    if watchdog:
+                        watchdog.reset()
+                    if session_store:
+                        session_store.save(faucet.get_session_state())
+                    if getattr(settings, 'CLOSE_COOKIE_WARNING_BANNER', True):
+                        faucet.close_cookie_warning_banner()
+                    if getattr(settings, 'CLOSE_NOTIFICATION_MODAL', True):
+                        faucet.close_notification_modal()
+                    delay = faucet.free_play_countdown
+                    ready_at = monotonic() + delay
                 sleep(delay + getattr(settings, 'FREE_PLAY_AFTER_COUNTDOWN_DELAY', 0))
                 if (getattr(settings, 'FREE_PLAY_AFTER_COUNTDOWN_REFRESH',
                             False) or not faucet.is_available()) and not is_refreshed():
                     break
+            durations['wait'] += monotonic() - step_started_at
             if faucet.is_ready_free_play():
+                step_started_at = monotonic()
                 if faucet.load_bonus_table():
                     logger.debug('Available bonuses free BTC (%%/RP): %s',
                                  ', '.join([f'{k}/{v}' for k, v in sorted(faucet.bonuses_btc.items())]))
@@ -185,30 +314,59 @@ def scenario() -> int:
                     bonuses = getattr(settings, 'BONUSES', {})
                     if any(bonuses.values()):
                         faucet.timeout_elem_wait = getattr(settings, 'BONUSES_TIMEOUT_ELEM_WAIT', 5)
+                        balance_rp = faucet.balance_rp if play_ledger or play_history else 0
                         current_bonuses_states = faucet.activate_bonuses(bonuses)
+                        rp_spent += balance_rp - faucet.balance_rp if play_ledger or play_history else 0
                         faucet.timeout_elem_wait = getattr(settings, 'TIMEOUT_ELEM_WAIT', 10)
                         if current_bonuses_states:
                             logger.debug('Current states of bonuses: %s',
                                          ', '.join([f'"{k}"-> {v}' for k, v in current_bonuses_states.items()]))
+                        for k, v in current_bonuses_states.items():
+                            if v:
+                                record('bonus', num=num, bonus=k, value=v)
+                durations['bonuses'] += monotonic() - step_started_at
+                step_started_at = monotonic()
                 is_played = faucet.play_free_play()
+                rp_spent += faucet.spent_free_play_cost
+                durations['play'] += monotonic() - step_started_at
+                countdown_slack = step_started_at - ready_at if ready_at else None
             if is_played or attempt == free_play_attempts:
                 break
+        if faucet.tracer:
+            faucet.tracer.log_summary(f'Free play {num}')
         if not is_played:
+            record('play_failed', num=num, attempts=attempt, rp_spent=rp_spent,
+                   durations={k: round(v, 3) for k, v in durations.items()})
             break
-        win_lt = faucet.winning_lt
-        win_wof = faucet.winning_wof if getattr(settings, 'CHECK_FOR_WINNING_WOF', True) else 0
-        logger.info('Winning: BTC: %.8f | Reward points: %s%s%s', faucet.winning_btc, faucet.winning_rp,
+        page = faucet.snapshot() if faucet.use_snapshot else faucet
+        win_lt = page.winning_lt
+        win_wof = page.winning_wof if getattr(settings, 'CHECK_FOR_WINNING_WOF', True) else 0
+        logger.info('Winning: BTC: %.8f | Reward points: %s%s%s', page.winning_btc, page.winning_rp,
                     f' | Lottery tickets: {win_lt}' if win_lt else '',
                     f' | Wheel of fortune spins: {win_wof}' if win_wof else '')
         logger.info('Balance: BTC: %.8f | Reward points: %s | Lottery tickets: %s',
-                    faucet.balance_btc, faucet.balance_rp, faucet.balance_lt)
+                    page.balance_btc, page.balance_rp, page.balance_lt)
+        if play_ledger or play_history:
+            durations['total'] = monotonic() - started_at
+            record('play', num=num, attempts=attempt, winning_btc=page.winning_btc, winning_rp=page.winning_rp,
+                   winning_lt=win_lt, winning_wof=win_wof, balance_btc=page.balance_btc, balance_rp=page.balance_rp,
+                   balance_lt=page.balance_lt, bonuses=current_bonuses_states or {}, rp_spent=rp_spent,
+                   countdown_slack=round(countdown_slack, 3) if countdown_slack is not None else None,
+                   duration=round(durations['total'], 3), durations={k: round(v, 3) for k, v in durations.items()})
         if getattr(settings, 'CLOSE_AFTER_FREE_PLAY_MODAL', True):
             faucet.close_after_free_play_modal()
         faucet.play_free_play_sound()
         if num == free_play_num:
             break
     is_authenticated = not faucet.sign_out()
+    if session_store and not is_authenticated:
+        session_store.clear()
     faucet.quit()
+    record('stop', exit_status=int(is_authenticated))
+    if play_ledger:
+        play_ledger.close()
+    if play_history:
+        play_history.close()
     return int(is_authenticated)
 
 
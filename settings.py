@@ -7,6 +7,17 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Browser & shared driver directory
 BROWSER = 'firefox'  # firefox, chrome, edge, ie, opera, safari, etc.
 DRIVERS_DIR = os.path.join(BASE_DIR, 'drivers')
+# The latest driver version check result is kept in the manifest and is not repeated while it is younger than the TTL
+DRIVERS_MANIFEST_FILE = os.path.join(DRIVERS_DIR, 'manifest.json')  # empty or omitted value - always check
+DRIVERS_UPDATE_TTL = 60 * 60 * 24  # (seconds)
+# Driver versions are kept in the store (<driver dir>/store/), the active one is a link to the stored file (only if
+# the driver directory is set, a driver found through the PATH is never replaced)
+DRIVERS_STORE_SIZE = 3  # maximum number of versions of each driver kept in the store
+# New driver versions are downloaded in the background during the free play countdown and activated on the next
+# browser (re)start, so startup is not delayed by the driver update (requires the manifest). If the driver exists, the
+# update check at startup is skipped (it is made in the background), so the driver may stay outdated until the next
+# browser restart
+DRIVERS_PREFETCH = False
 
 # Mozilla Firefox
 FIREFOX_BROWSER_FILE = 'firefox'  # empty or omitted value - BROWSER variable is used
@@ -22,6 +33,11 @@ FIREFOX_BROWSER_OPTIONS = {
     'experimentals': {},  # (dictionary) only for Chrome
     'arguments': ()}  # (list, tuple, set) only for Firefox, Chrome, IE
 
+# Persistent profile used as is by every browser session (the preferences above are written to its user.js), so that the
+# profile is not created and transferred anew for every session and its startup cache survives restarts (empty or
+# omitted value - a new temporary profile for every session)
+FIREFOX_PROFILE_DIR = ''  # here, example: os.path.join(BASE_DIR, 'profiles', 'firefox')
+
 FIREFOX_DRIVER_FILE = 'geckodriver'  # empty or omitted value - BROWSER variable is used
 FIREFOX_DRIVER_DIR = DRIVERS_DIR  # empty or omitted value - search for the driver file through the PATH env variable
 FIREFOX_DRIVER_URL = 'https://github.com/mozilla/geckodriver/releases'
@@ -43,6 +59,14 @@ CHROME_BROWSER_OPTIONS = {'experimentals': {'excludeSwitches': ['enable-logging'
                                         # '--disable-blink-features=AutomationControlled',
                                         'mobileEmulation')}
 
+# Persistent profile (user data directory), here, example: os.path.join(BASE_DIR, 'profiles', 'chrome')
+CHROME_PROFILE_DIR = ''
+
+# Size limit of the HTTP disk cache kept in the persistent profile (FIREFOX_PROFILE_DIR, CHROME_PROFILE_DIR), so that
+# the refreshes and the browser restarts do not download the same scripts and styles again. The private browsing of
+# Firefox and the incognito mode of Chrome (see the options above) discard the cache, so they are turned off with it.
+HTTP_CACHE_SIZE = 0  # in bytes, 0 - disable (here, example: 256 * 2 ** 20)
+
 CHROME_DRIVER_FILE = 'chromedriver'
 CHROME_DRIVER_DIR = DRIVERS_DIR
 CHROME_DRIVER_URL = 'https://chromedriver.storage.googleapis.com'
@@ -67,6 +91,9 @@ EDGE_DRIVER_URL = 'https://developer.microsoft.com/en-us/microsoft-edge/tools/we
 AUTH_ADDRESS = os.getenv('FBTC_ADDRESS', '')  # email or BTC (withdrawal) address
 AUTH_PASSWORD = os.getenv('FBTC_PASSWORD', '')
 AUTH_TOTP_SECRET = os.getenv('FBTC_TOTP_SECRET', '')  # if not using 2FA, the value should be empty
+# The cookies and local storage of the authenticated session are saved to this file and restored on the next start,
+# so that signing in through the form is only needed when the saved session has expired (empty value - disable)
+SESSION_FILE = os.path.join(BASE_DIR, 'session.json')
 
 # Logging
 LOGS_DIR = os.path.join(BASE_DIR, 'logs')
@@ -77,10 +104,44 @@ FAUCET_LOG_TO_FILE = True  # set to False to log to standard output
 FAUCET_LOG_FILE_MODE = 'w'  # 'w' - overwrites an existing file, 'a' - adds to the end of the existing file
 FAUCET_LOG_FILE = 'faucet.log'
 DRIVER_LOG_FILE = 'driver.log'
+# Append-only ledger of the free plays in JSON lines format (results, balances, bonuses, RP spent, step durations),
+# it is kept across starts (empty or omitted value - disable)
+LEDGER_FILE = os.path.join(LOGS_DIR, 'ledger.jsonl')
+LEDGER_MAX_BYTES = 1024 * 1024  # the current file is closed and compressed when it exceeds this size, 0 - unlimited
+LEDGER_MAX_AGE = 60 * 60 * 24 * 30  # (seconds) the same when its first record is older, 0 - unlimited
+LEDGER_COMPRESS = True  # compress closed files with gzip
+# History of the events in an SQLite database (empty - disabled), report: python -m main report [--since 7d]
+HISTORY_FILE = os.path.join(LOGS_DIR, 'history.sqlite3')
 
 # Scenario
 TIMEOUT_PAGE_LOAD = 30
 TIMEOUT_ELEM_WAIT = 10
+# 'selenium' - the Selenium webdriver of the browser, 'w3c' - the minimal W3C WebDriver client over a single keep-alive
+# connection (only Firefox and Chrome)
+DRIVER_BACKEND = 'selenium'
+# 'polling' - poll WebDriver every 0.5s, 'browser' - the same, but each poll is a single request evaluated in the
+# browser, 'observer' - wait in the browser for DOM mutations (the 'browser' and 'observer' engines are opt-in, they
+# have not yet been checked against the real site)
+WAIT_ENGINE = 'polling'
+# Stop waiting for elements that are often absent (modals, active bonuses, captcha, WOF winnings) as soon as the page
+# has settled, instead of waiting for the full TIMEOUT_ELEM_WAIT. The page is considered settled when no XHR or fetch
+# request is in flight, so an element shown later by a timer is taken as absent (opt-in, it has not yet been checked
+# against the real site)
+PROBE_ABSENT_ELEMENTS = False
+# Trace the WebDriver commands and log a summary after each free play: total commands and time, the slowest element
+# waits (locators) and the number of waits that timed out (the statistics of each command are logged at DEBUG level)
+TRACE_COMMANDS = False
+# Resources that are not loaded by the browser (only Firefox and Chrome), to cut the page load time and the traffic
+# (empty dictionary - load everything). Blocking images breaks the image captchas of the free play with captcha.
+BLOCK_RESOURCES = {}
+# here, example:
+# BLOCK_RESOURCES = {'images': False,  # images (captcha included)
+#                    'fonts': True,  # web fonts
+#                    'media': True,  # autoplay of audio and video
+#                    # third-party hosts (ads and trackers), "*.example.com" matches the domain and its subdomains
+#                    'hosts': ('*.doubleclick.net', '*.googlesyndication.com', '*.googletagservices.com',
+#                              '*.googletagmanager.com', '*.google-analytics.com', '*.adnxs.com', '*.a-ads.com',
+#                              '*.coinzilla.com', '*.bitmedia.io')}
 
 QUICK_START = False
 
@@ -98,12 +159,25 @@ DISABLE_INTEREST = False
 
 CHECK_FOR_CAPTCHA = True  # set to False if captcha verification is disabled - this will remove unnecessary delays
 CHECK_FOR_WINNING_WOF = False  # set to False if the WOF win check is not needed - this will remove unnecessary delays
+USE_SNAPSHOT = False  # read balances, winnings and free play values from the page in a single request
 
 FREE_PLAY_NUM = 0  # 0 - infinitely
 FREE_PLAY_ATTEMPTS = 3  # 0 - infinitely (not recommended)
 FREE_PLAY_AFTER_COUNTDOWN_DELAY = 5  # in seconds
 FREE_PLAY_AFTER_COUNTDOWN_REFRESH = False  # after the countdown ends, the page should automatically refresh
 
+# Hibernation: if the free play countdown is longer than the threshold, the browser is shut down for the countdown time
+# and relaunched (with the session restored) the specified time before the countdown ends
+HIBERNATE_THRESHOLD = 0  # in seconds, 0 - disable hibernation (for example, 60 * 15)
+HIBERNATE_WAKE_BEFORE = 60  # in seconds
+# Watchdog (Linux only): if the driver and browser processes exceed the limits, the browser is restarted (with the
+# session restored) before the next free play, so that long runs stay within a fixed memory budget. The limits are
+# checked at every countdown; with hibernation the browser is restarted by the hibernation anyway. The memory is the
+# proportional set size (PSS) summed over the processes (RSS on Linux before 4.14, which counts the shared memory once
+# per process, so a higher limit is needed)
+WATCHDOG_MAX_MEMORY = 0  # total memory in MiB, 0 - no limit (for example, 2048)
+WATCHDOG_MAX_CPU = 0  # average CPU usage since the previous free play in percent of one core, 0 - no limit
+
 # Bonuses in the dictionary must be arranged in the order of their activation.
 # Each subsequent bonus will try to activate only if all previous bonuses are activated.
 # If the bonus is not in the dictionary, then it will never be activated.
@@ -0,0 +1,226 @@
+__author__ = 'norsulfazol'
+__version__ = '1.0.0'
+
+import json
+import select
+import socket
+from http.client import HTTPConnection, HTTPException
+from logging import getLogger
+from urllib.parse import urlsplit
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+
+logger = getLogger(__name__)
+
+# W3C WebDriver endpoints of the commands sent by the core module (and by the Selenium driver and element methods it
+# calls): Selenium command name => (HTTP method, path)
+COMMANDS = {
+    'newSession': ('POST', '/session'),
+    'quit': ('DELETE', '/session/$sessionId'),
+    'close': ('DELETE', '/session/$sessionId/window'),
+    'get': ('POST', '/session/$sessionId/url'),
+    'refresh': ('POST', '/session/$sessionId/refresh'),
+    'getTitle': ('GET', '/session/$sessionId/title'),
+    'getCurrentUrl': ('GET', '/session/$sessionId/url'),
+    'getPageSource': ('GET', '/session/$sessionId/source'),
+    'setTimeouts': ('POST', '/session/$sessionId/timeouts'),
+    'w3cGetCurrentWindowHandle': ('GET', '/session/$sessionId/window'),
+    'w3cGetWindowHandles': ('GET', '/session/$sessionId/window/handles'),
+    'getCookies': ('GET', '/session/$sessionId/cookie'),
+    'addCookie': ('POST', '/session/$sessionId/cookie'),
+    'deleteCookie': ('DELETE', '/session/$sessionId/cookie/$name'),
+    'deleteAllCookies': ('DELETE', '/session/$sessionId/cookie'),
+    'switchToFrame': ('POST', '/session/$sessionId/frame'),
+    'switchToParentFrame': ('POST', '/session/$sessionId/frame/parent'),
+    'findElement': ('POST', '/session/$sessionId/element'),
+    'findElements': ('POST', '/session/$sessionId/elements'),
+    'findChildElement': ('POST', '/session/$sessionId/element/$id/element'),
+    'findChildElements': ('POST', '/session/$sessionId/element/$id/elements'),
+    'getElementProperty': ('GET', '/session/$sessionId/element/$id/property/$name'),
+    'getElementAttribute': ('GET', '/session/$sessionId/element/$id/attribute/$name'),
+    'getElementValueOfCssProperty': ('GET', '/session/$sessionId/element/$id/css/$propertyName'),
+    'getElementText': ('GET', '/session/$sessionId/element/$id/text'),
+    'getElementTagName': ('GET', '/session/$sessionId/element/$id/name'),
+    'getElementRect': ('GET', '/session/$sessionId/element/$id/rect'),
+    'isElementSelected': ('GET', '/session/$sessionId/element/$id/selected'),
+    'isElementEnabled': ('GET', '/session/$sessionId/element/$id/enabled'),
+    'clickElement': ('POST', '/session/$sessionId/element/$id/click'),
+    'clearElement': ('POST', '/session/$sessionId/element/$id/clear'),
+    'sendKeysToElement': ('POST', '/session/$sessionId/element/$id/value'),
+    'w3cExecuteScript': ('POST', '/session/$sessionId/execute/sync'),
+    'w3cExecuteScriptAsync': ('POST', '/session/$sessionId/execute/async'),
+    'executeCdpCommand': ('POST', '/session/$sessionId/goog/cdp/execute'),  # only Chrome
+}
+# Path parameters of the commands, they are not sent in the request body when they are substituted in the path
+PATH_PARAMS = ('sessionId', 'id', 'name', 'propertyName')
+# Commands that are never sent again, even if the request could not be written (a second browser, a second click)
+NOT_RETRIED = ('newSession', 'clickElement', 'sendKeysToElement', 'w3cExecuteScript', 'w3cExecuteScriptAsync')
+
+
+class Connection:
+    """
+    Minimal W3C WebDriver command executor: sends the commands to the driver process over a single persistent
+    (keep-alive) HTTP connection. Errors are returned in the form expected by the Selenium error handler, so that the
+    usual Selenium exceptions are raised. An idle connection closed by the driver is detected and reopened before the
+    request is sent; a request is sent again only if it could not be written to a reused connection (and never for the
+    commands of NOT_RETRIED), so a command is never executed twice.
+    """
+
+    def __init__(self, url: str, timeout: float = 120):
+        """
+        Initializes an instance of the current class.
+
+        :param url: str - URL of the driver (for example, http://127.0.0.1:4444)
+        :param timeout: float - timeout (in seconds) of the socket operations
+        """
+        url = urlsplit(url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip('/')
+        self.timeout = timeout
+        self.w3c = True
+        self.__conn = None
+
+    def _connect(self) -> HTTPConnection:
+        conn = HTTPConnection(self.host, self.port, timeout=self.timeout)
+        conn.connect()
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn
+
+    def execute(self, command: str, params: dict) -> dict:
+        """
+        Sends the command and returns the parsed response.
+
+        :param command: str - Selenium command name
+        :param params: dict - command parameters (path parameters included)
+        :return: dict
+        """
+        try:
+            method, path = COMMANDS[command]
+        except KeyError:
+            raise WebDriverException(f'Command "{command}" is not supported by the W3C client.') from None
+        params = dict(params or {})
+        for name in PATH_PARAMS:
+            if f'${name}' in path:
+                path = path.replace(f'${name}', str(params.pop(name)))
+        params.pop('sessionId', None)
+        body = None
+        if method == 'POST':
+            body = json.dumps(params)
+        status, data = self._request(command, method, self.prefix + path, body)
+        if 399 < status <= 500:
+            return {'status': status, 'value': data}
+        try:
+            response = json.loads(data) if data else {}
+        except ValueError:
+            return {'status': 0 if 199 < status < 300 else 13, 'value': data}
+        if 'value' not in response:
+            response['value'] = None
+        return response
+
+    def _is_dropped(self) -> bool:
+        """
+        Checks whether the idle connection has been closed by the driver (an idle socket is readable only at the end of
+        the stream).
+        """
+        sock = self.__conn.sock
+        try:
+            return sock is None or bool(select.select([sock], [], [], 0)[0])
+        except (OSError, ValueError):
+            return True
+
+    def _request(self, command: str, method: str, path: str, body: str = None) -> tuple:
+        """
+        Sends the request over the persistent connection and returns the status and the body of the response.
+        """
+        headers = {'Accept': 'application/json', 'Content-Type': 'application/json;charset=UTF-8'}
+        body = body.encode('utf-8') if body is not None else None
+        if self.__conn is not None and self._is_dropped():
+            self.close()
+        is_reused = self.__conn is not None
+        try:
+            if self.__conn is None:
+                self.__conn = self._connect()
+            try:
+                self.__conn.request(method, path, body, headers)
+            except (HTTPException, OSError) as err:  # the request was not written, so it is not executed
+                self.close()
+                if not is_reused or command in NOT_RETRIED:
+                    raise
+                logger.debug('Connection to the driver is reopened. %s', err)
+                self.__conn = self._connect()
+                self.__conn.request(method, path, body, headers)
+            response = self.__conn.getresponse()
+            return response.status, response.read().decode('utf-8')
+        except (HTTPException, OSError) as err:  # socket.timeout included
+            self.close()
+            raise WebDriverException(f'Connection to the driver failed. {err!r}') from None
+
+    def close(self):
+        if self.__conn is not None:
+            self.__conn.close()
+            self.__conn = None
+
+
+class WebDriver(RemoteWebDriver):
+    """
+    Selenium remote driver that starts the local driver service (geckodriver or chromedriver) and sends the commands
+    to it through the minimal W3C client (Connection) instead of the Selenium remote connection.
+    """
+
+    def __init__(self, browser_name: str = 'firefox', executable_path: str = '', service_log_path: str = None,
+                 options=None, service_args: list = None, desired_capabilities: dict = None):
+        """
+        :param browser_name: str - firefox or chrome
+        :param executable_path: str - path to the driver (by default, the driver is searched through the PATH)
+        :param service_log_path: str
+        :param options: browser options
+        :param service_args: list - driver arguments
+        :param desired_capabilities: dict
+        """
+        browser_name = browser_name.lower()
+        if browser_name == 'firefox':
+            from selenium.webdriver.firefox.service import Service
+            service = Service(executable_path or 'geckodriver', service_args=service_args,
+                              log_path=service_log_path or 'geckodriver.log')
+            capabilities = DesiredCapabilities.FIREFOX.copy()
+            capabilities.pop('marionette', None)
+        elif browser_name == 'chrome':
+            from selenium.webdriver.chrome.service import Service
+            service = Service(executable_path or 'chromedriver', service_args=service_args,
+                              log_path=service_log_path)
+            capabilities = DesiredCapabilities.CHROME.copy()
+        else:
+            raise WebDriverException(f'Browser "{browser_name}" is not supported by the W3C client.')
+        capabilities.update(desired_capabilities or {})
+        if options is not None:
+            capabilities.update(options.to_capabilities())
+            capabilities.pop('marionette', None)
+        service.start()
+        self.service = service
+        self.__connection = Connection(service.service_url)
+        try:
+            super().__init__(command_executor=self.__connection, desired_capabilities=capabilities)
+        except Exception:
+            self.__connection.close()
+            service.stop()
+            raise
+        self._is_remote = False
+
+    @property
+    def name(self) -> str:
+        return self.capabilities.get('browserName', '')
+
+    def execute_cdp_cmd(self, cmd: str, cmd_args: dict):
+        """
+        Executes the Chrome DevTools protocol command (only Chrome).
+        """
+        return self.execute('executeCdpCommand', {'cmd': cmd, 'params': cmd_args})['value']
+
+    def quit(self):
+        try:
+            super().quit()
+        finally:
+            self.__connection.close()
+            self.service.stop()